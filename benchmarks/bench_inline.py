@@ -0,0 +1,62 @@
+"""
+Throughput of text_to_textnodes on paragraphs with many links.
+
+Compares the single-pass tokenizer against the original chain of
+split_nodes_delimiter / split_nodes_image / split_nodes_link passes.
+
+Usage: python3 benchmarks/bench_inline.py [links ...]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from inline_markdown import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from textnode import TextNode, TextType
+
+
+def chained_text_to_textnodes(text):
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def make_paragraph(links):
+    parts = []
+    for i in range(links):
+        parts.append(f"Some **bold {i}** text with a [link {i}](/page/{i}) and ")
+        if i % 10 == 0:
+            parts.append(f"an ![image {i}](/images/{i}.png) plus `code {i}` ")
+    return "".join(parts) + "the end."
+
+
+def bench(func, text):
+    timer = timeit.Timer(lambda: func(text))
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=3, number=number)) / number
+    return len(text) / best / 1e6
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or [10, 100, 500, 1000]
+    print(f"{'links':>6} {'chars':>8} {'chained MB/s':>13} {'single MB/s':>12} {'speedup':>8}")
+    for links in sizes:
+        text = make_paragraph(links)
+        assert text_to_textnodes(text) == chained_text_to_textnodes(text)
+        old = bench(chained_text_to_textnodes, text)
+        new = bench(text_to_textnodes, text)
+        print(f"{links:>6} {len(text):>8} {old:>13.2f} {new:>12.2f} {new / old:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
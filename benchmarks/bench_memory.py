@@ -0,0 +1,88 @@
+"""
+Memory held by parsed page ASTs, slotted nodes vs. dict-backed nodes.
+
+Each mode runs in its own subprocess, parses the same corpus (the pages in
+content/ repeated), keeps every HTMLNode tree and the TextNodes of every
+block alive, and reports the memory retained (tracemalloc) and peak RSS.
+The "dict" mode converts each tree into classes laid out like the original
+nodes (per-instance __dict__, fresh props dict and children list).
+
+Usage: python3 benchmarks/bench_memory.py [copies]
+"""
+import glob
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children if children is not None else []
+        self.props = props if props is not None else {}
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def to_dict_tree(node):
+    children = [to_dict_tree(child) for child in node.children]
+    return DictHTMLNode(node.tag, node.value, children, dict(node.props))
+
+
+def load_corpus(copies):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "content", "**", "*.md"), recursive=True)):
+        with open(path) as f:
+            pages.append(f.read())
+    return pages * copies
+
+
+def run(mode, copies):
+    from inline_markdown import text_to_textnodes
+    from markdown_blocks import markdown_to_blocks, markdown_to_html_node
+
+    corpus = load_corpus(copies)
+    tracemalloc.start()
+    held = []
+    for markdown in corpus:
+        tree = markdown_to_html_node(markdown)
+        text_nodes = [text_to_textnodes(block) for block in markdown_to_blocks(markdown)
+                      if not block.startswith("```")]
+        if mode == "dict":
+            tree = to_dict_tree(tree)
+            text_nodes = [[DictTextNode(n.text, n.text_type, n.url) for n in nodes] for nodes in text_nodes]
+        held.append((tree, text_nodes))
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode} {len(held)} {retained} {peak_rss_kb}")
+
+
+def main(argv):
+    if argv and argv[0] == "--run":
+        run(argv[1], int(argv[2]))
+        return
+    copies = int(argv[0]) if argv else 500
+    print(f"{'mode':>6} {'pages':>7} {'retained MB':>12} {'peak RSS MB':>12}")
+    for mode in ("dict", "slots"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--run", mode, str(copies)],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        pages, retained, peak_rss_kb = int(out[1]), int(out[2]), int(out[3])
+        print(f"{mode:>6} {pages:>7} {retained / 1e6:>12.1f} {peak_rss_kb / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,107 @@
+"""
+Single-document rendering throughput for embedding services.
+
+Compares three ways of rendering one page on request:
+
+- in-process: renderer.render() in a warm interpreter
+- render-stream: one long-lived `main.py render-stream` process fed
+  JSON-lines requests over a pipe
+- render-one: a new `main.py render-one -` process per request
+
+Usage: python3 benchmarks/bench_render.py [--requests N] [--spawns N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+MAIN = os.path.join(ROOT, "src", "main.py")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, HERE)
+
+from corpus import CorpusGenerator
+from renderer import render
+from template import load_template
+
+TEMPLATE_PATH = os.path.join(ROOT, "template.html")
+
+
+def bench_in_process(documents):
+    template = load_template(TEMPLATE_PATH)
+    started = time.perf_counter()
+    for doc in documents:
+        render(doc, template)
+    return time.perf_counter() - started
+
+
+def bench_stream(documents):
+    process = subprocess.Popen(
+        [sys.executable, MAIN, "render-stream", "-q"],
+        cwd=ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    # Warm the process up before timing.
+    process.stdin.write(json.dumps({"id": -1, "markdown": documents[0]}) + "\n")
+    process.stdin.flush()
+    process.stdout.readline()
+
+    def feed():
+        for i, doc in enumerate(documents):
+            process.stdin.write(json.dumps({"id": i, "markdown": doc}) + "\n")
+        process.stdin.close()
+
+    started = time.perf_counter()
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    answered = sum(1 for line in process.stdout if "html" in json.loads(line))
+    elapsed = time.perf_counter() - started
+    feeder.join()
+    process.wait()
+    assert answered == len(documents), answered
+    return elapsed
+
+
+def bench_spawn(documents):
+    started = time.perf_counter()
+    for doc in documents:
+        subprocess.run(
+            [sys.executable, MAIN, "render-one", "-", "-q"],
+            cwd=ROOT,
+            input=doc,
+            stdout=subprocess.DEVNULL,
+            text=True,
+            check=True,
+        )
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-document rendering.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--spawns", type=int, default=20)
+    parser.add_argument("--blocks-per-page", type=int, default=10)
+    parser.add_argument("--distinct", type=int, default=200, help="distinct documents in the request mix")
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(0, blocks_per_page=args.blocks_per_page)
+    distinct = [generator.page() for _ in range(args.distinct)]
+    documents = [distinct[i % len(distinct)] for i in range(args.requests)]
+
+    results = [
+        ("in-process", args.requests, bench_in_process(documents)),
+        ("render-stream", args.requests, bench_stream(documents)),
+        ("render-one", args.spawns, bench_spawn(documents[:args.spawns])),
+    ]
+    for name, count, seconds in results:
+        print(f"{name:<14} {count / seconds:>10.0f} renders/s  {seconds / count * 1000:>8.3f} ms/render")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Search index size, build time and query latency over a synthetic corpus.
+
+Builds the index from scratch, then again after changing one page (the
+incremental case a normal build hits), reports the size of what is shipped
+to browsers, and times queries both cold (meta.json and shards loaded on
+demand) and warm (shards already loaded).
+
+Usage: python3 benchmarks/bench_search.py [--pages N] [--queries N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from corpus import CorpusGenerator
+from gencontent import collect_page_jobs
+from searchindex import SearchIndex, SearchIndexReader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search index.")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        out_dir = os.path.join(tmp, "docs")
+        state_path = os.path.join(tmp, "search.json")
+        paths = CorpusGenerator(args.seed).write(content_dir, args.pages)
+        jobs = collect_page_jobs(content_dir, out_dir)
+        corpus_bytes = sum(os.path.getsize(path) for path in paths)
+
+        started = time.perf_counter()
+        index = SearchIndex(state_path)
+        index.update(jobs, out_dir)
+        index.write(out_dir)
+        index.save()
+        full = time.perf_counter() - started
+
+        with open(paths[0], "a") as f:
+            f.write("\nAn extra paragraph.\n")
+        started = time.perf_counter()
+        index = SearchIndex.load(state_path)
+        indexed = index.update(jobs, out_dir)
+        index.write(out_dir)
+        index.save()
+        incremental = time.perf_counter() - started
+
+        search_dir = os.path.join(out_dir, "search")
+        sizes = {name: os.path.getsize(os.path.join(search_dir, name)) for name in os.listdir(search_dir)}
+        index_bytes = sum(size for name, size in sizes.items() if name.endswith(".json"))
+        shard_sizes = [size for name, size in sizes.items() if name.startswith("terms-")]
+
+        rng = random.Random(args.seed)
+        vocabulary = sorted({term for entry in index.pages.values()
+                             for _, terms in entry["sections"] for term in terms})
+        queries = [" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(args.queries)]
+
+        started = time.perf_counter()
+        for query in queries:
+            SearchIndexReader(search_dir).search(query)
+        cold = (time.perf_counter() - started) / len(queries)
+
+        reader = SearchIndexReader(search_dir)
+        for query in queries:
+            reader.search(query)
+        started = time.perf_counter()
+        for query in queries:
+            reader.search(query)
+        warm = (time.perf_counter() - started) / len(queries)
+
+    print(f"pages                 {args.pages:>10}")
+    print(f"corpus                {corpus_bytes / 1024:>10.1f} KiB")
+    print(f"terms                 {len(vocabulary):>10}")
+    print(f"index (json)          {index_bytes / 1024:>10.1f} KiB ({index_bytes / corpus_bytes:.0%} of corpus)")
+    print(f"meta.json             {sizes['meta.json'] / 1024:>10.1f} KiB")
+    print(f"largest shard         {max(shard_sizes) / 1024:>10.1f} KiB of {len(shard_sizes)} shards")
+    print(f"full build            {full * 1000:>10.1f} ms")
+    print(f"incremental build     {incremental * 1000:>10.1f} ms ({indexed} page re-indexed)")
+    print(f"query, cold           {cold * 1000:>10.3f} ms")
+    print(f"query, warm           {warm * 1000:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
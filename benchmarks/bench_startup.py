@@ -0,0 +1,121 @@
+"""
+Cold-start cost of the CLI.
+
+Runs light commands of src/main.py in fresh interpreters under
+`python -X importtime`, and reports for each the total time spent
+importing modules (the sum of the top-level cumulative times) and the best
+wall-clock time over several runs. The slowest top-level imports of each
+command are listed, and the run fails if a command's import time exceeds
+its budget.
+
+Budgets are multiples of a reference measured in the same run: the time
+to import argparse and logging, the standard library modules main.py
+needs for any command. The same machine can be twice as fast from one
+run to the next, so fixed budgets in ms would pass or fail on noise. The
+reference and the commands are sampled in turn, and the best sample of
+each is compared.
+
+Usage:
+    python3 benchmarks/bench_startup.py
+    python3 benchmarks/bench_startup.py --samples 10 --budget-scale 1.2
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+MAIN = os.path.join(ROOT, "src", "main.py")
+
+REFERENCE = ["-c", "import argparse, logging"]
+
+# (name, arguments, import budget as a multiple of the reference). --help
+# must not load the build stack at all; render-one and check load only the
+# parser and renderer.
+COMMANDS = [
+    ("--help", [MAIN, "--help"], 1.5),
+    ("render-one", [MAIN, "render-one", os.path.join("content", "index.md"), "-o", "-"], 3.0),
+    ("check", [MAIN, "check"], 3.0),
+]
+
+
+def top_level_imports(args):
+    """Returns [(module, cumulative seconds)] for the top-level imports of a run."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2][1:]
+        # Nested imports are indented under the module that imported them.
+        if not name.startswith(" "):
+            imports.append((name.strip(), int(fields[1]) / 1e6))
+    return imports
+
+
+def best_wall_time(argv, runs):
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI cold start.")
+    parser.add_argument("--runs", type=int, default=10, help="runs timed per command for wall time")
+    parser.add_argument("--samples", type=int, default=7, help="import time samples per command")
+    parser.add_argument("--top", type=int, default=5, help="slowest imports listed per command")
+    parser.add_argument(
+        "--budget-scale", type=float, default=1.0, help="multiply every import budget"
+    )
+    args = parser.parse_args()
+
+    interpreter = best_wall_time([sys.executable, "-c", "pass"], args.runs)
+    print(f"{'-c pass':<12} {'':>38} {interpreter * 1000:>8.1f} ms wall")
+
+    # The best of several samples, so that one slow run doesn't fail the budget.
+    runs = [("reference", REFERENCE)] + [(name, command) for name, command, _ in COMMANDS]
+    best = {}
+    for _ in range(args.samples):
+        for name, command in runs:
+            imports = top_level_imports(command)
+            if name not in best or _total(imports) < _total(best[name]):
+                best[name] = imports
+    reference = _total(best["reference"])
+    print(f"{'reference':<12} {reference * 1000:>8.1f} ms imports (argparse, logging)")
+
+    over_budget = []
+    for name, command, budget_ratio in COMMANDS:
+        imports = best[name]
+        total = _total(imports)
+        wall = best_wall_time([sys.executable] + command, args.runs)
+        budget = reference * budget_ratio * args.budget_scale
+        flag = "" if total <= budget else "  OVER BUDGET"
+        print(
+            f"{name:<12} {total * 1000:>8.1f} ms imports ({total / reference:.2f}x reference, "
+            f"budget {budget_ratio * args.budget_scale:.2f}x) {wall * 1000:>8.1f} ms wall{flag}"
+        )
+        for module, seconds in sorted(imports, key=lambda item: -item[1])[:args.top]:
+            print(f"    {module:<24} {seconds * 1000:>8.1f} ms")
+        if total > budget:
+            over_budget.append(name)
+    return 1 if over_budget else 0
+
+
+def _total(imports):
+    return sum(seconds for _, seconds in imports)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Peak memory of rendering one very large markdown file, whole vs. streamed.
+
+Writes a single generated markdown document of the requested size, then
+renders it with generate_page in a fresh subprocess per mode:
+
+- whole: the file is read into one string and parsed into a full tree
+- stream: generate_page_streaming reads, renders and writes block by block
+
+and reports the peak RSS above the interpreter's baseline (measured after
+imports), the wall time, and whether both modes wrote the same page. The
+streamed peak should stay near the size of the largest block however large
+the file grows.
+
+Usage: python3 benchmarks/bench_stream.py [--mb N] [--blocks-per-page N]
+"""
+import argparse
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, HERE)
+
+TEMPLATE_PATH = os.path.join(ROOT, "template.html")
+
+
+def write_document(path, size_mb, blocks_per_page):
+    from corpus import CorpusGenerator
+
+    generator = CorpusGenerator(0, blocks_per_page=blocks_per_page)
+    target = size_mb << 20
+    written = 0
+    largest = 0
+    with open(path, "w") as f:
+        while written < target:
+            page = generator.page()
+            f.write(page + "\n")
+            written += len(page) + 1
+            largest = max(largest, max(len(block) for block in page.split("\n\n")))
+    return written, largest
+
+
+def run(mode, source, dest):
+    from gencontent import configure_streaming, generate_page
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    configure_streaming(1 if mode == "stream" else 0)
+    started = time.perf_counter()
+    generate_page(source, TEMPLATE_PATH, dest, "/")
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode} {baseline_kb} {peak_kb} {elapsed}")
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def main(argv):
+    if argv and argv[0] == "--run":
+        run(*argv[1:])
+        return
+    parser = argparse.ArgumentParser(description="Benchmark streaming a huge markdown file.")
+    parser.add_argument("--mb", type=int, default=100, help="size of the generated document")
+    parser.add_argument("--blocks-per-page", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "huge.md")
+        size, largest = write_document(source, args.mb, args.blocks_per_page)
+        print(f"document: {size / 2**20:.1f} MB, largest block {largest} bytes")
+        print(f"{'mode':>6} {'peak RSS MB':>12} {'above base MB':>14} {'seconds':>8}")
+        digests = {}
+        for mode in ("whole", "stream"):
+            dest = os.path.join(tmp, f"{mode}.html")
+            out = subprocess.run(
+                [sys.executable, __file__, "--run", mode, source, dest],
+                check=True, capture_output=True, text=True,
+            ).stdout.split()
+            baseline_kb, peak_kb, seconds = int(out[1]), int(out[2]), float(out[3])
+            print(f"{mode:>6} {peak_kb / 1024:>12.1f} {(peak_kb - baseline_kb) / 1024:>14.1f} {seconds:>8.2f}")
+            digests[mode] = file_sha256(dest)
+        print("outputs identical:", digests["whole"] == digests["stream"])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
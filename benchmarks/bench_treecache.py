@@ -0,0 +1,98 @@
+"""
+Loading cached page trees vs. reparsing the markdown.
+
+Times, per page of a synthetic corpus: markdown_to_html_node as a build with
+the default settings runs it, the same with the block cache off and with an
+in-memory block cache (which starts empty, so only blocks repeated within
+the build hit), deserialize_tree on the serialized bytes, and a full
+TreeCache.get from disk (read + deserialize). Speedups are against the
+default parse. pickle is timed too, for comparison with the
+general-purpose format.
+
+The run fails if the default parse is more than --tolerance slower than a
+parse with the block cache off, so a default that costs more than it saves
+is caught rather than just reported.
+
+Usage: python3 benchmarks/bench_treecache.py [--pages N] [--tolerance 0.1]
+"""
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from blockcache import configure_block_cache
+from corpus import CorpusGenerator
+from markdown_blocks import markdown_to_html_node
+from run import best_of
+from treecache import TreeCache, deserialize_tree, serialize_tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parsed-tree cache.")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="allowed slowdown of the default parse (fraction)"
+    )
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(args.seed)
+    documents = [generator.page() for _ in range(args.pages)]
+    configure_block_cache()
+    trees = [markdown_to_html_node(doc) for doc in documents]
+    blobs = [serialize_tree(tree) for tree in trees]
+    pickles = [pickle.dumps(tree, pickle.HIGHEST_PROTOCOL) for tree in trees]
+    for tree, blob in zip(trees, blobs):
+        assert deserialize_tree(blob).to_html() == tree.to_html()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TreeCache(tmp)
+        keys = [cache.key(doc) for doc in documents]
+        for key, tree in zip(keys, trees):
+            cache.put(key, tree)
+        def parse(**block_cache_settings):
+            # A fresh build starts with an empty block cache.
+            configure_block_cache(**block_cache_settings)
+            return [markdown_to_html_node(doc) for doc in documents]
+
+        results = {
+            "parse": best_of(parse, args.repeat),
+            "parse (no cache)": best_of(lambda: parse(maxsize=0), args.repeat),
+            "parse (block cache)": best_of(lambda: parse(maxsize=4096), args.repeat),
+            "deserialize": best_of(lambda: [deserialize_tree(blob) for blob in blobs], args.repeat),
+            "cache get (disk)": best_of(lambda: [cache.get(key) for key in keys], args.repeat),
+            "pickle.loads": best_of(lambda: [pickle.loads(data) for data in pickles], args.repeat),
+        }
+
+    default = results["parse"]
+    for name, seconds in results.items():
+        per_page = seconds / args.pages * 1e6
+        print(f"{name:<19} {per_page:>10.1f} us/page  {default / seconds:>6.2f}x vs parse")
+    size = sum(len(blob) for blob in blobs)
+    source = sum(len(doc.encode("utf-8")) for doc in documents)
+    pickled = sum(len(data) for data in pickles)
+    print(f"tree size           {size / args.pages / 1024:>10.1f} KiB/page  ({size / source:.2f}x markdown, pickle {pickled / source:.2f}x)")
+
+    # The gate times the two parses alternately, so that both see the same
+    # load on the machine, and compares the best of each.
+    default_parse = uncached_parse = float("inf")
+    for _ in range(args.repeat * 2):
+        default_parse = min(default_parse, best_of(parse, 1))
+        uncached_parse = min(uncached_parse, best_of(lambda: parse(maxsize=0), 1))
+    configure_block_cache()
+
+    slowdown = default_parse / uncached_parse - 1
+    if slowdown > args.tolerance:
+        print(f"FAIL: the default parse is {slowdown:.0%} slower than with the block cache off")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
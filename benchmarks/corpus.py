@@ -0,0 +1,120 @@
+"""
+Deterministic synthetic markdown corpus for benchmarks.
+
+The same arguments always produce byte-identical pages, so timings from
+different runs and machines are comparable.
+
+Usage: python3 benchmarks/corpus.py OUT_DIR [--pages N] [--seed S] ...
+"""
+import argparse
+import os
+import random
+
+
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 6,
+    "heading": 2,
+    "code": 1,
+    "quote": 1,
+    "ulist": 1,
+    "olist": 1,
+}
+
+WORDS = (
+    "the fellowship ring shire mordor elves dwarves wizard road river mountain "
+    "forest tower king steward hobbit journey shadow light song tale ancient"
+).split()
+
+
+class CorpusGenerator:
+    """
+    Produces markdown pages from a seeded random source.
+
+    Args:
+        seed (int): Seed for the random source.
+        blocks_per_page (int): Blocks after the title on every page.
+        block_mix (dict): Block type -> relative weight.
+        link_density (float): Chance that an inline span is a link or image.
+        depth (int): Directory nesting depth of the generated tree.
+    """
+    def __init__(self, seed=0, blocks_per_page=30, block_mix=None, link_density=0.1, depth=2):
+        self.random = random.Random(seed)
+        self.blocks_per_page = blocks_per_page
+        self.block_mix = block_mix or DEFAULT_BLOCK_MIX
+        self.link_density = link_density
+        self.depth = depth
+
+    def words(self, n):
+        return " ".join(self.random.choice(WORDS) for _ in range(n))
+
+    def inline(self, n_spans=8):
+        spans = []
+        for i in range(n_spans):
+            roll = self.random.random()
+            if roll < self.link_density / 2:
+                spans.append(f"[{self.words(2)}](/page/{self.random.randrange(1000)})")
+            elif roll < self.link_density:
+                spans.append(f"![{self.words(2)}](/images/{self.random.randrange(100)}.png)")
+            elif roll < self.link_density + 0.1:
+                spans.append(f"**{self.words(2)}**")
+            elif roll < self.link_density + 0.2:
+                spans.append(f"_{self.words(2)}_")
+            elif roll < self.link_density + 0.25:
+                spans.append(f"`{self.words(1)}`")
+            else:
+                spans.append(self.words(self.random.randint(3, 12)))
+        return " ".join(spans)
+
+    def block(self):
+        kinds = list(self.block_mix)
+        kind = self.random.choices(kinds, weights=[self.block_mix[k] for k in kinds])[0]
+        if kind == "heading":
+            return "#" * self.random.randint(2, 6) + " " + self.words(4)
+        if kind == "code":
+            lines = [f"{self.words(1)} = {self.random.randrange(100)}" for _ in range(self.random.randint(2, 8))]
+            return "```\n" + "\n".join(lines) + "\n```"
+        if kind == "quote":
+            return "\n".join("> " + self.inline(3) for _ in range(self.random.randint(1, 4)))
+        if kind == "ulist":
+            return "\n".join("- " + self.inline(2) for _ in range(self.random.randint(2, 8)))
+        if kind == "olist":
+            return "\n".join(f"{i}. " + self.inline(2) for i in range(1, self.random.randint(3, 9)))
+        return "\n".join(self.inline() for _ in range(self.random.randint(1, 4)))
+
+    def page(self):
+        blocks = ["# " + self.words(5)]
+        blocks.extend(self.block() for _ in range(self.blocks_per_page))
+        return "\n\n".join(blocks) + "\n"
+
+    def page_path(self, index):
+        parts = [f"section{(index >> (4 * level)) % 16}" for level in range(self.depth, 0, -1)]
+        return os.path.join(*parts, f"page{index}.md") if parts else f"page{index}.md"
+
+    def write(self, out_dir, pages):
+        """Writes pages markdown files under out_dir and returns their paths."""
+        paths = []
+        for index in range(pages):
+            path = os.path.join(out_dir, self.page_path(index))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(self.page())
+            paths.append(path)
+        return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic markdown corpus.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--blocks-per-page", type=int, default=30)
+    parser.add_argument("--link-density", type=float, default=0.1)
+    parser.add_argument("--depth", type=int, default=2)
+    args = parser.parse_args()
+    generator = CorpusGenerator(args.seed, args.blocks_per_page, link_density=args.link_density, depth=args.depth)
+    paths = generator.write(args.out_dir, args.pages)
+    print(f"wrote {len(paths)} pages to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Parser and builder benchmark suite.
+
+Runs microbenchmarks for markdown_to_blocks, block_to_block_type,
+text_to_textnodes and to_html, plus an end-to-end generate_pages_recursive
+build, all over a deterministic synthetic corpus. Results are written as
+JSON and compared against a baseline; any benchmark slower than the
+baseline by more than the threshold fails the run.
+
+Timings are absolute, so a baseline only means something on the machine
+and Python that recorded it: each checkout records its own (it is not
+committed), and a baseline from another host or Python is not compared.
+
+Usage:
+    python3 benchmarks/run.py --save-baseline     # run and store this machine's baseline
+    python3 benchmarks/run.py                     # run and compare with it
+    python3 benchmarks/run.py --output out.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, HERE)
+
+from blockcache import configure_block_cache
+from corpus import CorpusGenerator
+from gencontent import generate_pages_recursive
+from inline_markdown import text_to_textnodes
+from markdown_blocks import block_to_block_type, markdown_to_blocks, markdown_to_html_node
+
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+TEMPLATE_PATH = os.path.join(ROOT, "template.html")
+
+
+def best_of(func, repeat, min_time=0.2):
+    """
+    Returns the best seconds-per-call of func over repeat timed runs, after
+    untimed warm-up calls. Each run calls func often enough to take at least
+    min_time / repeat seconds. The minimum is the run least disturbed by
+    other work on the machine, so it is what baselines are compared on.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - started >= min_time / repeat or number >= 1 << 20:
+            break
+        number *= 2
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def run_benchmarks(pages, seed, repeat):
+    configure_block_cache(maxsize=0)
+    generator = CorpusGenerator(seed)
+    documents = [generator.page() for _ in range(pages)]
+    blocks = [block for doc in documents for block in markdown_to_blocks(doc)]
+    inline_blocks = [block for block in blocks if not block.startswith("```")]
+    trees = [markdown_to_html_node(doc) for doc in documents]
+    corpus_bytes = sum(len(doc) for doc in documents)
+
+    def all_blocks():
+        for doc in documents:
+            markdown_to_blocks(doc)
+
+    def all_block_types():
+        for block in blocks:
+            block_to_block_type(block)
+
+    def all_inline():
+        for block in inline_blocks:
+            text_to_textnodes(block)
+
+    def all_to_html():
+        for tree in trees:
+            tree.to_html()
+
+    def all_parse():
+        for doc in documents:
+            markdown_to_html_node(doc)
+
+    results = {
+        "markdown_to_blocks": best_of(all_blocks, repeat),
+        "block_to_block_type": best_of(all_block_types, repeat),
+        "text_to_textnodes": best_of(all_inline, repeat),
+        "to_html": best_of(all_to_html, repeat),
+        "markdown_to_html_node": best_of(all_parse, repeat),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        CorpusGenerator(seed).write(content_dir, pages)
+        out_dir = os.path.join(tmp, "docs")
+        # A build writes files, so it is noisier than the parser benchmarks
+        # and gets more samples.
+        results["generate_pages_recursive"] = best_of(
+            lambda: generate_pages_recursive(content_dir, TEMPLATE_PATH, out_dir, "/"),
+            repeat * 2,
+            min_time=2.0,
+        )
+
+    configure_block_cache()
+    return {
+        "meta": {
+            "pages": pages,
+            "seed": seed,
+            "corpus_bytes": corpus_bytes,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "host": platform.node(),
+        },
+        "seconds": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Returns (name, baseline seconds, current seconds, ratio) for every regression."""
+    regressions = []
+    for name, seconds in current["seconds"].items():
+        base = baseline["seconds"].get(name)
+        if base is None or base <= 0:
+            continue
+        ratio = seconds / base
+        if ratio > 1 + threshold:
+            regressions.append((name, base, seconds, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the parser and builder benchmarks.")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.pages, args.seed, args.repeat)
+    for name, seconds in current["seconds"].items():
+        print(f"{name:<26} {seconds * 1000:>10.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["meta"]["pages"] != args.pages or baseline["meta"]["seed"] != args.seed:
+        print("baseline was recorded with a different corpus; not comparing")
+        return 0
+    recorded_on = [baseline["meta"].get(key) for key in ("host", "machine", "python")]
+    if recorded_on != [current["meta"][key] for key in ("host", "machine", "python")]:
+        print("baseline was recorded on another machine or Python; run with --save-baseline here")
+        return 0
+    regressions = compare(current, baseline, args.threshold)
+    for name, base, seconds, ratio in regressions:
+        print(f"REGRESSION {name}: {base * 1000:.3f} ms -> {seconds * 1000:.3f} ms ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import writer
+from gencontent import (
+    PageBuildError,
+    generate_page,
+    init_worker,
+    page_digest,
+    page_record,
+    record_pages,
+    render_page,
+    should_stream,
+    worker_initargs,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Read stage result for a page too large to read whole: the render stage
+# streams it from disk to disk with generate_page instead.
+STREAM = object()
+
+
+def generate_pages_async(dir_path_content, template_path, dest_dir_path, basepath,
+                         manifest=None, workers=1, depgraph=None, io_workers=8, queue_size=64):
+    """
+    generate_pages_recursive driven by an asyncio pipeline, so that reading,
+    rendering and writing overlap instead of running one page at a time.
+
+    Directory listings, reads and writes run on a thread pool; rendering runs
+    on a single thread, or across a process pool with workers > 1. The stages
+    are joined by queues of at most queue_size pages, so no more than a few
+    queues' worth of pages are held in memory however large the tree is.
+
+    Args:
+        io_workers (int, optional): Threads (and concurrent reads and writes)
+            used for file I/O. Defaults to 8.
+        queue_size (int, optional): Pages buffered between two stages before
+            the earlier stage waits. Defaults to 64.
+
+    Returns:
+        list: The page records of the pages rendered, in walk order.
+
+    Raises:
+        PageBuildError: If any page failed to build.
+    """
+    pipeline = BuildPipeline(template_path, basepath, manifest, workers, io_workers, queue_size)
+    pages, failures = asyncio.run(pipeline.run(dir_path_content, dest_dir_path))
+    record_pages(pages, template_path, basepath, manifest, depgraph, pipeline.digests)
+    if failures:
+        raise PageBuildError(failures)
+    return pages
+
+
+class BuildPipeline:
+    """
+    walk -> read -> render -> write, with each stage fed through a bounded
+    queue. Every queued item carries the index of its job in walk order, so
+    results come out in the same order as a serial build.
+    """
+    def __init__(self, template_path, basepath, manifest=None, workers=1, io_workers=8, queue_size=64):
+        self.template_path = template_path
+        self.basepath = basepath
+        self.manifest = manifest
+        self.workers = max(1, workers)
+        self.io_workers = max(1, io_workers)
+        self.queue_size = max(1, queue_size)
+        self.digests = {}
+        self.pages = []
+        self.failures = []
+        self._walked = 0
+
+    async def run(self, dir_path_content, dest_dir_path):
+        """
+        Returns:
+            tuple: (page records, (source path, error message) pairs), both in
+            walk order.
+        """
+        self.pages = []
+        self.failures = []
+        self._walked = 0
+        read_queue = asyncio.Queue(self.queue_size)
+        render_queue = asyncio.Queue(self.queue_size)
+        write_queue = asyncio.Queue(self.queue_size)
+
+        io_pool = ThreadPoolExecutor(max_workers=self.io_workers)
+        if self.workers > 1:
+            render_pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=init_worker,
+                initargs=worker_initargs(),
+            )
+        else:
+            render_pool = ThreadPoolExecutor(max_workers=1)
+
+        with io_pool, render_pool:
+            readers = [
+                asyncio.create_task(self._read(read_queue, render_queue, io_pool))
+                for _ in range(self.io_workers)
+            ]
+            renderers = [
+                asyncio.create_task(self._render(render_queue, write_queue, render_pool))
+                for _ in range(self.workers)
+            ]
+            writers = [
+                asyncio.create_task(self._write(write_queue, io_pool))
+                for _ in range(self.io_workers)
+            ]
+            await self._walk(dir_path_content, dest_dir_path, read_queue, io_pool)
+            await _finish(read_queue, readers)
+            await _finish(render_queue, renderers)
+            await _finish(write_queue, writers)
+
+        # Background writes must land before pages are reported as built.
+        write_errors = dict(writer.default_writer.flush())
+        for index, page in self.pages:
+            if page["dest"] in write_errors:
+                self.failures.append((index, page["source"], f"OSError: {write_errors[page['dest']]}"))
+        pages = sorted(
+            (item for item in self.pages if item[1]["dest"] not in write_errors),
+            key=lambda item: item[0],
+        )
+        failures = sorted(self.failures, key=lambda item: item[0])
+        return [page for _, page in pages], [(path, error) for _, path, error in failures]
+
+    async def _walk(self, dir_path, dest_dir_path, read_queue, io_pool):
+        """Queues every markdown file under dir_path, in collect_page_jobs order."""
+        loop = asyncio.get_running_loop()
+        entries = await loop.run_in_executor(io_pool, _list_dir, dir_path)
+        for name, is_file in entries:
+            from_path = os.path.join(dir_path, name)
+            dest_path = os.path.join(dest_dir_path, name)
+            if is_file:
+                await read_queue.put((self._walked, from_path, Path(dest_path).with_suffix(".html")))
+                self._walked += 1
+            else:
+                await self._walk(from_path, dest_path, read_queue, io_pool)
+
+    async def _read(self, read_queue, render_queue, io_pool):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await read_queue.get()
+            if job is None:
+                return
+            index, from_path, dest_path = job
+            try:
+                markdown = await loop.run_in_executor(io_pool, self._read_stale, from_path, dest_path)
+            except Exception as e:
+                self.failures.append((index, from_path, f"{type(e).__name__}: {e}"))
+                continue
+            if markdown is not None:
+                await render_queue.put((index, from_path, dest_path, markdown))
+
+    def _read_stale(self, from_path, dest_path):
+        """
+        Returns the markdown of a page, None if its output is up to date, or
+        STREAM if it is too large to read whole.
+        """
+        if self.manifest is not None:
+            images = self.manifest.images_of(dest_path)
+            digest = page_digest(self.manifest, from_path, self.template_path, self.basepath, images)
+            if self.manifest.is_fresh(dest_path, digest):
+                return None
+            self.digests[from_path] = digest
+        if should_stream(from_path):
+            return STREAM
+        with open(from_path, "r") as from_file:
+            return from_file.read()
+
+    async def _render(self, render_queue, write_queue, render_pool):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await render_queue.get()
+            if job is None:
+                return
+            index, from_path, dest_path, markdown = job
+            if markdown is STREAM:
+                try:
+                    page = await loop.run_in_executor(
+                        render_pool, generate_page, from_path, self.template_path, dest_path, self.basepath
+                    )
+                except Exception as e:
+                    self.failures.append((index, from_path, f"{type(e).__name__}: {e}"))
+                    continue
+                self.pages.append((index, page))
+                continue
+            logger.debug(" * %s %s -> %s", from_path, self.template_path, dest_path)
+            try:
+                html, title = await loop.run_in_executor(
+                    render_pool, render_page, markdown, self.template_path, self.basepath
+                )
+            except Exception as e:
+                self.failures.append((index, from_path, f"{type(e).__name__}: {e}"))
+                continue
+            await write_queue.put((index, page_record(from_path, dest_path, title, markdown), html))
+
+    async def _write(self, write_queue, io_pool):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await write_queue.get()
+            if job is None:
+                return
+            index, page, html = job
+            try:
+                await loop.run_in_executor(io_pool, writer.default_writer.write, page["dest"], html)
+            except Exception as e:
+                self.failures.append((index, page["source"], f"{type(e).__name__}: {e}"))
+                continue
+            self.pages.append((index, page))
+
+
+async def _finish(queue, tasks):
+    """Tells every task consuming queue to stop, then waits for them."""
+    for _ in tasks:
+        await queue.put(None)
+    await asyncio.gather(*tasks)
+
+
+def _list_dir(dir_path):
+    """Returns sorted (name, is_file) pairs for a directory's entries."""
+    with os.scandir(dir_path) as entries:
+        return sorted((entry.name, entry.is_file()) for entry in entries)
@@ -0,0 +1,129 @@
+import os
+from collections import OrderedDict
+
+
+# Bump when block rendering changes, so that blocks parsed by an older
+# renderer are never served from disk.
+RENDERER_VERSION = 2
+
+
+class BlockCache:
+    """
+    Cache of parsed markdown blocks, keyed by the block text.
+
+    Recently used subtrees are kept in a bounded in-memory LRU and shared by
+    every page that has the block, as trees are never modified once built.
+    The in-memory tier is keyed by the text itself, which costs no more than
+    a dict lookup on a miss. When disk_dir is set, every subtree is also
+    persisted there, in serialize_tree's format and under a hash of the
+    renderer version and the text (see key()), so later builds can reuse it.
+
+    The cache is off by default: on a typical site hardly any blocks repeat,
+    and holding on to the trees costs more than the few hits save. It pays
+    off for sites that share many blocks between pages, and with disk_dir
+    for rebuilds.
+    """
+    def __init__(self, maxsize=0, disk_dir=None):
+        """
+        Args:
+            maxsize (int, optional): Subtrees kept in memory. Defaults to 0 (none).
+            disk_dir (str, optional): Directory for the persistent tier. Defaults to None (memory only).
+        """
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 or self.disk_dir is not None
+
+    def key(self, block):
+        """The disk tier's name for block."""
+        import hashlib
+
+        h = hashlib.sha1(b"%d\0" % RENDERER_VERSION)
+        h.update(block.encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, block):
+        """Returns the cached subtree for the block text, or None on a miss."""
+        node = self._entries.get(block)
+        if node is not None:
+            self._entries.move_to_end(block)
+            self.hits += 1
+            return node
+        if self.disk_dir is not None:
+            # Imported here: only the opt-in disk tier serializes trees.
+            from treecache import deserialize_tree
+
+            try:
+                with open(self._disk_path(block), "rb") as f:
+                    node = deserialize_tree(f.read())
+            except (OSError, ValueError):
+                node = None
+            if node is not None:
+                self.disk_hits += 1
+                self._remember(block, node)
+                return node
+        self.misses += 1
+        return None
+
+    def put(self, block, node):
+        self._remember(block, node)
+        if self.disk_dir is not None:
+            from treecache import serialize_tree
+
+            try:
+                data = serialize_tree(node)
+            except TypeError:
+                return
+            path = self._disk_path(block)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def _remember(self, block, node):
+        if self.maxsize <= 0:
+            return
+        self._entries[block] = node
+        self._entries.move_to_end(block)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, block):
+        key = self.key(block)
+        return os.path.join(self.disk_dir, key[:2], key[2:] + ".tree")
+
+    def clear(self):
+        """Empties the in-memory tier and resets the statistics."""
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, disk_hits, misses, hit_rate and current size.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+
+block_cache = BlockCache()
+
+
+def configure_block_cache(maxsize=0, disk_dir=None):
+    """Replaces the settings of the shared block cache and empties it."""
+    block_cache.maxsize = maxsize
+    block_cache.disk_dir = disk_dir
+    block_cache.clear()
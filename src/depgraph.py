@@ -0,0 +1,112 @@
+import json
+import os
+import posixpath
+from urllib.parse import urlsplit
+
+from writer import write_json
+
+
+class DependencyGraph:
+    """
+    Records which input files every output depends on, so that a set of
+    changed paths can be mapped to the exact outputs that need rebuilding.
+
+    A page depends on its markdown source, its template, every static file
+    its images point at, and the markdown source of every page it links to.
+    Link and image targets are recorded even when they do not exist yet, so
+    that creating or renaming a file also invalidates the pages that refer
+    to it.
+    """
+    def __init__(self, path, content_dir, static_dir, deps=None, sources=None):
+        """
+        Args:
+            path (str): Where the graph is stored as JSON.
+            content_dir (str): Markdown source directory, for resolving links.
+            static_dir (str): Static asset directory, for resolving images.
+            deps (dict, optional): Output path -> list of input paths.
+            sources (dict, optional): Page output path -> markdown source path.
+        """
+        self.path = path
+        self.content_dir = os.path.normpath(content_dir)
+        self.static_dir = os.path.normpath(static_dir)
+        self.deps = deps if deps is not None else {}
+        self.sources = sources if sources is not None else {}
+        self._dependents = None
+
+    @classmethod
+    def load(cls, path, content_dir, static_dir):
+        """Loads a graph from disk, or returns an empty one if there is none."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        return cls(path, content_dir, static_dir, data.get("deps"), data.get("sources"))
+
+    def save(self):
+        write_json(self.path, {"deps": self.deps, "sources": self.sources}, indent=0, sort_keys=True)
+
+    def record(self, output, inputs):
+        """Replaces the inputs recorded for output."""
+        self.deps[os.path.normpath(output)] = sorted({os.path.normpath(p) for p in inputs})
+        self._dependents = None
+
+    def record_page(self, page, template_path):
+        """Records the inputs of a rendered page from its page record."""
+        source = page["source"]
+        inputs = [source, template_path]
+        for url in page["images"]:
+            inputs.extend(self.resolve(source, url, pages=False))
+        for url in page["links"]:
+            inputs.extend(self.resolve(source, url, pages=True))
+        self.record(page["dest"], inputs)
+        self.sources[os.path.normpath(page["dest"])] = os.path.normpath(source)
+
+    def remove(self, output):
+        output = os.path.normpath(output)
+        self.sources.pop(output, None)
+        if self.deps.pop(output, None) is not None:
+            self._dependents = None
+
+    def resolve(self, source, url, pages):
+        """
+        Maps a link or image URL found in source to the input paths it may
+        refer to: a static file, and for links also a markdown page. External
+        URLs resolve to nothing.
+        """
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return []
+        url_path = parts.path
+        if not url_path.startswith("/"):
+            rel_source = os.path.relpath(source, self.content_dir).replace(os.sep, "/")
+            url_path = posixpath.join("/", posixpath.dirname(rel_source), url_path)
+        url_path = posixpath.normpath(url_path).lstrip("/")
+        if url_path.startswith(".."):
+            return []
+        if url_path in ("", "."):
+            return [os.path.join(self.content_dir, "index.md")] if pages else []
+        candidates = [os.path.join(self.static_dir, url_path)]
+        if pages:
+            page_path = url_path[:-len(".html")] if url_path.endswith(".html") else url_path
+            candidates.append(os.path.join(self.content_dir, page_path + ".md"))
+            candidates.append(os.path.join(self.content_dir, page_path, "index.md"))
+        return candidates
+
+    def affected(self, changed_paths):
+        """Returns the outputs that depend on any of changed_paths."""
+        if self._dependents is None:
+            self._dependents = {}
+            for output, inputs in self.deps.items():
+                for input_path in inputs:
+                    self._dependents.setdefault(input_path, set()).add(output)
+        outputs = set()
+        for path in changed_paths:
+            outputs.update(self._dependents.get(os.path.normpath(path), ()))
+        return outputs
+
+    def source_of(self, output):
+        """Returns the markdown source a page output was rendered from, if recorded."""
+        return self.sources.get(os.path.normpath(output))
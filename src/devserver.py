@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import imagemeta
+import writer
+from copystatic import sync_file
+from gencontent import generate_page, page_digest
+
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot(paths):
+    """
+    Returns path -> (mtime_ns, size) for every file under the given files
+    and directories.
+    """
+    state = {}
+    for path in paths:
+        path = os.path.normpath(path)
+        if os.path.isdir(path):
+            _snapshot_dir(path, state)
+        elif os.path.isfile(path):
+            try:
+                stat = os.stat(path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def _snapshot_dir(dir_path, state):
+    # Files and directories may vanish while they are listed (an editor's
+    # swap files, say); they are left out, as if already deleted.
+    try:
+        entries = os.scandir(dir_path)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    _snapshot_dir(entry.path, state)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+
+def changed_paths(old, new):
+    """Returns the paths added, modified or removed between two snapshots."""
+    changed = {path for path, sig in new.items() if old.get(path) != sig}
+    changed.update(path for path in old if path not in new)
+    return changed
+
+
+class SiteWatcher:
+    """
+    Polls the content, static and template inputs of a site and regenerates
+    only the outputs affected by each batch of changes.
+    """
+    def __init__(self, content_dir, static_dir, template_path, dest_dir, basepath,
+                 manifest, depgraph, interval=0.05, debounce=0.03, copy_mode="copy", processor=None):
+        """
+        Args:
+            content_dir (str): Markdown source directory.
+            static_dir (str): Static asset directory.
+            template_path (str): Page template file.
+            dest_dir (str): Output directory.
+            basepath (str): Basepath passed to generate_page.
+            manifest (BuildManifest): Manifest from the initial build; kept up to date.
+            depgraph (DependencyGraph): Dependency graph from the initial build; kept up to date.
+            interval (float, optional): Seconds between polls. Defaults to 0.05.
+            debounce (float, optional): Quiet period that ends a burst of changes. Defaults to 0.03.
+            copy_mode (str, optional): How static files are transferred, see copy_files_recursive.
+            processor (OutputProcessor, optional): Minifies and compresses
+                every output a rebuild writes, as the initial build did.
+        """
+        self.content_dir = os.path.normpath(content_dir)
+        self.static_dir = os.path.normpath(static_dir)
+        self.template_path = os.path.normpath(template_path)
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.manifest = manifest
+        self.depgraph = depgraph
+        self.interval = interval
+        self.debounce = debounce
+        self.copy_mode = copy_mode
+        self.processor = processor
+        self.state = snapshot(self._watched())
+
+    def _watched(self):
+        return (self.content_dir, self.static_dir, self.template_path)
+
+    def poll(self):
+        """
+        Waits for a burst of changes to settle and returns the changed paths,
+        or an empty set if nothing changed since the last poll.
+        """
+        new_state = snapshot(self._watched())
+        changed = changed_paths(self.state, new_state)
+        while changed:
+            time.sleep(self.debounce)
+            settled_state = snapshot(self._watched())
+            more = changed_paths(new_state, settled_state)
+            new_state = settled_state
+            if not more:
+                break
+            changed |= more
+        self.state = new_state
+        return changed
+
+    def rebuild(self, changed):
+        """
+        Regenerates the pages and assets affected by the changed paths.
+
+        Returns:
+            int: The number of outputs written or removed.
+        """
+        for path in changed:
+            self.manifest.invalidate(path)
+        metadata = imagemeta.image_metadata
+        if metadata.enabled and any(_is_within(path, self.static_dir) for path in changed):
+            # Pages showing a changed image are affected through the dependency graph.
+            metadata.scan()
+
+        count = 0
+        pages = []
+        for from_path, dest_path in self.affected_pages(changed):
+            if not os.path.isfile(from_path):
+                self.manifest.remove(dest_path)
+                self.depgraph.remove(dest_path)
+                count += 1
+                continue
+            try:
+                pages.append(generate_page(from_path, self.template_path, dest_path, self.basepath))
+            except Exception as e:
+                logger.error("Error building %s: %s: %s", from_path, type(e).__name__, e)
+
+        written = []
+        write_errors = dict(writer.default_writer.flush())
+        for page in pages:
+            if page["dest"] in write_errors:
+                logger.error("Error writing %s: %s", page["dest"], write_errors[page["dest"]])
+                continue
+            images = page["images"] if metadata.enabled else None
+            digest = page_digest(self.manifest, page["source"], self.template_path, self.basepath, images)
+            self.manifest.record(page["dest"], digest, images)
+            self.depgraph.record_page(page, self.template_path)
+            written.append(page["dest"])
+            count += 1
+
+        for from_path in sorted(changed):
+            if not _is_within(from_path, self.static_dir):
+                continue
+            dest_path = os.path.join(self.dest_dir, os.path.relpath(from_path, self.static_dir))
+            if not os.path.isfile(from_path):
+                self.manifest.remove(dest_path)
+            else:
+                logger.debug(" * %s -> %s", from_path, dest_path)
+                try:
+                    signature = sync_file(from_path, dest_path, self.copy_mode)
+                except OSError as e:
+                    logger.error("Error copying %s: %s", from_path, e)
+                    continue
+                self.manifest.record(dest_path, signature)
+                written.append(dest_path)
+            count += 1
+
+        if self.processor is not None and written:
+            self.processor.process(written)
+        return count
+
+    def affected_pages(self, changed):
+        """
+        Returns sorted (source, dest) jobs for every page whose output depends
+        on one of the changed paths, including pages that were just added.
+        """
+        jobs = {}
+        for dest_path in self.depgraph.affected(changed):
+            from_path = self.depgraph.source_of(dest_path)
+            if from_path is not None:
+                jobs[from_path] = dest_path
+        for path in changed:
+            if _is_within(path, self.content_dir) and path not in jobs:
+                jobs[path] = self._page_dest(path)
+        return sorted(jobs.items())
+
+    def _page_dest(self, from_path):
+        rel_path = os.path.relpath(from_path, self.content_dir)
+        return Path(os.path.join(self.dest_dir, rel_path)).with_suffix(".html")
+
+    def run(self, stop_event=None):
+        """Polls and rebuilds until stop_event is set (or forever)."""
+        while stop_event is None or not stop_event.is_set():
+            try:
+                changed = self.poll()
+                if changed:
+                    started = time.perf_counter()
+                    count = self.rebuild(changed)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    logger.info("Rebuilt %d output(s) in %.1f ms", count, elapsed)
+            except Exception as e:
+                # Keep watching: the next change gets another rebuild.
+                logger.error("Rebuild failed: %s: %s", type(e).__name__, e)
+            time.sleep(self.interval)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(directory, host="", port=8888):
+    """
+    Serves directory over HTTP from a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    handler = partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _is_within(path, dir_path):
+    return path.startswith(dir_path + os.sep)
@@ -0,0 +1,141 @@
+import re
+
+
+DELIMITER = "---"
+
+KEY_PATTERN = re.compile(r"^([A-Za-z_][A-Za-z0-9_-]*):(?:\s+(.*))?$")
+
+
+def split_front_matter(markdown):
+    """
+    Separates a front-matter block from the markdown that follows it.
+
+    Front matter is a block of "key: value" lines between two "---" lines at
+    the very start of the document, in a small subset of YAML: values are
+    strings (optionally quoted), true/false, or lists, written either inline
+    as [a, b] or as "- item" lines under an empty key. A document only has
+    front matter if its "---" line is followed by a "key: value" line and
+    closed by another "---" line; otherwise the "---" is part of the body,
+    such as a horizontal rule.
+
+    Returns:
+        tuple: (metadata dict, markdown body)
+
+    Raises:
+        ValueError: If the front matter is malformed, or title, date, tags or
+            draft has a value of the wrong kind.
+    """
+    if not markdown.startswith(DELIMITER + "\n"):
+        return {}, markdown
+    first_line = markdown[len(DELIMITER) + 1:].partition("\n")[0]
+    if KEY_PATTERN.match(first_line) is None:
+        return {}, markdown
+    end = markdown.find("\n" + DELIMITER + "\n", len(DELIMITER))
+    if end == -1:
+        if not markdown.endswith("\n" + DELIMITER):
+            return {}, markdown
+        end = len(markdown) - len(DELIMITER) - 1
+    block = markdown[len(DELIMITER) + 1:end]
+    body = markdown[end + len(DELIMITER) + 2:]
+    return parse_front_matter(block), body
+
+
+def read_front_matter(fp):
+    """
+    Reads a front-matter block from the start of a text file object, leaving
+    fp at the start of the body; the same as split_front_matter, without
+    reading the body.
+
+    Returns:
+        dict: The metadata, empty if there is no front matter (and fp is
+        back where it started).
+    """
+    start = fp.tell()
+    if fp.readline() != DELIMITER + "\n":
+        fp.seek(start)
+        return {}
+    lines = []
+    while True:
+        line = fp.readline()
+        if line == "" or (not lines and KEY_PATTERN.match(line.rstrip("\n")) is None):
+            fp.seek(start)
+            return {}
+        if line in (DELIMITER + "\n", DELIMITER):
+            return parse_front_matter("".join(lines))
+        lines.append(line)
+
+
+def parse_front_matter(block):
+    """Parses the lines between the front-matter delimiters into a dict."""
+    meta = {}
+    key = None
+    for number, line in enumerate(block.split("\n"), 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None and isinstance(meta[key], (list, type(None))):
+            if meta[key] is None:
+                meta[key] = []
+            meta[key].append(_scalar(stripped[2:]))
+            continue
+        match = KEY_PATTERN.match(line)
+        if match is None:
+            raise ValueError(f"front matter line {number} is not 'key: value': {line!r}")
+        key, value = match.group(1), (match.group(2) or "").strip()
+        if value == "":
+            meta[key] = None
+        elif value.startswith("[") and value.endswith("]"):
+            meta[key] = [_scalar(item) for item in value[1:-1].split(",") if item.strip()]
+        else:
+            meta[key] = _scalar(value)
+    return _check_known_keys({key: value for key, value in meta.items() if value is not None})
+
+
+def _scalar(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if text in ("true", "false"):
+        return text == "true"
+    return text
+
+
+def _check_known_keys(meta):
+    if "title" in meta and not isinstance(meta["title"], str):
+        raise ValueError("front matter title must be a string")
+    if "date" in meta:
+        if not isinstance(meta["date"], str):
+            raise ValueError("front matter date must be an ISO 8601 date")
+        parse_date(meta["date"])
+    if "tags" in meta:
+        tags = meta["tags"]
+        if isinstance(tags, str):
+            tags = [tags]
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            raise ValueError("front matter tags must be a list of strings")
+        meta["tags"] = tags
+    if "draft" in meta and not isinstance(meta["draft"], bool):
+        raise ValueError("front matter draft must be true or false")
+    return meta
+
+
+def parse_date(text):
+    """
+    Parses an ISO 8601 date or date-time.
+
+    Returns:
+        datetime: Midnight for a bare date.
+
+    Raises:
+        ValueError: If text is not a valid date.
+    """
+    # Imported here: most pages have no date, and render-one and check
+    # start faster without it.
+    from datetime import date, datetime
+
+    try:
+        if len(text) == 10:
+            return datetime.combine(date.fromisoformat(text), datetime.min.time())
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"invalid date: {text!r}") from None
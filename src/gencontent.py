@@ -1,48 +1,422 @@
+import logging
 import os
+import sys
+import time
+from functools import partial
 from pathlib import Path
-from markdown_blocks import markdown_to_html_node
+import profiling
+from blockcache import block_cache, configure_block_cache
+from frontmatter import read_front_matter, split_front_matter
+from inline_markdown import extract_markdown_images, extract_markdown_links
+from markdown_blocks import BlockType, iter_block_spans, iter_blocks_html, iter_markdown_blocks
+from template import load_template
+from treecache import cached_markdown_to_html_node, configure_tree_cache, tree_cache
 
+# imagemeta, writer and manifest are imported where they are used, so that
+# render-one and check, which only render, start without them.
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    for filename in os.listdir(dir_path_content):
+
+logger = logging.getLogger(__name__)
+
+# Markdown files larger than this many bytes are rendered by streaming (see
+# generate_page_streaming). 0 streams nothing.
+stream_threshold = 32 << 20
+
+
+def configure_streaming(threshold):
+    global stream_threshold
+    stream_threshold = threshold
+
+
+def active_image_metadata():
+    """
+    The shared ImageMetadata if image metadata is enabled, else None.
+
+    Whatever enables it (configure_image_metadata) has imported imagemeta
+    first, so when it was never imported it can't be enabled, and renders
+    without it don't load it.
+    """
+    imagemeta = sys.modules.get("imagemeta")
+    if imagemeta is None or not imagemeta.image_metadata.enabled:
+        return None
+    return imagemeta.image_metadata
+
+
+class PageBuildError(Exception):
+    """Raised after a build when one or more pages failed to render."""
+    def __init__(self, failures):
+        """
+        Args:
+            failures (list): (source path, error message) pairs, in job order.
+        """
+        self.failures = failures
+        lines = [f"{len(failures)} page(s) failed to build:"]
+        lines.extend(f"  {path}: {message}" for path, message in failures)
+        super().__init__("\n".join(lines))
+
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath,
+                             manifest=None, workers=1, chunksize=None, depgraph=None):
+    """
+    Renders every markdown file under dir_path_content into dest_dir_path.
+
+    When a BuildManifest is given, pages whose markdown, template and basepath
+    are unchanged since the last build are skipped. With workers > 1 the pages
+    are rendered across a process pool. When a DependencyGraph is given, the
+    inputs of every rendered page are recorded in it.
+
+    Returns:
+        list: The page records (see generate_page) of the pages rendered.
+    """
+    jobs = collect_page_jobs(dir_path_content, dest_dir_path)
+    digests = {}
+    if manifest is not None:
+        stale_jobs = []
+        for from_path, dest_path in jobs:
+            digest = page_digest(manifest, from_path, template_path, basepath, manifest.images_of(dest_path))
+            if manifest.is_fresh(dest_path, digest):
+                continue
+            digests[from_path] = digest
+            stale_jobs.append((from_path, dest_path))
+        jobs = stale_jobs
+
+    pages, failures = generate_pages(jobs, template_path, basepath, workers, chunksize)
+    record_pages(pages, template_path, basepath, manifest, depgraph, digests)
+    if failures:
+        raise PageBuildError(failures)
+    return pages
+
+
+def record_pages(pages, template_path, basepath, manifest=None, depgraph=None, digests=None):
+    """
+    Records rendered pages in the manifest (under their digest in digests,
+    keyed by source path) and in the dependency graph.
+    """
+    with_images = active_image_metadata() is not None
+    for page in pages:
+        if manifest is not None:
+            digest = digests[page["source"]]
+            images = None
+            if with_images:
+                images = page["images"]
+                if images != manifest.images_of(page["dest"]):
+                    # The digest covered the images the page showed when it was last built.
+                    digest = page_digest(manifest, page["source"], template_path, basepath, images)
+            manifest.record(page["dest"], digest, images)
+        if depgraph is not None:
+            depgraph.record_page(page, template_path)
+
+
+def collect_page_jobs(dir_path_content, dest_dir_path):
+    """
+    Walks the content tree and returns (source path, destination path) pairs
+    in a stable, sorted order.
+    """
+    jobs = []
+    for filename in sorted(os.listdir(dir_path_content)):
         from_path = os.path.join(dir_path_content, filename)
         dest_path = os.path.join(dest_dir_path, filename)
         if os.path.isfile(from_path):
-            dest_path = Path(dest_path).with_suffix(".html")
-            generate_page(from_path, template_path, dest_path, basepath)
+            jobs.append((from_path, Path(dest_path).with_suffix(".html")))
         else:
-            generate_pages_recursive(from_path, template_path, dest_path, basepath)
+            jobs.extend(collect_page_jobs(from_path, dest_path))
+    return jobs
+
+
+def generate_pages(jobs, template_path, basepath, workers=1, chunksize=None):
+    """
+    Renders a list of page jobs, serially or across a process pool.
+
+    Every page is attempted even if some fail.
+
+    Returns:
+        tuple: (page records of the pages rendered, (source path, error
+        message) pairs for the pages that failed), both in job order.
+    """
+    import writer
+
+    render = partial(_render_job, template_path=template_path, basepath=basepath)
+    if workers <= 1 or len(jobs) <= 1:
+        results = map(render, jobs)
+    else:
+        # Imported here: it pulls in multiprocessing, which serial builds
+        # and single-page commands never need.
+        from concurrent.futures import ProcessPoolExecutor
+
+        if chunksize is None:
+            chunksize = max(1, len(jobs) // (workers * 4))
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=worker_initargs(),
+        )
+        with executor:
+            results = list(executor.map(render, jobs, chunksize=chunksize))
+    # Background writes must land before pages are reported as built.
+    results = list(results)
+    write_errors = dict(writer.default_writer.flush())
+    pages = []
+    failures = []
+    for job, (page, error) in zip(jobs, results):
+        if error is None and page["dest"] in write_errors:
+            error = f"OSError: {write_errors[page['dest']]}"
+        if error is None:
+            pages.append(page)
+        else:
+            failures.append((job[0], error))
+    return pages, failures
+
+
+def worker_initargs():
+    """Arguments for init_worker that carry this process's settings into a worker."""
+    import writer
+
+    metadata = active_image_metadata()
+    return (
+        block_cache.maxsize,
+        block_cache.disk_dir,
+        tree_cache.disk_dir,
+        metadata.static_dir if metadata is not None else None,
+        metadata.state_path if metadata is not None else None,
+        writer.default_writer.buffer_size,
+        stream_threshold,
+    )
+
+
+def init_worker(block_cache_size, block_cache_dir, tree_cache_dir, image_static_dir,
+                image_state_path, write_buffer_size, streaming_threshold):
+    """Process pool initializer for page rendering workers."""
+    import writer
+
+    configure_block_cache(block_cache_size, block_cache_dir)
+    configure_tree_cache(tree_cache_dir)
+    configure_streaming(streaming_threshold)
+    if image_static_dir is not None:
+        import imagemeta
+
+        # The parent scanned and saved the image sizes before starting the pool.
+        imagemeta.configure_image_metadata(image_static_dir, image_state_path)
+    # Workers write in the foreground: a writer thread inherited through fork
+    # would not exist in the child, and each worker is already off the main
+    # process's critical path.
+    writer.default_writer = writer.OutputWriter(write_buffer_size)
+
+
+def _render_job(job, template_path, basepath):
+    from_path, dest_path = job
+    try:
+        return generate_page(from_path, template_path, dest_path, basepath), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def page_digest(manifest, from_path, template_path, basepath, images=None):
+    """
+    Digest of every input that affects a rendered page.
+
+    With image metadata enabled, that includes the sizes of the images the
+    page shows. images lists their URLs, such as the ones the manifest
+    recorded for the page: those are the images of the markdown the page
+    was built from, and if the markdown has changed since, so has its
+    digest. When images is None, they are found by reading the markdown.
+    """
+    from manifest import combine_digests
+
+    parts = [manifest.file_digest(from_path), manifest.file_digest(template_path), basepath]
+    metadata = active_image_metadata()
+    if metadata is not None:
+        if images is None:
+            with open(from_path, "r") as f:
+                images = [url for _, block in iter_markdown_blocks(f) for _, url in extract_markdown_images(block)]
+        parts.append(metadata.signature(images))
+    return combine_digests(*parts)
 
 
 def generate_page(from_path, template_path, dest_path, basepath):
-    print(f" * {from_path} {template_path} -> {dest_path}")
+    """
+    Renders one markdown file through the template into dest_path.
+
+    Returns:
+        dict: A page record with the source and dest paths, the page title,
+        the front-matter metadata and the link and image targets found in the
+        markdown.
+    """
+    import writer
+
+    logger.debug(" * %s %s -> %s", from_path, template_path, dest_path)
+    profile = profiling.active_profile
+    if profile is not None:
+        return _generate_page_profiled(profile, from_path, template_path, dest_path, basepath)
+
+    template = load_template(template_path, basepath)
+    if should_stream(from_path) and is_streamable(template):
+        return generate_page_streaming(from_path, template_path, dest_path, basepath)
+
     from_file = open(from_path, "r")
     markdown_content = from_file.read()
     from_file.close()
 
-    template_file = open(template_path, "r")
-    template = template_file.read()
-    template_file.close()
+    meta, body = split_front_matter(markdown_content)
+    node = cached_markdown_to_html_node(body)
+    title = page_title(meta, body)
+
+    with writer.default_writer.open(dest_path) as to_file:
+        template.write(to_file, {"Title": title, "Content": page_content(node)})
+    return page_record(from_path, dest_path, title, markdown_content)
+
+
+def should_stream(from_path):
+    """Whether a markdown file is large enough to be rendered by streaming."""
+    return stream_threshold > 0 and os.path.getsize(from_path) > stream_threshold
+
+
+def is_streamable(template):
+    """Whether a template can take its content as a one-pass stream of chunks."""
+    return sum(1 for name, _, _ in template.slots if name == "Content") == 1
+
+
+def generate_page_streaming(from_path, template_path, dest_path, basepath, chunk_size=1 << 16):
+    """
+    generate_page for markdown too large to hold in memory. The file is read
+    in chunks, and every block is rendered and written out as soon as it is
+    complete, so memory use is bounded by the largest block rather than the
+    whole document. The page is the same as generate_page writes, except
+    that links and images are only found within blocks.
+
+    Returns:
+        dict: A page record, see generate_page.
+    """
+    import writer
+
+    template = load_template(template_path, basepath)
+    if not is_streamable(template):
+        raise ValueError("templates that use {{ Content }} more than once can't be streamed")
+
+    links = []
+    images = []
+
+    def collect_urls(blocks):
+        for block_type, block in blocks:
+            links.extend(url for _, url in extract_markdown_links(block))
+            images.extend(url for _, url in extract_markdown_images(block))
+            yield block_type, block
 
-    node = markdown_to_html_node(markdown_content)
-    html = node.to_html()
+    with open(from_path, "r") as from_file:
+        meta = read_front_matter(from_file)
+        body_start = from_file.tell()
+        title = meta.get("title") or _find_title(from_file)
+        from_file.seek(body_start)
+        content = iter_blocks_html(collect_urls(iter_markdown_blocks(from_file, chunk_size)))
+        if active_image_metadata() is not None:
+            from imagemeta import annotate_images
 
-    title = extract_title(markdown_content)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
-    template = template.replace('href="/', 'href="' + basepath)
-    template = template.replace('src="/', 'src="' + basepath)
+            content = annotate_images(content)
+        with writer.default_writer.open(dest_path, stream=True) as to_file:
+            template.write(to_file, {"Title": title, "Content": content})
+    return {
+        "source": str(from_path),
+        "dest": str(dest_path),
+        "title": title,
+        "meta": meta,
+        "links": links,
+        "images": images,
+    }
 
-    dest_dir_path = os.path.dirname(dest_path)
-    if dest_dir_path != "":
-        os.makedirs(dest_dir_path, exist_ok=True)
-    to_file = open(dest_path, "w")
-    to_file.write(template)
+
+def _find_title(fp):
+    """extract_title for a file, reading it only up to the title block."""
+    for block_type, block in iter_markdown_blocks(fp):
+        if block_type == BlockType.HEADING and block.startswith("# "):
+            return block[2:].partition("\n")[0]
+    raise ValueError("no title found")
+
+
+def _generate_page_profiled(profile, from_path, template_path, dest_path, basepath):
+    """
+    generate_page with every stage timed separately. The page is rendered
+    into memory first, since streaming would interleave to_html, templating
+    and write.
+    """
+    import writer
+
+    started = time.perf_counter()
+    with profile.stage("read"):
+        with open(from_path, "r") as from_file:
+            markdown_content = from_file.read()
+
+    meta, body = split_front_matter(markdown_content)
+    node = cached_markdown_to_html_node(body)
+    with profile.stage("to_html"):
+        html = node.to_html()
+        metadata = active_image_metadata()
+        if metadata is not None:
+            html = metadata.annotate(html)
+
+    with profile.stage("templating"):
+        template = load_template(template_path, basepath)
+        title = page_title(meta, body)
+        page = template.render({"Title": title, "Content": html})
+
+    with profile.stage("write"):
+        writer.default_writer.write(dest_path, page)
+    profile.record_page(from_path, time.perf_counter() - started)
+    return page_record(from_path, dest_path, title, markdown_content)
+
+
+def render_page(markdown_content, template_path, basepath):
+    """
+    Renders markdown through the template into a string.
+
+    Returns:
+        tuple: (page HTML, page title)
+    """
+    template = load_template(template_path, basepath)
+    meta, body = split_front_matter(markdown_content)
+    node = cached_markdown_to_html_node(body)
+    title = page_title(meta, body)
+    return template.render({"Title": title, "Content": page_content(node)}), title
+
+
+def page_content(node):
+    """
+    The Content value for a page template: the node's HTML chunks, with
+    image tags annotated when image metadata is enabled.
+    """
+    if active_image_metadata() is not None:
+        from imagemeta import annotate_images
+
+        return lambda: annotate_images(node.iter_html())
+    return node.iter_html
+
+
+def page_record(from_path, dest_path, title, markdown):
+    meta, body = split_front_matter(markdown)
+    return {
+        "source": str(from_path),
+        "dest": str(dest_path),
+        "title": title,
+        "meta": meta,
+        "links": [url for _, url in extract_markdown_links(body)],
+        "images": [url for _, url in extract_markdown_images(body)],
+    }
 
 
 def extract_title(md):
-    lines = md.split("\n")
-    for line in lines:
-        if line.startswith("# "):
-            return line[2:]
-    raise ValueError("no title found")
\ No newline at end of file
+    """
+    The text of the first h1 block of md. The block scanner stops at that
+    block, and "# " lines inside code fences (shell comments, say) are not
+    headings.
+    """
+    for block_type, start, end in iter_block_spans(md):
+        if block_type == BlockType.HEADING and md.startswith("# ", start):
+            line_end = md.find("\n", start, end)
+            return md[start + 2:end if line_end == -1 else line_end]
+    raise ValueError("no title found")
+
+
+def page_title(meta, body):
+    """The front-matter title if there is one, else the body's first "# " heading."""
+    title = meta.get("title")
+    if title:
+        return title
+    return extract_title(body)
\ No newline at end of file
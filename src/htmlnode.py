@@ -1,5 +1,33 @@
+class _EmptyChildren(list):
+    """Read-only empty list shared by every node without children."""
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("shared empty children list is read-only; assign a new list instead")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+
+class _EmptyProps(dict):
+    """Read-only empty dict shared by every node without attributes."""
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("shared empty props dict is read-only; assign a new dict instead")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+
+EMPTY_CHILDREN = _EmptyChildren()
+EMPTY_PROPS = _EmptyProps()
+
+
 class HTMLNode:
     """Base class for all HTML nodes."""
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         """
         Initializes an HTML node.
@@ -7,13 +35,13 @@ class HTMLNode:
         Args:
             tag (str, optional): The HTML tag name. Defaults to None.
             value (str, optional): The text content of the node. Defaults to None.
-            children (list, optional): A list of child nodes. Defaults to [].
-            props (dict, optional): A dictionary of attributes/properties for the node. Defaults to {}.
+            children (list, optional): A list of child nodes. Defaults to a shared, read-only [].
+            props (dict, optional): A dictionary of attributes/properties for the node. Defaults to a shared, read-only {}.
         """
         self.tag = tag
         self.value = value
-        self.children = children if children is not None else []
-        self.props = props if props is not None else {}
+        self.children = children if children is not None else EMPTY_CHILDREN
+        self.props = props if props is not None else EMPTY_PROPS
 
     def to_html(self):
         """
@@ -22,6 +50,23 @@ class HTMLNode:
         """
         raise NotImplementedError("This method should be overridden by subclasses")
 
+    def iter_html(self):
+        """
+        Generates the HTML representation as a sequence of string chunks.
+
+        Subclasses may override this to avoid building the whole string.
+        """
+        yield self.to_html()
+
+    def write_html(self, fp):
+        """
+        Writes the HTML representation to a text file object chunk by chunk.
+
+        Args:
+            fp: Any object with a writelines() method, such as an open file.
+        """
+        fp.writelines(self.iter_html())
+
     def props_to_html(self):
         """
         Generates a string representing the attributes of the node.
@@ -42,6 +87,8 @@ class HTMLNode:
 
 class LeafNode(HTMLNode):
     """Represents a leaf node in the HTML tree (no children)."""
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         """
         Initializes a LeafNode.
@@ -58,7 +105,6 @@ class LeafNode(HTMLNode):
             raise ValueError("Value must be provided for a LeafNode.")
         
         super().__init__(tag, value, None, props)
-        self.children = []  # Ensure no children are allowed
 
     def to_html(self):
         """
@@ -80,6 +126,8 @@ class LeafNode(HTMLNode):
 
 class ParentNode(HTMLNode):
     """Represents a parent node in the HTML tree (with children)."""
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         """
         Initializes a ParentNode.
@@ -104,15 +152,41 @@ class ParentNode(HTMLNode):
 
     def to_html(self):
         """
-        Generates the HTML representation of the parent node and its children recursively.
+        Generates the HTML representation of the parent node and its children.
 
         Returns:
             str: The HTML string representing the parent node and its children.
         """
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        """
+        Generates the HTML of this subtree as chunks, without building
+        intermediate strings for nested elements.
+
+        The tree is walked with an explicit stack, so deep documents do not
+        recurse once per level.
+
+        Yields:
+            str: Opening tags, leaf HTML and closing tags, in document order.
+        """
+        yield self._opening_tag()
+        pending = [iter(self.children)]
+        closing_tags = [f"</{self.tag}>"]
+        while pending:
+            child = next(pending[-1], None)
+            if child is None:
+                pending.pop()
+                yield closing_tags.pop()
+            elif isinstance(child, ParentNode):
+                yield child._opening_tag()
+                pending.append(iter(child.children))
+                closing_tags.append(f"</{child.tag}>")
+            else:
+                yield from child.iter_html()
+
+    def _opening_tag(self):
         attrs_str = ' '.join(f'{key}="{value}"' for key, value in self.props.items())
         if attrs_str:
             attrs_str = ' ' + attrs_str
-        opening_tag = f"<{self.tag}{attrs_str}>"
-        closing_tag = f"</{self.tag}>"
-        children_html = "".join(child.to_html() for child in self.children)
-        return f"{opening_tag}{children_html}{closing_tag}"
+        return f"<{self.tag}{attrs_str}>"
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import re
+import struct
+from urllib.parse import unquote, urlsplit
+
+from writer import write_json
+
+
+STATE_VERSION = 1
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+# Every <img> the renderer emits starts with its src attribute.
+IMG_SRC_PATTERN = re.compile(r'<img src="([^"]*)"')
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers, which carry the image size. C4, C8 and CC
+# share the range but are not frames.
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field.
+JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+
+
+def image_size(path):
+    """
+    Reads the pixel size of a PNG, JPEG, GIF or WebP image from its header,
+    without decoding it.
+
+    Returns:
+        tuple: (width, height), or None if the format is not recognised or
+        the header is damaged.
+    """
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return _webp_size(head)
+        if head[:2] == b"\xff\xd8":
+            return _jpeg_size(f)
+    return None
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def _jpeg_size(f):
+    """Walks the JPEG segments, seeking past their payloads, until a frame header."""
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack(">H", header)[0]
+        if marker in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        if marker == 0xDA:
+            # Start of scan: the compressed data follows, no frame header came first.
+            return None
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+class ImageMetadata:
+    """
+    Pixel sizes of the images under the static directory, used to give every
+    generated <img> tag width and height attributes (so browsers can reserve
+    its space) plus loading="lazy" and decoding="async".
+
+    Sizes are cached in a JSON state file by content hash, and each file's
+    hash by its size and mtime, so a rescan only hashes and reads the
+    headers of files that changed since the last build.
+    """
+    def __init__(self, static_dir=None, state_path=None, files=None, sizes=None):
+        """
+        Args:
+            static_dir (str, optional): Static asset directory. Defaults to None (disabled).
+            state_path (str, optional): JSON file the cache is kept in.
+            files (dict, optional): Relative path -> [size, mtime_ns, sha1].
+            sizes (dict, optional): sha1 -> [width, height], or None if unreadable.
+        """
+        self.static_dir = static_dir
+        self.state_path = state_path
+        self.files = files if files is not None else {}
+        self.sizes = sizes if sizes is not None else {}
+
+    @property
+    def enabled(self):
+        return self.static_dir is not None
+
+    @classmethod
+    def load(cls, static_dir, state_path):
+        """Loads the cached sizes, or returns an empty cache if there are none."""
+        try:
+            with open(state_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+            data = {}
+        return cls(static_dir, state_path, data.get("files"), data.get("sizes"))
+
+    def save(self):
+        write_json(self.state_path, {"version": STATE_VERSION, "files": self.files, "sizes": self.sizes})
+
+    def scan(self, workers=8):
+        """
+        Brings the cache up to date with the static directory.
+
+        Returns:
+            int: The number of images that were (re)read.
+        """
+        found = {}
+        for dir_path, _, filenames in os.walk(self.static_dir):
+            for filename in filenames:
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(dir_path, filename)
+                    rel_path = os.path.relpath(path, self.static_dir).replace(os.sep, "/")
+                    stat = os.stat(path)
+                    found[rel_path] = (path, stat.st_size, stat.st_mtime_ns)
+
+        stale = [
+            rel_path for rel_path, (_, size, mtime_ns) in found.items()
+            if self.files.get(rel_path, [None, None])[:2] != [size, mtime_ns]
+        ]
+
+        def read(rel_path):
+            path = found[rel_path][0]
+            h = hashlib.sha1()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            if digest in self.sizes:
+                return digest, self.sizes[digest]
+            try:
+                size = image_size(path)
+            except (OSError, struct.error):
+                size = None
+            return digest, list(size) if size is not None else None
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for rel_path, (digest, size) in zip(stale, executor.map(read, stale)):
+                _, file_size, mtime_ns = found[rel_path]
+                self.files[rel_path] = [file_size, mtime_ns, digest]
+                self.sizes[digest] = size
+
+        self.files = {rel_path: self.files[rel_path] for rel_path in found}
+        live = {entry[2] for entry in self.files.values()}
+        self.sizes = {digest: size for digest, size in self.sizes.items() if digest in live}
+        return len(stale)
+
+    def size_of(self, url):
+        """Returns (width, height) for a root-relative image URL, or None if unknown."""
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path.startswith("/"):
+            return None
+        entry = self.files.get(unquote(parts.path[1:]))
+        if entry is None:
+            return None
+        return self.sizes.get(entry[2])
+
+    def annotate(self, html):
+        """Adds size, lazy-loading and async-decoding attributes to every <img> in html."""
+        return IMG_SRC_PATTERN.sub(self._annotate_tag, html)
+
+    def _annotate_tag(self, match):
+        size = self.size_of(match.group(1))
+        attrs = ' loading="lazy" decoding="async"'
+        if size is not None:
+            attrs = f' width="{size[0]}" height="{size[1]}"' + attrs
+        return match.group(0) + attrs
+
+    def signature(self, urls):
+        """A string that changes whenever the size of any of the images at urls does."""
+        return "images:" + ";".join(f"{url}={self.size_of(url)}" for url in urls)
+
+
+image_metadata = ImageMetadata()
+
+
+def configure_image_metadata(static_dir=None, state_path=None):
+    """
+    Points the shared image metadata at static_dir (None disables it),
+    loading the sizes cached in state_path. Call scan() to refresh them.
+    """
+    global image_metadata
+    if static_dir is None:
+        image_metadata = ImageMetadata()
+    else:
+        image_metadata = ImageMetadata.load(static_dir, state_path)
+    return image_metadata
+
+
+def annotate_images(chunks):
+    """Passes HTML chunks through, annotating the <img> tags in them."""
+    metadata = image_metadata
+    for chunk in chunks:
+        if "<img " in chunk:
+            chunk = metadata.annotate(chunk)
+        yield chunk
@@ -1,5 +1,4 @@
 from textnode import TextNode, TextType
-from typing import List
 import re
 
 
@@ -72,23 +71,76 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+# One alternation per inline construct, tried left to right at each position,
+# so text_to_textnodes can tokenize a paragraph in a single scan.
+INLINE_PATTERN = re.compile(
+    r"\*\*(?P<bold>.*?)\*\*"
+    r"|_(?P<italic>.*?)_"
+    r"|`(?P<code>.*?)`"
+    r"|!\[(?P<image_alt>[^\[\]]*)\]\((?P<image_url>[^\(\)]*)\)"
+    r"|\[(?P<link_text>[^\[\]]*)\]\((?P<link_url>[^\(\)]*)\)",
+    re.DOTALL,
+)
+UNCLOSED_DELIMITER_PATTERN = re.compile(r"\*\*|[_`]")
+
+
 def extract_markdown_images(text):
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return LINK_PATTERN.findall(text)
 
 
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    return nodes
\ No newline at end of file
+    """
+    Tokenizes inline markdown into TextNodes in one left-to-right pass.
+
+    Where inline constructs don't overlap, the nodes are the same as running
+    split_nodes_delimiter for "**", "_" and "`" followed by split_nodes_image
+    and split_nodes_link, without re-copying the remaining text for every
+    match. Where they do, the construct that starts first wins, and its
+    contents are taken literally, where the chained passes always split on
+    "**", then "_", then "`" before looking for images and links:
+
+    - "_", "**" and "`" inside a link or image URL or text are part of it:
+      [a](http://x/a_b_c) is one link, and [**b**](u) a link with the text
+      "**b**", where both used to be broken up into formatted text.
+    - "_" and "**" inside a code span are literal: `a_b` is code, where it
+      used to be an unclosed "_".
+    - A delimiter pair that straddles a link, as in [**](u)**, leaves the
+      delimiter outside the link unclosed, which raises ValueError.
+    """
+    nodes = []
+    pos = 0
+    for match in INLINE_PATTERN.finditer(text):
+        start = match.start()
+        if start > pos:
+            nodes.append(_plain_text_node(text[pos:start]))
+        kind = match.lastgroup
+        if kind == "bold":
+            if match.group("bold"):
+                nodes.append(TextNode(match.group("bold"), TextType.BOLD))
+        elif kind == "italic":
+            if match.group("italic"):
+                nodes.append(TextNode(match.group("italic"), TextType.ITALIC))
+        elif kind == "code":
+            if match.group("code"):
+                nodes.append(TextNode(match.group("code"), TextType.CODE))
+        elif kind == "image_url":
+            nodes.append(TextNode(match.group("image_alt"), TextType.IMAGE, match.group("image_url")))
+        else:
+            nodes.append(TextNode(match.group("link_text"), TextType.LINK, match.group("link_url")))
+        pos = match.end()
+    if pos < len(text):
+        nodes.append(_plain_text_node(text[pos:]))
+    return nodes
+
+
+def _plain_text_node(text):
+    if UNCLOSED_DELIMITER_PATTERN.search(text):
+        raise ValueError("invalid markdown, formatted section not closed")
+    return TextNode(text, TextType.TEXT)
\ No newline at end of file
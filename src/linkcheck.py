@@ -0,0 +1,148 @@
+import os
+import posixpath
+from urllib.parse import unquote, urlsplit
+
+from inline_markdown import extract_markdown_images, extract_markdown_links
+
+
+class BrokenLinksError(Exception):
+    """Raised when pages link to, or show images from, paths the site does not have."""
+    def __init__(self, broken):
+        """
+        Args:
+            broken (list): (source path, kind, url) triples, kind being
+                "link" or "image", in page order.
+        """
+        self.broken = broken
+        lines = [f"{len(broken)} broken link(s):"]
+        lines.extend(f"  {source}: {kind} {url}" for source, kind, url in broken)
+        super().__init__("\n".join(lines))
+
+
+class SiteIndex:
+    """
+    The set of paths a built site serves, relative to its root: every page
+    output and every static file. Link targets are looked up in it as they
+    will be requested once the site is served under its basepath.
+    """
+    def __init__(self, basepath="/", paths=None):
+        """
+        Args:
+            basepath (str, optional): Where the site is served. Defaults to "/".
+            paths (iterable, optional): Site-relative paths, "/"-separated.
+        """
+        self.basepath = basepath
+        self.paths = set(paths) if paths is not None else set()
+
+    @classmethod
+    def from_build(cls, jobs, dest_dir, static_dir, basepath="/"):
+        """
+        Indexes the outputs of the page jobs, (source path, destination path)
+        pairs as returned by collect_page_jobs, and the files under static_dir.
+        """
+        index = cls(basepath)
+        for _, dest_path in jobs:
+            index.add(os.path.relpath(dest_path, dest_dir))
+        for dir_path, _, filenames in os.walk(static_dir):
+            for filename in filenames:
+                index.add(os.path.relpath(os.path.join(dir_path, filename), static_dir))
+        return index
+
+    def add(self, rel_path):
+        self.paths.add(rel_path.replace(os.sep, "/"))
+
+    def __contains__(self, rel_path):
+        return rel_path in self.paths
+
+    def target(self, page_path, url):
+        """
+        Returns the site-relative path a URL on the page at page_path points
+        to, "" for the site root, or None if the URL is external or only a
+        fragment. Root-relative URLs are prefixed with the basepath, as
+        rewrite_links does, before being mapped back into the site, so a URL
+        that already includes the basepath, or a basepath without a trailing
+        slash, shows up as broken.
+
+        Returns:
+            str: The target, or ".." if it lies outside the site.
+        """
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return None
+        url_path = unquote(parts.path)
+        if url_path.startswith("/"):
+            if self.basepath != "/":
+                url_path = self.basepath + url_path[1:]
+            root = self.basepath if self.basepath.endswith("/") else self.basepath + "/"
+            if not url_path.startswith(root):
+                return ".."
+            url_path = url_path[len(root):]
+        else:
+            url_path = posixpath.join(posixpath.dirname(page_path), url_path)
+        url_path = posixpath.normpath(url_path)
+        if url_path == ".":
+            return ""
+        return url_path
+
+    def resolves(self, page_path, url, directory_index=True):
+        """
+        Returns True if url, found on the page at page_path, is external or
+        points at an indexed path. With directory_index, a URL naming a
+        directory also resolves to that directory's index.html.
+        """
+        target = self.target(page_path, url)
+        if target is None:
+            return True
+        if target == ".." or target.startswith("../"):
+            return False
+        if target in self.paths:
+            return True
+        return directory_index and posixpath.join(target, "index.html") in self.paths
+
+
+def check_links(pages, index, dest_dir):
+    """
+    Looks up every link and image target of the page records in index.
+
+    Args:
+        pages (list): Page records (see generate_page).
+        index (SiteIndex): The paths the site serves.
+        dest_dir (str): Output directory the records' destinations are in.
+
+    Returns:
+        list: (source path, kind, url) triples for the targets that do not
+        resolve, in page order.
+    """
+    broken = []
+    for page in pages:
+        page_path = os.path.relpath(page["dest"], dest_dir).replace(os.sep, "/")
+        for url in page["links"]:
+            if not index.resolves(page_path, url):
+                broken.append((page["source"], "link", url))
+        for url in page["images"]:
+            if not index.resolves(page_path, url, directory_index=False):
+                broken.append((page["source"], "image", url))
+    return broken
+
+
+def link_records(jobs, pages):
+    """
+    Returns link-only page records for every job, reusing the records of the
+    pages rendered in this build and extracting the URLs of the others (such
+    as pages an incremental build skipped) straight from their markdown.
+    """
+    rendered = {page["source"]: page for page in pages}
+    records = []
+    for from_path, dest_path in jobs:
+        page = rendered.get(str(from_path))
+        if page is None:
+            with open(from_path, "r") as f:
+                markdown = f.read()
+            page = {
+                "source": str(from_path),
+                "dest": str(dest_path),
+                "links": [url for _, url in extract_markdown_links(markdown)],
+                "images": [url for _, url in extract_markdown_images(markdown)],
+            }
+        records.append(page)
+    return records
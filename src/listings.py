@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import re
+from datetime import timezone
+from email.utils import format_datetime
+from html import escape
+
+import writer
+from frontmatter import parse_date, split_front_matter
+from gencontent import page_title
+from manifest import combine_digests
+from searchindex import page_url
+from template import load_template
+
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+# The most URLs the sitemap protocol allows in one file.
+SITEMAP_LIMIT = 50000
+
+SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+
+
+class MetadataIndex:
+    """
+    Site-wide index of page metadata: URL, title and the front-matter date,
+    tags and draft flag of every page, plus any other front-matter keys.
+
+    It is filled from the page records of the main render pass, so listing
+    pages, tag pages, the RSS feed and the sitemap are generated without
+    reading page bodies again. Entries are kept in a JSON state file and
+    reused for pages an incremental build skips, as long as the source's size
+    and mtime are unchanged.
+    """
+    def __init__(self, state_path, pages=None):
+        """
+        Args:
+            state_path (str): JSON file the index is kept in.
+            pages (dict, optional): Source path -> entry.
+        """
+        self.state_path = state_path
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, state_path):
+        """Loads the index, or returns an empty one if there is none."""
+        try:
+            with open(state_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+            data = {}
+        return cls(state_path, data.get("pages"))
+
+    def save(self):
+        writer.write_json(self.state_path, {"version": STATE_VERSION, "pages": self.pages})
+
+    def update(self, jobs, pages, output_dir):
+        """
+        Brings the index up to date with the given page jobs. Rendered pages
+        are taken from their page records; other pages keep their entry if
+        their source is unchanged, and otherwise have just their front matter
+        and title read. Pages no longer built are dropped.
+
+        Args:
+            jobs (list): (source path, dest path) pairs, see collect_page_jobs.
+            pages (list): Page records of the pages rendered in this build.
+            output_dir (str): The output root, for deriving page URLs.
+
+        Returns:
+            int: The number of entries (re)built.
+        """
+        rendered = {page["source"]: page for page in pages}
+        updated = 0
+        wanted = set()
+        for from_path, dest_path in jobs:
+            source = str(from_path)
+            wanted.add(source)
+            stat = os.stat(from_path)
+            signature = [stat.st_size, stat.st_mtime_ns]
+            page = rendered.get(source)
+            if page is None:
+                entry = self.pages.get(source)
+                if entry is not None and entry["signature"] == signature:
+                    continue
+                try:
+                    with open(from_path, "r") as f:
+                        meta, body = split_front_matter(f.read())
+                    title = page_title(meta, body)
+                except ValueError:
+                    self.pages.pop(source, None)
+                    continue
+            else:
+                meta, title = page["meta"], page["title"]
+            self.pages[source] = dict(
+                meta,
+                signature=signature,
+                url=page_url(os.path.relpath(dest_path, output_dir)),
+                title=title,
+            )
+            updated += 1
+        for source in set(self.pages) - wanted:
+            del self.pages[source]
+        return updated
+
+    def entries(self):
+        """Every published (non-draft) entry, ordered by URL."""
+        return sorted(
+            (entry for entry in self.pages.values() if not entry.get("draft", False)),
+            key=lambda entry: entry["url"],
+        )
+
+    def posts(self):
+        """The published entries that have a date, newest first."""
+        dated = [entry for entry in self.entries() if "date" in entry]
+        return sorted(dated, key=lambda entry: _sort_key(entry["date"]), reverse=True)
+
+    def collections(self):
+        """
+        Groups posts by their top-level directory.
+
+        Returns:
+            dict: Directory name -> posts, newest first. Posts at the site
+            root belong to no collection.
+        """
+        collections = {}
+        for entry in self.posts():
+            directory, sep, _ = entry["url"].partition("/")
+            if sep:
+                collections.setdefault(directory, []).append(entry)
+        return collections
+
+    def tags(self):
+        """Returns tag -> posts, newest first."""
+        tags = {}
+        for entry in self.posts():
+            for tag in entry.get("tags", ()):
+                tags.setdefault(tag, []).append(entry)
+        return tags
+
+
+def _sort_key(text):
+    moment = parse_date(text)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def slugify(text):
+    return SLUG_PATTERN.sub("-", text.lower()).strip("-") or "-"
+
+
+def listing_url(base_url, number):
+    """URL path of page number of a paginated listing rooted at base_url."""
+    return base_url if number == 1 else f"{base_url}page/{number}/"
+
+
+def listing_html(heading, posts, base_url, number, page_count):
+    """The content of one page of a listing: a heading, its posts and page links."""
+    parts = [f"<div><h1>{escape(heading)}</h1><ul>"]
+    for entry in posts:
+        parts.append(f'<li><a href="/{escape(entry["url"])}">{escape(entry["title"])}</a>')
+        date = escape(entry["date"])
+        parts.append(f' <time datetime="{date}">{date[:10]}</time>')
+        tags = entry.get("tags")
+        if tags:
+            links = ", ".join(f'<a href="/tags/{slugify(tag)}/">{escape(tag)}</a>' for tag in tags)
+            parts.append(f" <span>{links}</span>")
+        parts.append("</li>")
+    parts.append("</ul>")
+    if page_count > 1:
+        parts.append("<nav>")
+        if number > 1:
+            parts.append(f'<a href="/{listing_url(base_url, number - 1)}">Newer</a>')
+        parts.append(f" <span>Page {number} of {page_count}</span> ")
+        if number < page_count:
+            parts.append(f'<a href="/{listing_url(base_url, number + 1)}">Older</a>')
+        parts.append("</nav>")
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def write_output(dest_path, text, manifest=None):
+    """
+    Writes a generated output. With a BuildManifest, an output whose text is
+    unchanged since the last build is left alone, and outputs that a build no
+    longer generates get pruned along with stale pages.
+    """
+    if manifest is not None:
+        digest = combine_digests(text)
+        if manifest.is_fresh(dest_path, digest):
+            return
+        manifest.record(dest_path, digest)
+    writer.default_writer.write(dest_path, text)
+
+
+def write_listing(template, output_dir, heading, posts, base_url, page_size, manifest=None):
+    """
+    Writes a paginated listing of posts under base_url, page_size posts to a
+    page: page 1 at base_url, page n at base_url/page/n/.
+
+    Returns:
+        list: The URL paths written.
+    """
+    page_count = max(1, -(-len(posts) // page_size))
+    urls = []
+    for number in range(1, page_count + 1):
+        url = listing_url(base_url, number)
+        title = heading if number == 1 else f"{heading} (page {number} of {page_count})"
+        content = listing_html(heading, posts[(number - 1) * page_size:number * page_size], base_url, number, page_count)
+        dest_path = os.path.join(output_dir, url, "index.html")
+        write_output(dest_path, template.render({"Title": title, "Content": content}), manifest)
+        urls.append(url)
+    return urls
+
+
+def write_listings(index, template_path, output_dir, basepath="/", page_size=20, manifest=None):
+    """
+    Writes a paginated listing page for every collection of posts, a page
+    per tag under tags/ and a tags/ overview, all through the page template.
+    A collection whose directory already has an index page is not listed.
+
+    Returns:
+        list: The URL paths written, for the sitemap.
+    """
+    template = load_template(template_path, basepath)
+    taken = {entry["url"] for entry in index.pages.values()}
+    urls = []
+    for directory, posts in sorted(index.collections().items()):
+        base_url = directory + "/"
+        if base_url in taken:
+            logger.warning("Not listing %s: it already has an index page", base_url)
+            continue
+        heading = directory.replace("-", " ").capitalize()
+        urls.extend(write_listing(template, output_dir, heading, posts, base_url, page_size, manifest))
+
+    tags = index.tags()
+    if tags:
+        items = "".join(
+            f'<li><a href="/tags/{slugify(tag)}/">{escape(tag)}</a> ({len(posts)})</li>'
+            for tag, posts in sorted(tags.items(), key=lambda item: item[0].lower())
+        )
+        content = f"<div><h1>Tags</h1><ul>{items}</ul></div>"
+        dest_path = os.path.join(output_dir, "tags", "index.html")
+        write_output(dest_path, template.render({"Title": "Tags", "Content": content}), manifest)
+        urls.append("tags/")
+        for tag, posts in sorted(tags.items()):
+            base_url = f"tags/{slugify(tag)}/"
+            urls.extend(write_listing(template, output_dir, f"Tagged {tag}", posts, base_url, page_size, manifest))
+    return urls
+
+
+def absolute_url(site_url, basepath, url):
+    return site_url.rstrip("/") + basepath + url
+
+
+def write_feed(index, output_dir, site_url, basepath="/", size=20, manifest=None):
+    """
+    Writes feed.xml, an RSS 2.0 feed of the newest posts.
+
+    Returns:
+        int: The number of posts in the feed.
+    """
+    posts = index.posts()[:size]
+    home = next((entry for entry in index.pages.values() if entry["url"] == ""), None)
+    channel_title = home["title"] if home is not None else site_url
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>',
+        f"<title>{escape(channel_title)}</title>",
+        f"<link>{escape(absolute_url(site_url, basepath, ''))}</link>",
+        f"<description>{escape(channel_title)}</description>",
+    ]
+    for entry in posts:
+        link = escape(absolute_url(site_url, basepath, entry["url"]))
+        parts.append(f"<item><title>{escape(entry['title'])}</title><link>{link}</link>")
+        parts.append(f'<guid isPermaLink="true">{link}</guid>')
+        parts.append(f"<pubDate>{format_datetime(_sort_key(entry['date']))}</pubDate>")
+        for tag in entry.get("tags", ()):
+            parts.append(f"<category>{escape(tag)}</category>")
+        if isinstance(entry.get("description"), str):
+            parts.append(f"<description>{escape(entry['description'])}</description>")
+        parts.append("</item>")
+    parts.append("</channel></rss>\n")
+    write_output(os.path.join(output_dir, "feed.xml"), "".join(parts), manifest)
+    return len(posts)
+
+
+def write_sitemap(index, output_dir, site_url, basepath="/", extra_urls=(), manifest=None):
+    """
+    Writes sitemap.xml listing every published page and the extra URL paths
+    (such as listing pages). Past SITEMAP_LIMIT URLs, the URLs are split
+    across sitemap-N.xml files and sitemap.xml becomes their index.
+
+    Returns:
+        int: The number of URLs in the sitemap.
+    """
+    urls = [(entry["url"], entry.get("date")) for entry in index.entries()]
+    urls.extend((url, None) for url in sorted(extra_urls))
+    chunks = [urls[i:i + SITEMAP_LIMIT] for i in range(0, len(urls), SITEMAP_LIMIT)] or [[]]
+    if len(chunks) == 1:
+        write_output(os.path.join(output_dir, "sitemap.xml"), _urlset(chunks[0], site_url, basepath), manifest)
+        return len(urls)
+
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for number, chunk in enumerate(chunks, 1):
+        name = f"sitemap-{number}.xml"
+        write_output(os.path.join(output_dir, name), _urlset(chunk, site_url, basepath), manifest)
+        parts.append(f"<sitemap><loc>{escape(absolute_url(site_url, basepath, name))}</loc></sitemap>")
+    parts.append("</sitemapindex>\n")
+    write_output(os.path.join(output_dir, "sitemap.xml"), "".join(parts), manifest)
+    return len(urls)
+
+
+def _urlset(urls, site_url, basepath):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for url, date in urls:
+        parts.append(f"<url><loc>{escape(absolute_url(site_url, basepath, url))}</loc>")
+        if date is not None:
+            parts.append(f"<lastmod>{escape(date)}</lastmod>")
+        parts.append("</url>")
+    parts.append("</urlset>\n")
+    return "".join(parts)
@@ -1,32 +1,758 @@
+import argparse
+import logging
 import os
-import shutil
 import sys
 
-from copystatic import copy_files_recursive
-from gencontent import generate_pages_recursive
+# Everything else is imported by the command that needs it, so that light
+# commands (and --help) start without loading the parser and build stack.
 
 
 dir_path_static = "./static"
 dir_path_public = "./docs"
 dir_path_content = "./content"
 template_path = "./template.html"
+manifest_path = "./.cache/manifest.json"
+depgraph_path = "./.cache/depgraph.json"
+cache_dir = "./.cache"
+postprocess_state_path = "./.cache/postprocess.json"
+search_state_path = "./.cache/search.json"
+image_state_path = "./.cache/images.json"
+metadata_state_path = "./.cache/metadata.json"
+shard_dir = "./shards"
 default_basepath = "/"
 
+logger = logging.getLogger(__name__)
 
-def main():
-    basepath = default_basepath
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
 
-    print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+COMMANDS = ("build", "merge", "render-one", "render-stream", "check", "clean", "watch", "serve")
 
-    print("Copying static files to public directory...")
-    copy_files_recursive(dir_path_static, dir_path_public)
+# Mirrors copystatic.COPY_MODES, which is not imported just to parse arguments.
+COPY_MODES = ("copy", "hardlink", "reflink")
 
-    print("Generating content...")
-    generate_pages_recursive(dir_path_content, template_path, dir_path_public, basepath)
 
+def parse_args(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["build"] + list(argv)
 
-main()
+    log_options = argparse.ArgumentParser(add_help=False)
+    log_options.add_argument(
+        "-v", "--verbose", action="count", default=0, help="log more (repeat for per-file logging)"
+    )
+    log_options.add_argument("-q", "--quiet", action="store_true", help="only log errors")
+
+    basepath_options = argparse.ArgumentParser(add_help=False)
+    basepath_options.add_argument("basepath", nargs="?", default=default_basepath)
+
+    build_options = argparse.ArgumentParser(add_help=False, parents=[basepath_options, log_options])
+    build_options.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild outputs whose sources changed since the last build",
+    )
+    build_options.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="render pages across this many processes (0 = one per CPU)",
+    )
+    build_options.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="pages handed to a worker at a time (default: derived from page count)",
+    )
+    build_options.add_argument(
+        "--driver",
+        choices=("pool", "async"),
+        default="pool",
+        help="render pages in one pass (pool) or through an asyncio read/render/write pipeline (async)",
+    )
+    build_options.add_argument(
+        "--io-workers",
+        type=int,
+        default=8,
+        help="with --driver async, threads used for concurrent reads and writes",
+    )
+    build_options.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="with --driver async, pages buffered between pipeline stages",
+    )
+    build_options.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=0,
+        help="rendered markdown blocks kept in memory, for sites whose pages share many blocks (default: 0, off)",
+    )
+    build_options.add_argument(
+        "--block-cache-dir",
+        default=None,
+        help="also persist rendered blocks in this directory between builds",
+    )
+    build_options.add_argument(
+        "--tree-cache-dir",
+        default=None,
+        help="persist parsed page trees in this directory, so unchanged pages skip parsing",
+    )
+    build_options.add_argument(
+        "--stream-threshold",
+        type=int,
+        default=32 << 20,
+        help="render markdown files larger than this many bytes block by block in bounded memory "
+        "(0 never streams; default: 32 MiB)",
+    )
+    build_options.add_argument(
+        "--copy-mode",
+        choices=COPY_MODES,
+        default="copy",
+        help="how static files are transferred into ./docs",
+    )
+    build_options.add_argument(
+        "--copy-workers", type=int, default=8, help="threads used to copy static files"
+    )
+    build_options.add_argument(
+        "--write-buffer",
+        type=int,
+        default=1 << 18,
+        help="bytes buffered per output file before it is written (default: 256 KiB)",
+    )
+    build_options.add_argument(
+        "--background-writes",
+        action="store_true",
+        help="write rendered pages from a background thread while rendering continues",
+    )
+    build_options.add_argument(
+        "--image-metadata",
+        action="store_true",
+        help="give generated <img> tags their width and height, loading=\"lazy\" and decoding=\"async\"",
+    )
+    build_options.add_argument(
+        "--listings",
+        action="store_true",
+        help="write paginated listings of dated posts per directory, and a page per tag under ./docs/tags",
+    )
+    build_options.add_argument(
+        "--page-size", type=int, default=20, help="posts per listing page (default: 20)"
+    )
+    build_options.add_argument(
+        "--site-url",
+        default=None,
+        help="the site's public origin, e.g. https://example.com; writes feed.xml and sitemap.xml",
+    )
+    build_options.add_argument(
+        "--feed-size", type=int, default=20, help="newest posts in feed.xml (default: 20)"
+    )
+    build_options.add_argument(
+        "--check-links",
+        action="store_true",
+        help="fail the build if a page links to a page or file the site does not have",
+    )
+    build_options.add_argument(
+        "--search", action="store_true", help="write a full-text search index to ./docs/search"
+    )
+    build_options.add_argument("--minify", action="store_true", help="minify HTML and CSS output")
+    build_options.add_argument(
+        "--compress",
+        action="store_true",
+        help="write precompressed .gz (and .br, if brotli is installed) siblings of text outputs",
+    )
+    build_options.add_argument(
+        "--profile",
+        action="store_true",
+        help="time each build stage and report the slowest pages (renders serially, without --driver async)",
+    )
+    build_options.add_argument(
+        "--profile-out",
+        default=None,
+        help="with --profile, also write a Chrome trace (*.json) or cProfile stats (any other name)",
+    )
+    build_options.add_argument(
+        "--slowest", type=int, default=10, help="with --profile, how many of the slowest pages to list"
+    )
+
+    parser = argparse.ArgumentParser(description="Build the static site into ./docs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", parents=[build_options], help="build the site (default)")
+    build.add_argument(
+        "--shard",
+        type=_shard_spec,
+        default=None,
+        metavar="INDEX/COUNT",
+        help=f"render only this shard of the pages into {shard_dir}, for merging with merge",
+    )
+    build.add_argument(
+        "--shard-weighted",
+        action="store_true",
+        help="with --shard, balance shards by markdown file size instead of by path hash",
+    )
+    build.add_argument("--shard-dir", default=shard_dir, help="where shards are built")
+    merge = commands.add_parser(
+        "merge",
+        parents=[log_options],
+        help="verify the shards built with --shard and combine them into ./docs",
+    )
+    merge.add_argument("--shard-dir", default=shard_dir, help="where the shards were built")
+    merge.add_argument("--copy-mode", choices=COPY_MODES, default="copy", help="how shard files are transferred")
+    merge.add_argument("--copy-workers", type=int, default=8, help="threads used to copy shard files")
+    render_one = commands.add_parser(
+        "render-one", help="render a single markdown file", parents=[log_options]
+    )
+    render_one.add_argument("source", help="markdown file to render, - for stdin")
+    render_one.add_argument("basepath", nargs="?", default=default_basepath)
+    render_one.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="where to write the page, - for stdout (default: its place under ./docs, or stdout)",
+    )
+    commands.add_parser(
+        "render-stream",
+        parents=[basepath_options, log_options],
+        help="render JSON-lines requests from stdin to stdout in one long-lived process",
+    )
+    commands.add_parser(
+        "check",
+        parents=[basepath_options, log_options],
+        help="render every page and check its links in memory, reporting failures and writing nothing",
+    )
+    clean = commands.add_parser(
+        "clean", parents=[log_options], help=f"delete ./docs, {shard_dir} and the build caches"
+    )
+    clean.add_argument("--keep-cache", action="store_true", help=f"only delete ./docs and {shard_dir}")
+    watch = commands.add_parser(
+        "watch", parents=[build_options], help="build, then rebuild changed pages as sources change"
+    )
+    serve = commands.add_parser("serve", parents=[build_options], help="watch and serve ./docs over HTTP")
+    serve.add_argument("--port", type=int, default=8888)
+    for command in (watch, serve):
+        command.add_argument(
+            "--interval", type=float, default=0.05, help="seconds between polls for changes"
+        )
+    args = parser.parse_args(argv)
+    if args.command == "build" and args.shard is not None:
+        whole_site = [
+            flag for flag, enabled in (
+                ("--incremental", args.incremental),
+                ("--search", args.search),
+                ("--check-links", args.check_links),
+                ("--listings", args.listings),
+                ("--site-url", args.site_url is not None),
+                ("--minify", args.minify),
+                ("--compress", args.compress),
+                ("--profile", args.profile),
+            ) if enabled
+        ]
+        if whole_site:
+            parser.error(f"--shard cannot be combined with {', '.join(whole_site)}")
+    if args.command in ("watch", "serve"):
+        # Rebuilds only touch the changed pages, not these site-wide outputs.
+        whole_site = [
+            flag for flag, enabled in (
+                ("--search", args.search),
+                ("--check-links", args.check_links),
+                ("--listings", args.listings),
+                ("--site-url", args.site_url is not None),
+            ) if enabled
+        ]
+        if whole_site:
+            parser.error(f"{args.command} cannot be combined with {', '.join(whole_site)}")
+    return args
+
+
+def _shard_spec(text):
+    from shard import parse_shard
+
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _configure_build(args):
+    """Applies the cache, streaming and writer options of a build and returns its worker count."""
+    import writer
+    from blockcache import configure_block_cache
+    from gencontent import configure_streaming
+    from treecache import configure_tree_cache
+
+    configure_block_cache(args.block_cache_size, args.block_cache_dir)
+    configure_tree_cache(args.tree_cache_dir)
+    configure_streaming(args.stream_threshold)
+    writer.configure_writer(args.write_buffer, background=args.background_writes)
+    return args.workers if args.workers > 0 else os.cpu_count() or 1
+
+
+def _scan_image_metadata(args):
+    import imagemeta
+    import profiling
+
+    with profiling.stage("image metadata"):
+        metadata = imagemeta.configure_image_metadata(dir_path_static, image_state_path)
+        scanned = metadata.scan(workers=args.copy_workers)
+        metadata.save()
+    logger.info("Read the size of %d of %d image(s)", scanned, len(metadata.files))
+
+
+def build(args):
+    import profiling
+    from blockcache import block_cache
+    from copystatic import copy_files_recursive
+    from depgraph import DependencyGraph
+    from gencontent import PageBuildError, collect_page_jobs, generate_pages_recursive
+    from manifest import BuildManifest
+    from treecache import tree_cache
+
+    workers = _configure_build(args)
+
+    profile = None
+    profiler = None
+    if args.profile:
+        workers = 1
+        profile = profiling.start_profile()
+        if args.profile_out is not None and not args.profile_out.endswith(".json"):
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+    manifest = None
+    depgraph = None
+    # Outputs are minified and compressed in place, so a build with other
+    # settings can't reuse them.
+    options = {"minify": args.minify, "compress": args.compress}
+    if args.incremental:
+        manifest = BuildManifest.load(manifest_path, options)
+        if manifest is None:
+            logger.info("No build manifest for these options found, doing a clean build...")
+            depgraph = DependencyGraph(depgraph_path, dir_path_content, dir_path_static)
+        else:
+            depgraph = DependencyGraph.load(depgraph_path, dir_path_content, dir_path_static)
+
+    if manifest is None:
+        logger.info("Deleting public directory...")
+        _remove_tree(dir_path_public)
+        if args.incremental:
+            manifest = BuildManifest(manifest_path, options=options)
+        else:
+            _forget_build_state()
+
+    logger.info("Copying static files to public directory...")
+    with profiling.stage("static copy"):
+        copy_files_recursive(
+            dir_path_static,
+            dir_path_public,
+            manifest,
+            mode=args.copy_mode,
+            workers=args.copy_workers,
+        )
+
+    if args.image_metadata:
+        _scan_image_metadata(args)
+
+    logger.info("Generating content...")
+    status = 0
+    generated = []
+    try:
+        if args.driver == "async" and profile is None:
+            from asyncbuild import generate_pages_async
+
+            pages = generate_pages_async(
+                dir_path_content,
+                template_path,
+                dir_path_public,
+                args.basepath,
+                manifest,
+                workers=workers,
+                depgraph=depgraph,
+                io_workers=args.io_workers,
+                queue_size=args.queue_size,
+            )
+        else:
+            pages = generate_pages_recursive(
+                dir_path_content,
+                template_path,
+                dir_path_public,
+                args.basepath,
+                manifest,
+                workers=workers,
+                chunksize=args.chunksize,
+                depgraph=depgraph,
+            )
+        if args.listings or args.site_url is not None:
+            # Before pruning, so that outputs no longer generated are removed.
+            generated = _write_site_metadata(args, pages, manifest)
+    except PageBuildError as e:
+        logger.error("%s", e)
+        status = 1
+    finally:
+        if manifest is not None:
+            for path in manifest.prune():
+                logger.info(" - removed %s", path)
+                depgraph.remove(path)
+            manifest.save()
+            depgraph.save()
+
+    if status == 0 and args.search:
+        from searchindex import SearchIndex
+
+        logger.info("Updating search index...")
+        with profiling.stage("search index"):
+            index = SearchIndex.load(search_state_path)
+            jobs = collect_page_jobs(dir_path_content, dir_path_public)
+            indexed = index.update(jobs, dir_path_public, manifest)
+            result = index.write(dir_path_public, args.basepath)
+            index.save()
+        logger.info(
+            "Indexed %d page(s), wrote %d file(s), index is %d bytes",
+            indexed, result["written"], result["bytes"],
+        )
+
+    if status == 0 and (args.minify or args.compress):
+        from postprocess import OutputProcessor
+
+        logger.info("Post-processing output...")
+        with profiling.stage("postprocess"):
+            processor = OutputProcessor(
+                postprocess_state_path,
+                minify=args.minify,
+                compress=args.compress,
+                workers=workers if workers > 1 else args.copy_workers,
+            )
+            result = processor.run(dir_path_public)
+        logger.info("Processed %d, skipped %d outputs", result["processed"], result["skipped"])
+
+    if status == 0 and args.check_links:
+        from linkcheck import BrokenLinksError, SiteIndex, check_links, link_records
+
+        logger.info("Checking links...")
+        with profiling.stage("link check"):
+            jobs = collect_page_jobs(dir_path_content, dir_path_public)
+            index = SiteIndex.from_build(jobs, dir_path_public, dir_path_static, args.basepath)
+            for path in generated:
+                index.add(path)
+            broken = check_links(link_records(jobs, pages), index, dir_path_public)
+        if broken:
+            logger.error("%s", BrokenLinksError(broken))
+            status = 1
+        else:
+            logger.info("Links of %d page(s) OK", len(jobs))
+
+    stats = block_cache.stats()
+    if workers == 1 and stats["hits"] + stats["disk_hits"] + stats["misses"]:
+        logger.info(
+            "Block cache: %d hits, %d disk hits, %d misses",
+            stats["hits"], stats["disk_hits"], stats["misses"],
+        )
+
+    stats = tree_cache.stats()
+    if workers == 1 and stats["hits"] + stats["misses"]:
+        logger.info("Tree cache: %d hits, %d misses", stats["hits"], stats["misses"])
+
+    if profile is not None:
+        profiling.stop_profile()
+        print(profile.report(args.slowest))
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile_out)
+            print(f"cProfile stats written to {args.profile_out}")
+        elif args.profile_out is not None:
+            profile.write_chrome_trace(args.profile_out)
+            print(f"Chrome trace written to {args.profile_out}")
+    return status, manifest, depgraph
+
+
+def _write_site_metadata(args, pages, manifest):
+    """
+    Updates the page metadata index from the page records of this build and
+    writes the listings, feed and sitemap it drives.
+
+    Returns:
+        list: The site-relative paths written.
+
+    Raises:
+        PageBuildError: If any of them could not be written.
+    """
+    import profiling
+    import writer
+    from gencontent import PageBuildError, collect_page_jobs
+    from listings import MetadataIndex, write_feed, write_listings, write_sitemap
+
+    logger.info("Writing listings, feed and sitemap...")
+    with profiling.stage("listings"):
+        index = MetadataIndex.load(metadata_state_path)
+        jobs = collect_page_jobs(dir_path_content, dir_path_public)
+        index.update(jobs, pages, dir_path_public)
+        urls = []
+        if args.listings:
+            urls = write_listings(
+                index, template_path, dir_path_public, args.basepath, args.page_size, manifest
+            )
+        paths = [url + "index.html" for url in urls]
+        if args.site_url is not None:
+            posts = write_feed(index, dir_path_public, args.site_url, args.basepath, args.feed_size, manifest)
+            count = write_sitemap(index, dir_path_public, args.site_url, args.basepath, urls, manifest)
+            paths.extend(["feed.xml", "sitemap.xml"])
+            logger.info("Wrote %d post(s) to the feed and %d URL(s) to the sitemap", posts, count)
+        index.save()
+        write_errors = writer.default_writer.flush()
+    if write_errors:
+        raise PageBuildError([(dest, f"OSError: {error}") for dest, error in write_errors])
+    logger.info("Wrote %d listing page(s)", len(urls))
+    return paths
+
+
+def build_shard(args):
+    """
+    Renders one shard of the pages into its own directory under the shard
+    directory, along with a manifest of what it wrote. Shard 0 also carries
+    the static files.
+    """
+    from copystatic import copy_files_recursive
+    from gencontent import PageBuildError, collect_page_jobs, generate_pages
+    from shard import partition, shard_name, write_shard_manifest
+
+    workers = _configure_build(args)
+    index, count = args.shard
+    name = shard_name(index, count)
+    output_dir = os.path.join(args.shard_dir, name)
+    _remove_tree(output_dir)
+    if index == 0:
+        logger.info("Copying static files to shard %s...", name)
+        copy_files_recursive(dir_path_static, output_dir, mode=args.copy_mode, workers=args.copy_workers)
+    if args.image_metadata:
+        _scan_image_metadata(args)
+
+    jobs = collect_page_jobs(dir_path_content, output_dir)
+    jobs = partition(jobs, count, dir_path_content, weighted=args.shard_weighted)[index]
+    logger.info("Generating %d page(s) for shard %s...", len(jobs), name)
+    pages, failures = generate_pages(jobs, template_path, args.basepath, workers, args.chunksize)
+    if failures:
+        logger.error("%s", PageBuildError(failures))
+        return 1
+    write_shard_manifest(
+        os.path.join(args.shard_dir, name + ".json"),
+        index,
+        count,
+        args.basepath,
+        [page["source"] for page in pages],
+        output_dir,
+    )
+    return 0
+
+
+def merge(args):
+    from copystatic import copy_files_recursive
+    from gencontent import collect_page_jobs
+    from linkcheck import SiteIndex
+    from shard import ShardMergeError, load_shard_manifests, shard_name, verify_shards
+
+    # The merged site must hold every page and static file exactly once.
+    jobs = collect_page_jobs(dir_path_content, dir_path_public)
+    expected = SiteIndex.from_build(jobs, dir_path_public, dir_path_static).paths
+    try:
+        manifests = load_shard_manifests(args.shard_dir)
+        providers = verify_shards(args.shard_dir, manifests, expected)
+    except ShardMergeError as e:
+        logger.error("%s", e)
+        return 1
+
+    logger.info("Deleting public directory...")
+    _remove_tree(dir_path_public)
+    _forget_build_state()
+    for data in manifests:
+        output_dir = os.path.join(args.shard_dir, shard_name(data["index"], data["count"]))
+        if os.path.isdir(output_dir):
+            copy_files_recursive(output_dir, dir_path_public, mode=args.copy_mode, workers=args.copy_workers)
+    logger.info("Merged %d file(s) from %d shard(s)", len(providers), len(manifests))
+    return 0
+
+
+def render_one(args):
+    import writer
+    from renderer import render
+
+    dest_path = args.output
+    if dest_path is None and args.source == "-":
+        dest_path = "-"
+    elif dest_path is None:
+        rel_path = os.path.relpath(args.source, dir_path_content)
+        if rel_path.startswith(os.pardir + os.sep):
+            logger.error("%s is outside %s; pass --output", args.source, dir_path_content)
+            return 2
+        dest_path = os.path.splitext(os.path.join(dir_path_public, rel_path))[0] + ".html"
+    try:
+        if args.source == "-":
+            markdown = sys.stdin.read()
+        else:
+            with open(args.source, "r") as f:
+                markdown = f.read()
+        html = render(markdown, template_path, args.basepath)
+        if dest_path == "-":
+            sys.stdout.write(html)
+        else:
+            writer.default_writer.write(dest_path, html)
+            logger.info("Wrote %s", dest_path)
+    except Exception as e:
+        logger.error("Error building %s: %s: %s", args.source, type(e).__name__, e)
+        return 1
+    finally:
+        writer.default_writer.close()
+    return 0
+
+
+def render_stream(args):
+    from renderer import serve_stream
+
+    logger.info("Reading render requests from stdin...")
+    count = serve_stream(sys.stdin, sys.stdout, template_path, args.basepath)
+    logger.info("Answered %d request(s)", count)
+    return 0
+
+
+def check(args):
+    from gencontent import PageBuildError, collect_page_jobs, page_record, render_page
+    from linkcheck import BrokenLinksError, SiteIndex, check_links
+
+    jobs = collect_page_jobs(dir_path_content, dir_path_public)
+    failures = []
+    pages = []
+    for from_path, dest_path in jobs:
+        try:
+            with open(from_path, "r") as f:
+                markdown = f.read()
+            _, title = render_page(markdown, template_path, args.basepath)
+            pages.append(page_record(from_path, dest_path, title, markdown))
+        except Exception as e:
+            failures.append((from_path, f"{type(e).__name__}: {e}"))
+    status = 0
+    if failures:
+        logger.error("%s", PageBuildError(failures))
+        status = 1
+    index = SiteIndex.from_build(jobs, dir_path_public, dir_path_static, args.basepath)
+    broken = check_links(pages, index, dir_path_public)
+    if broken:
+        logger.error("%s", BrokenLinksError(broken))
+        status = 1
+    if status == 0:
+        logger.info("%d page(s) OK", len(jobs))
+    return status
+
+
+def clean(args):
+    paths = [dir_path_public, shard_dir] if args.keep_cache else [dir_path_public, shard_dir, cache_dir]
+    for path in paths:
+        if _remove_tree(path):
+            logger.info("Removed %s", path)
+    return 0
+
+
+def _forget_build_state():
+    """
+    Deletes the build manifest and dependency graph after ./docs was rebuilt
+    without them, so that the next incremental build starts clean instead of
+    trusting a record that misses the pages added since.
+    """
+    for path in (manifest_path, depgraph_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_tree(path):
+    if not os.path.exists(path):
+        return False
+    import shutil
+
+    shutil.rmtree(path)
+    return True
+
+
+def watch(args):
+    import writer
+    from devserver import SiteWatcher, start_server
+
+    args.incremental = True
+    _, manifest, depgraph = build(args)
+    processor = None
+    if args.minify or args.compress:
+        from postprocess import OutputProcessor
+
+        processor = OutputProcessor(postprocess_state_path, minify=args.minify, compress=args.compress)
+    watcher = SiteWatcher(
+        dir_path_content,
+        dir_path_static,
+        template_path,
+        dir_path_public,
+        args.basepath,
+        manifest,
+        depgraph,
+        interval=args.interval,
+        copy_mode=args.copy_mode,
+        processor=processor,
+    )
+    server = None
+    if args.command == "serve":
+        server = start_server(dir_path_public, port=args.port)
+        logger.info("Serving %s at http://localhost:%d/", dir_path_public, args.port)
+    logger.info("Watching for changes, press Ctrl+C to stop...")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+        manifest.save()
+        depgraph.save()
+        if args.image_metadata:
+            import imagemeta
+
+            imagemeta.image_metadata.save()
+        writer.default_writer.close()
+    return 0
+
+
+def configure_logging(args):
+    if args.quiet:
+        level = logging.ERROR
+    else:
+        verbose = args.verbose
+        if args.command in ("watch", "serve"):
+            verbose = max(verbose, 1)
+        level = max(logging.DEBUG, logging.WARNING - 10 * verbose)
+    logging.basicConfig(level=level, format="%(message)s")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging(args)
+    if args.command == "build":
+        import writer
+
+        try:
+            if args.shard is not None:
+                status = build_shard(args)
+            else:
+                status, _, _ = build(args)
+        finally:
+            writer.default_writer.close()
+        return status
+    if args.command == "merge":
+        return merge(args)
+    if args.command == "render-one":
+        return render_one(args)
+    if args.command == "render-stream":
+        return render_stream(args)
+    if args.command == "check":
+        return check(args)
+    if args.command == "clean":
+        return clean(args)
+    return watch(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+
+from writer import write_json
+
+
+# Precompressed siblings the post-processing stage writes beside an output.
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+
+class BuildManifest:
+    """
+    Persistent record of which source digests produced each output file.
+
+    An output is up to date when the manifest holds the same digest for it as
+    the current build computes and the file still exists. Outputs recorded by
+    a previous build but not visited by the current one are orphans and get
+    removed by prune().
+
+    For pages, the manifest also keeps the image URLs each one showed when it
+    was built, so that a build with image metadata can cover those images'
+    sizes in a page's digest without reading the markdown again.
+
+    Outputs may have precompressed .gz/.br siblings. They are not entries of
+    their own: they are deleted whenever their output is rewritten or
+    removed, so they are never stale, and are rewritten by post-processing.
+    """
+    def __init__(self, path, entries=None, options=None, images=None):
+        """
+        Args:
+            path (str): Where the manifest is stored as JSON.
+            entries (dict, optional): Output path -> source digest.
+            options (dict, optional): Build options that change every output,
+                such as minification and compression.
+            images (dict, optional): Page output path -> image URLs on the page.
+        """
+        self.path = path
+        self.entries = entries if entries is not None else {}
+        self.options = options if options is not None else {}
+        self.images = images if images is not None else {}
+        self.seen = set()
+        self._file_digests = {}
+
+    @classmethod
+    def load(cls, path, options=None):
+        """
+        Loads a manifest from disk. Returns None if there is no usable manifest,
+        or it was written by a build with other options, in which case the
+        caller should fall back to a clean build.
+        """
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get("outputs"), dict):
+            return None
+        options = options if options is not None else {}
+        if data.get("options") != options:
+            return None
+        images = data.get("images")
+        return cls(path, data["outputs"], options, images if isinstance(images, dict) else None)
+
+    def save(self):
+        data = {"options": self.options, "outputs": self.entries, "images": self.images}
+        write_json(self.path, data, indent=0, sort_keys=True)
+
+    def file_digest(self, path):
+        """Returns the sha256 hex digest of a file, memoized for this build."""
+        digest = self._file_digests.get(path)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            self._file_digests[path] = digest
+        return digest
+
+    def is_fresh(self, dest_path, digest):
+        """
+        Marks dest_path as produced by this build and reports whether the
+        existing file already matches digest.
+        """
+        dest_path = os.path.normpath(dest_path)
+        self.seen.add(dest_path)
+        return self.entries.get(dest_path) == digest and os.path.isfile(dest_path)
+
+    def record(self, dest_path, digest, images=None):
+        """
+        Records that dest_path was produced from digest, and for a page the
+        image URLs it shows. If it previously held other content, its
+        compressed siblings are now stale and are deleted.
+        """
+        dest_path = os.path.normpath(dest_path)
+        self.seen.add(dest_path)
+        previous = self.entries.get(dest_path)
+        if previous is not None and previous != digest:
+            self._remove_compressed(dest_path)
+        self.entries[dest_path] = digest
+        if images is not None:
+            self.images[dest_path] = list(images)
+        else:
+            self.images.pop(dest_path, None)
+
+    def images_of(self, dest_path):
+        """
+        The image URLs recorded for the page at dest_path, or None if none
+        were. They are those of the markdown the page was last built from.
+        """
+        return self.images.get(os.path.normpath(dest_path))
+
+    def invalidate(self, path):
+        """Forgets the memoized digest of a source file that has changed."""
+        self._file_digests.pop(path, None)
+
+    def remove(self, dest_path):
+        """
+        Deletes an output, its compressed siblings and its manifest entry,
+        along with any directories left empty by their removal.
+        """
+        dest_path = os.path.normpath(dest_path)
+        self.entries.pop(dest_path, None)
+        self.images.pop(dest_path, None)
+        self.seen.discard(dest_path)
+        self._remove_compressed(dest_path)
+        try:
+            os.remove(dest_path)
+        except FileNotFoundError:
+            pass
+        parent = os.path.dirname(dest_path)
+        while parent != "":
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    def _remove_compressed(self, dest_path):
+        for suffix in COMPRESSED_SUFFIXES:
+            # A static file that merely has a compressed name is an output of its own.
+            if dest_path + suffix not in self.entries:
+                try:
+                    os.remove(dest_path + suffix)
+                except FileNotFoundError:
+                    pass
+
+    def prune(self):
+        """
+        Deletes outputs that were recorded previously but not produced by this
+        build, along with any directories left empty by their removal.
+
+        Returns:
+            list: The removed output paths.
+        """
+        orphans = sorted(path for path in self.entries if path not in self.seen)
+        for path in orphans:
+            self.remove(path)
+        return orphans
+
+
+def combine_digests(*parts):
+    """Derives a single digest from several digests or strings."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
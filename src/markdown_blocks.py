@@ -1,7 +1,9 @@
 from enum import Enum
 
+from blockcache import block_cache
 from htmlnode import ParentNode
 from inline_markdown import text_to_textnodes
+from profiling import stage
 from textnode import text_node_to_html_node, TextNode, TextType
 
 
@@ -14,55 +16,223 @@ class BlockType(Enum):
     ULIST = "unordered_list"
 
 
+HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+
+
 def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    filtered_blocks = []
-    for block in blocks:
-        if block == "":
+    return [markdown[start:end] for start, end in iter_block_bounds(markdown)]
+
+
+def iter_block_spans(markdown, start=0):
+    """
+    Yields one (BlockType, start, end) record per block of markdown, where
+    markdown[start:end] is the block with surrounding whitespace trimmed.
+    See iter_block_bounds for how blocks are delimited.
+    """
+    for block_start, block_end in iter_block_bounds(markdown, start):
+        yield classify_span(markdown, block_start, block_end), block_start, block_end
+
+
+def iter_block_bounds(markdown, start=0):
+    """
+    Scans markdown and yields the (start, end) offsets of every block, with
+    surrounding whitespace trimmed. Nothing is copied while scanning; the
+    scanner jumps from one block separator to the next with str.find.
+
+    Blocks are separated by empty lines, except inside a fenced code block,
+    which runs until its closing fence. A fence that is never closed does not
+    swallow the rest of the document: its block ends at the first empty line
+    as usual.
+
+    Args:
+        markdown (str): The document.
+        start (int, optional): Offset to start scanning at. Defaults to 0.
+    """
+    n = len(markdown)
+    pos = start
+    while pos < n:
+        block_start = pos
+        while block_start < n and markdown[block_start].isspace():
+            block_start += 1
+        search_from = block_start
+        if markdown.startswith("```", block_start):
+            line_end = markdown.find("\n", block_start)
+            if line_end == -1:
+                line_end = n
+            if line_end - block_start == 3 or not markdown.endswith("```", block_start, line_end):
+                closing = markdown.find("\n```", line_end)
+                if closing != -1:
+                    search_from = closing + 1
+        separator = markdown.find("\n\n", search_from)
+        end = n if separator == -1 else separator
+        pos = end + 2
+        if block_start >= end:
             continue
-        block = block.strip()
-        filtered_blocks.append(block)
-    return filtered_blocks
+        while markdown[end - 1].isspace():
+            end -= 1
+        yield block_start, end
 
 
-def block_to_block_type(block):
-    lines = block.split("\n")
+def iter_line_spans(text, start=0, end=None):
+    """
+    Yields the (start, end) offsets of each line of text[start:end], the
+    lines block.split("\n") would return, without copying them.
+    """
+    if end is None:
+        end = len(text)
+    while True:
+        line_end = text.find("\n", start, end)
+        if line_end == -1:
+            yield start, end
+            return
+        yield start, line_end
+        start = line_end + 1
 
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
+
+def classify_span(text, start, end):
+    """Returns the BlockType of the block text[start:end] without splitting it."""
+    if text.startswith(HEADING_PREFIXES, start, end):
         return BlockType.HEADING
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+    last_line = text.rfind("\n", start, end) + 1
+    if (last_line > start and text.startswith("```", start, end)
+            and text.startswith("```", last_line, end)):
         return BlockType.CODE
-    if block.startswith(">"):
-        for line in lines:
-            if not line.startswith(">"):
-                return BlockType.PARAGRAPH
-        return BlockType.QUOTE
-    if block.startswith("- "):
-        for line in lines:
-            if not line.startswith("- "):
+    newlines = text.count("\n", start, end)
+    if text.startswith(">", start, end):
+        if text.count("\n>", start, end) == newlines:
+            return BlockType.QUOTE
+        return BlockType.PARAGRAPH
+    if text.startswith("- ", start, end):
+        if text.count("\n- ", start, end) == newlines:
+            return BlockType.ULIST
+        return BlockType.PARAGRAPH
+    if text.startswith("1. ", start, end):
+        line = start
+        for i in range(2, newlines + 2):
+            line = text.find("\n", line, end) + 1
+            if not text.startswith(f"{i}. ", line, end):
                 return BlockType.PARAGRAPH
-        return BlockType.ULIST
-    if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return BlockType.PARAGRAPH
-            i += 1
         return BlockType.OLIST
     return BlockType.PARAGRAPH
 
 
+def block_to_block_type(block):
+    return classify_span(block, 0, len(block))
+
+
+def iter_markdown_blocks(fp, chunk_size=1 << 16):
+    """
+    Reads markdown from a text file object in chunks and yields each block as
+    soon as it is complete, split exactly as iter_block_bounds splits the
+    whole document. Only the unfinished tail is buffered, so memory use is
+    bounded by the largest block (a code fence that is never closed buffers
+    the rest of the file, as its end can't be known before then).
+
+    Yields:
+        tuple: (BlockType, block text)
+    """
+    buffer = ""
+    size = chunk_size
+    final = False
+    while not final:
+        chunk = fp.read(size)
+        final = chunk == ""
+        buffer += chunk
+        bounds, consumed = _complete_block_bounds(buffer, final)
+        for start, end in bounds:
+            yield classify_span(buffer, start, end), buffer[start:end]
+        buffer = buffer[consumed:]
+        # When a block outgrows what has been read, read more at a time, so
+        # that rescanning the growing buffer stays linear overall.
+        size = chunk_size if bounds else size * 2
+
+
+def _complete_block_bounds(markdown, final):
+    """
+    iter_block_bounds for a prefix of a document: returns the bounds of the
+    blocks that more text could not change, and the offset up to which
+    markdown has been consumed. With final, markdown is the whole remainder.
+    """
+    bounds = []
+    n = len(markdown)
+    pos = 0
+    while pos < n:
+        block_start = pos
+        while block_start < n and markdown[block_start].isspace():
+            block_start += 1
+        if block_start == n:
+            return bounds, n
+        search_from = block_start
+        if markdown.startswith("```", block_start):
+            line_end = markdown.find("\n", block_start)
+            if line_end == -1:
+                if not final:
+                    break
+                line_end = n
+            if line_end - block_start == 3 or not markdown.endswith("```", block_start, line_end):
+                closing = markdown.find("\n```", line_end)
+                if closing != -1:
+                    search_from = closing + 1
+                elif not final:
+                    break
+        separator = markdown.find("\n\n", search_from)
+        if separator == -1 and not final:
+            break
+        end = n if separator == -1 else separator
+        while markdown[end - 1].isspace():
+            end -= 1
+        bounds.append((block_start, end))
+        pos = end if separator == -1 else separator + 2
+    return bounds, min(pos, n)
+
+
+def iter_blocks_html(blocks):
+    """
+    Renders (BlockType, block text) pairs into the chunks of the same
+    <div> that markdown_to_html_node builds, one block at a time.
+
+    Raises:
+        ValueError: If there are no blocks, as markdown_to_html_node does.
+    """
+    empty = True
+    for block_type, block in blocks:
+        if empty:
+            yield "<div>"
+            empty = False
+        yield from cached_block_to_html_node(block, block_type).iter_html()
+    if empty:
+        raise ValueError("Children cannot be an empty list.")
+    yield "</div>"
+
+
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+    with stage("block split"):
+        spans = list(iter_block_spans(markdown))
     children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
+    with stage("inline parse"):
+        for block_type, start, end in spans:
+            html_node = cached_block_to_html_node(markdown[start:end], block_type)
+            children.append(html_node)
     return ParentNode("div", children, None)
 
 
-def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+def cached_block_to_html_node(block, block_type=None):
+    """
+    Like block_to_html_node, but serves the subtree from the shared block
+    cache when the same block text has been parsed before.
+    """
+    if not block_cache.enabled:
+        return block_to_html_node(block, block_type)
+    node = block_cache.get(block)
+    if node is None:
+        node = block_to_html_node(block, block_type)
+        block_cache.put(block, node)
+    return node
+
+
+def block_to_html_node(block, block_type=None):
+    if block_type is None:
+        block_type = block_to_block_type(block)
     if block_type == BlockType.PARAGRAPH:
         return paragraph_to_html_node(block)
     if block_type == BlockType.HEADING:
@@ -119,32 +289,29 @@ def code_to_html_node(block):
 
 
 def olist_to_html_node(block):
-    items = block.split("\n")
     html_items = []
-    for item in items:
-        text = item[3:]
+    for start, end in iter_line_spans(block):
+        text = block[start + 3 : end]
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
 
 
 def ulist_to_html_node(block):
-    items = block.split("\n")
     html_items = []
-    for item in items:
-        text = item[2:]
+    for start, end in iter_line_spans(block):
+        text = block[start + 2 : end]
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
 
 
 def quote_to_html_node(block):
-    lines = block.split("\n")
     new_lines = []
-    for line in lines:
-        if not line.startswith(">"):
+    for start, end in iter_line_spans(block):
+        if not block.startswith(">", start, end):
             raise ValueError("invalid quote block")
-        new_lines.append(line.lstrip(">").strip())
+        new_lines.append(block[start:end].lstrip(">").strip())
     content = " ".join(new_lines)
     children = text_to_children(content)
     return ParentNode("blockquote", children)
\ No newline at end of file
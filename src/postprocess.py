@@ -0,0 +1,257 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import COMPRESSED_SUFFIXES
+from writer import write_json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".xml", ".json", ".txt")
+
+PRESERVED_HTML_PATTERN = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.DOTALL | re.IGNORECASE
+)
+# A comment, or a tag with quoted attribute values (which may hold ">").
+HTML_TOKEN_PATTERN = re.compile(
+    r"""<!--(?!\[if).*?-->"""
+    r"""|<[A-Za-z][^"'<>]*(?:(?:"[^"]*"|'[^']*')[^"'<>]*)+>""",
+    re.DOTALL,
+)
+QUOTED_PATTERN = re.compile(r"""("[^"]*"|'[^']*')""")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# A string or a comment; strings are captured, so split() keeps them.
+CSS_TOKEN_PATTERN = re.compile(r"""("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')|/\*.*?\*/""", re.DOTALL)
+# No whitespace is removed before ":", which in a selector ("div :hover")
+# starts a pseudo-class of any descendant.
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*|(:)\s+")
+
+
+def minify_html(html):
+    """
+    Strips comments and collapses whitespace runs, leaving the contents of
+    pre, textarea, script and style elements and quoted attribute values
+    untouched. A run containing a newline becomes one newline and any other
+    run one space, so the rendered text is unchanged.
+    """
+    parts = PRESERVED_HTML_PATTERN.split(html)
+    out = []
+    # split() yields text, then the two groups of every match.
+    for i in range(0, len(parts), 3):
+        out.append(_minify_markup(parts[i]))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return "".join(out)
+
+
+def _minify_markup(html):
+    out = []
+    # Text on both sides of a removed comment is collapsed as one run.
+    text = []
+    pos = 0
+    for match in HTML_TOKEN_PATTERN.finditer(html):
+        text.append(html[pos:match.start()])
+        pos = match.end()
+        if match.group(0).startswith("<!--"):
+            continue
+        out.append(_collapse_text("".join(text)))
+        text = []
+        # Quoted values are split out at odd indices.
+        pieces = QUOTED_PATTERN.split(match.group(0))
+        for i in range(0, len(pieces), 2):
+            pieces[i] = _collapse_text(pieces[i])
+        out.append("".join(pieces))
+    text.append(html[pos:])
+    out.append(_collapse_text("".join(text)))
+    return "".join(out)
+
+
+def _collapse_text(text):
+    return WHITESPACE_PATTERN.sub(_collapse_whitespace, text)
+
+
+def _collapse_whitespace(match):
+    return "\n" if "\n" in match.group(0) else " "
+
+
+def minify_css(css):
+    """
+    Removes comments and the whitespace around CSS punctuation, leaving
+    strings untouched.
+    """
+    out = []
+    text = []
+    parts = CSS_TOKEN_PATTERN.split(css)
+    # split() yields text, then the string of every match (None for a comment).
+    for i in range(0, len(parts), 2):
+        text.append(parts[i])
+        if i + 1 < len(parts) and parts[i + 1] is not None:
+            out.append(_minify_css_text("".join(text)))
+            out.append(parts[i + 1])
+            text = []
+    out.append(_minify_css_text("".join(text)))
+    return "".join(out).strip()
+
+
+def _minify_css_text(css):
+    css = WHITESPACE_PATTERN.sub(" ", css)
+    css = CSS_PUNCTUATION_PATTERN.sub(lambda match: match.group(1) or match.group(2), css)
+    return css.replace(";}", "}")
+
+
+MINIFIERS = {".html": minify_html, ".css": minify_css}
+
+
+class OutputProcessor:
+    """
+    Post-render stage that minifies HTML and CSS outputs in place and writes
+    precompressed .gz (and .br, when the brotli module is installed) siblings
+    next to every compressible file.
+
+    The content hash of every processed file is kept in a JSON state file;
+    files whose hash has not changed since they were last processed are
+    skipped.
+    """
+    def __init__(self, state_path, minify=False, compress=True, workers=4):
+        """
+        Args:
+            state_path (str): JSON file holding the hashes of processed outputs.
+            minify (bool, optional): Minify HTML and CSS. Defaults to False.
+            compress (bool, optional): Write .gz/.br siblings. Defaults to True.
+            workers (int, optional): Threads used for processing. Defaults to 4.
+        """
+        self.state_path = state_path
+        self.minify = minify
+        self.compress = compress
+        self.workers = workers
+        try:
+            with open(state_path, "r") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    @property
+    def options_key(self):
+        return f"minify={self.minify},gzip={self.compress},brotli={self.compress and brotli is not None}"
+
+    def run(self, output_dir):
+        """
+        Processes every compressible file under output_dir and removes the
+        compressed siblings it wrote before whose original no longer exists
+        (or all of them when compression is off).
+
+        Only siblings of files in the state are removed: anything else with
+        a compressed suffix, such as a static archive.tar.gz, is an output
+        of its own.
+
+        Returns:
+            dict: Counts of processed, skipped and removed files.
+        """
+        candidates = []
+        removed = 0
+        for dir_path, _, filenames in os.walk(output_dir):
+            names = set(filenames)
+            for filename in filenames:
+                path = os.path.normpath(os.path.join(dir_path, filename))
+                base, suffix = os.path.splitext(filename)
+                if suffix in COMPRESSED_SUFFIXES and os.path.splitext(path)[0] in self.state:
+                    if base not in names or not self.compress:
+                        os.remove(path)
+                        removed += 1
+                    continue
+                if suffix in COMPRESSIBLE_EXTENSIONS:
+                    candidates.append(path)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            results = list(executor.map(self._process, candidates))
+
+        self.state = {path: entry for path, (entry, _) in zip(candidates, results)}
+        self._save()
+        processed = sum(1 for _, changed in results if changed)
+        return {"processed": processed, "skipped": len(candidates) - processed, "removed": removed}
+
+    def process(self, paths):
+        """
+        Processes just the given outputs, such as the files a watch rebuild
+        wrote, leaving the state of every other file as it is.
+
+        Returns:
+            int: The number of files processed.
+        """
+        paths = [
+            os.path.normpath(path) for path in paths
+            if os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS and os.path.isfile(path)
+        ]
+        processed = 0
+        for path in paths:
+            self.state[path], changed = self._process(path)
+            processed += changed
+        self._save()
+        return processed
+
+    def _process(self, path):
+        """
+        Returns (state entry, whether the file was processed). A state entry is
+        the [input digest, output digest] pair of the last processing, so a
+        file that was re-rendered or re-copied with identical content only
+        needs re-minifying, not recompressing.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        input_digest = _state_digest(data, self.options_key)
+        entry = self.state.get(path)
+        siblings_exist = self._siblings_exist(path)
+        if entry is not None and input_digest == entry[1] and siblings_exist:
+            return entry, False
+
+        minifier = MINIFIERS.get(os.path.splitext(path)[1]) if self.minify else None
+        output_digest = input_digest
+        if minifier is not None:
+            minified = minifier(data.decode("utf-8")).encode("utf-8")
+            if minified != data:
+                data = minified
+                _write_atomic(path, data)
+                output_digest = _state_digest(data, self.options_key)
+        logger.debug(" * processed %s", path)
+        if entry is not None and output_digest == entry[1] and siblings_exist:
+            return entry, True
+        if self.compress:
+            _write_atomic(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_atomic(path + ".br", brotli.compress(data))
+        return [input_digest, output_digest], True
+
+    def _siblings_exist(self, path):
+        if not self.compress:
+            return True
+        if not os.path.exists(path + ".gz"):
+            return False
+        return brotli is None or os.path.exists(path + ".br")
+
+    def _save(self):
+        write_json(self.state_path, self.state, indent=0, sort_keys=True)
+
+
+def _state_digest(data, options_key):
+    h = hashlib.sha256(data)
+    h.update(options_key.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _write_atomic(path, data):
+    # Write beside the target and rename, so that a hardlinked static file is
+    # replaced rather than modified through the link.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
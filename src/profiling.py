@@ -0,0 +1,91 @@
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+STAGES = ("read", "block split", "inline parse", "to_html", "templating", "write", "static copy")
+
+_NO_PROFILE = nullcontext()
+
+active_profile = None
+
+
+class BuildProfile:
+    """
+    Collects wall-clock time per build stage and per page.
+
+    Only one profile is active at a time (see start_profile); while none is,
+    stage() costs a global lookup and returns a shared no-op context.
+    """
+    def __init__(self):
+        self.stage_totals = defaultdict(float)
+        self.stage_counts = defaultdict(int)
+        self.page_times = []
+        self.events = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stage_totals[name] += elapsed
+            self.stage_counts[name] += 1
+            self.events.append((name, started - self._origin, elapsed))
+
+    def record_page(self, path, seconds):
+        self.page_times.append((seconds, str(path)))
+
+    def slowest_pages(self, n=10):
+        return sorted(self.page_times, reverse=True)[:n]
+
+    def report(self, slowest=10):
+        """Returns a human-readable summary of stage totals and the slowest pages."""
+        lines = [f"{'stage':<14} {'calls':>8} {'total ms':>10}"]
+        names = [name for name in STAGES if name in self.stage_totals]
+        names += sorted(name for name in self.stage_totals if name not in STAGES)
+        for name in names:
+            lines.append(
+                f"{name:<14} {self.stage_counts[name]:>8} {self.stage_totals[name] * 1000:>10.2f}"
+            )
+        if self.page_times:
+            lines.append("")
+            lines.append(f"slowest {min(slowest, len(self.page_times))} of {len(self.page_times)} pages:")
+            for seconds, path in self.slowest_pages(slowest):
+                lines.append(f"{seconds * 1000:>10.2f} ms  {path}")
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path):
+        """Writes the recorded stages in Chrome trace-event JSON format."""
+        import json
+
+        pid = os.getpid()
+        trace = [
+            {"name": name, "ph": "X", "ts": start * 1e6, "dur": elapsed * 1e6, "pid": pid, "tid": 0}
+            for name, start, elapsed in self.events
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+
+def start_profile():
+    """Makes a fresh BuildProfile the active profile and returns it."""
+    global active_profile
+    active_profile = BuildProfile()
+    return active_profile
+
+
+def stop_profile():
+    global active_profile
+    profile, active_profile = active_profile, None
+    return profile
+
+
+def stage(name):
+    """Times a block of code against the active profile, if any."""
+    if active_profile is None:
+        return _NO_PROFILE
+    return active_profile.stage(name)
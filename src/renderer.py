@@ -0,0 +1,97 @@
+from frontmatter import split_front_matter
+from gencontent import active_image_metadata, page_content, page_title
+from template import Template, load_template, rewrite_links
+from treecache import cached_markdown_to_html_node
+
+
+def render(markdown, template=None, basepath="/"):
+    """
+    Renders one markdown document to HTML, exactly as a build would.
+
+    The parser's regexes are compiled at import and templates are cached by
+    path, so in a long-lived process each call costs little more than the
+    parse itself.
+
+    Args:
+        markdown (str): The document.
+        template (str or Template, optional): A template file path or a
+            compiled Template. Defaults to None, which returns just the
+            content HTML.
+        basepath (str, optional): Prefix for root-relative links. Ignored when
+            template is a Template, which has its own. Defaults to "/".
+
+    Returns:
+        str: The page, or the content fragment when there is no template.
+
+    Raises:
+        ValueError: If the markdown is malformed, or a page is requested and
+            the markdown has no title.
+    """
+    meta, body = split_front_matter(markdown)
+    node = cached_markdown_to_html_node(body)
+    if template is None:
+        html = node.to_html()
+        metadata = active_image_metadata()
+        if metadata is not None:
+            html = metadata.annotate(html)
+        return rewrite_links(html, basepath)
+    if not isinstance(template, Template):
+        template = load_template(template, basepath)
+    title = page_title(meta, body)
+    return template.render({"Title": title, "Content": page_content(node)})
+
+
+def serve_stream(infile, outfile, template=None, basepath="/", templates=None):
+    """
+    Answers render requests, one JSON object per line, until infile ends.
+
+    A request is {"markdown": ...} with optional "id", "basepath",
+    "template" and "fragment" (true to skip the template) keys; missing keys
+    default to the arguments given here. "template" names one of templates:
+    requests can't give a file path, so a client can only render through
+    templates the server was started with. Each request is answered with one
+    line: {"id": ..., "html": ...} on success or {"id": ..., "error": "..."}
+    on failure. Output is flushed after every response, so a client can keep
+    one renderer process busy over a pipe.
+
+    Args:
+        templates (dict, optional): Template name -> template path or
+            Template, for requests that pick one. Defaults to None (none).
+
+    Returns:
+        int: The number of requests answered.
+    """
+    # Imported here: render-one never answers requests.
+    import json
+
+    if templates is None:
+        templates = {}
+    count = 0
+    for line in infile:
+        if not line.strip():
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            request_id = request.get("id")
+            markdown = request["markdown"]
+            page_template = template
+            if "template" in request:
+                name = request["template"]
+                if not isinstance(name, str) or name not in templates:
+                    raise ValueError(f"unknown template {name!r}")
+                page_template = templates[name]
+            if request.get("fragment"):
+                page_template = None
+            html = render(markdown, page_template, request.get("basepath", basepath))
+            response = {"id": request_id, "html": html}
+        except KeyError as e:
+            response = {"id": request_id, "error": f"missing key {e}"}
+        except Exception as e:
+            response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+        outfile.write(json.dumps(response) + "\n")
+        outfile.flush()
+        count += 1
+    return count
@@ -0,0 +1,96 @@
+// Client for the index written by searchindex.py. meta.json is fetched on
+// the first query and term shards only when a query needs them.
+//
+//   <script src="/search/search.js"></script>
+//   siteSearch("elves rivendell").then(results => ...)
+//
+// Each result is {url, title, heading, score}, best first.
+(function () {
+  var base = document.currentScript.src.replace(/[^/]*$/, "");
+  var meta = null;
+  var shards = {};
+
+  function fetchJSON(name) {
+    return fetch(base + name).then(function (response) {
+      if (!response.ok) throw new Error(name + ": " + response.status);
+      return response.json();
+    });
+  }
+
+  function deltaDecode(deltas) {
+    var total = 0;
+    return deltas.map(function (delta) { return (total += delta); });
+  }
+
+  function tokenize(text) {
+    return (text.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || []).filter(function (term) {
+      return term.length > 1;
+    });
+  }
+
+  // Matches heading_anchor in searchindex.py; "-" is syntax in text fragments.
+  function textFragment(heading) {
+    return "#:~:text=" + encodeURIComponent(heading).replace(/[-!'()*]/g, function (c) {
+      return "%" + c.charCodeAt(0).toString(16).toUpperCase();
+    });
+  }
+
+  function shardKey(term) {
+    return /^[a-z0-9]/.test(term) ? term[0] : "_";
+  }
+
+  function loadMeta() {
+    if (meta === null) {
+      meta = fetchJSON("meta.json").then(function (data) {
+        data.sectionPages = deltaDecode(data.section_pages);
+        return data;
+      });
+    }
+    return meta;
+  }
+
+  function postings(data, term) {
+    var key = shardKey(term);
+    if (data.shards.indexOf(key) < 0) return Promise.resolve({});
+    if (!(key in shards)) shards[key] = fetchJSON("terms-" + key + ".json");
+    return shards[key].then(function (terms) {
+      var entry = terms[term];
+      var result = {};
+      if (entry) {
+        deltaDecode(entry[0]).forEach(function (section, i) { result[section] = entry[1][i]; });
+      }
+      return result;
+    });
+  }
+
+  window.siteSearch = function (query, limit) {
+    var terms = tokenize(query);
+    if (terms.length === 0) return Promise.resolve([]);
+    return loadMeta().then(function (data) {
+      return Promise.all(terms.map(function (term) { return postings(data, term); })).then(function (lists) {
+        var scores = lists[0];
+        lists.slice(1).forEach(function (list) {
+          var next = {};
+          Object.keys(scores).forEach(function (section) {
+            if (section in list) next[section] = scores[section] + list[section];
+          });
+          scores = next;
+        });
+        return Object.keys(scores)
+          .map(Number)
+          .sort(function (a, b) { return scores[b] - scores[a] || a - b; })
+          .slice(0, limit || 10)
+          .map(function (section) {
+            var page = data.pages[data.sectionPages[section]];
+            var heading = data.headings[section];
+            return {
+              url: page[0] + (heading ? textFragment(heading) : ""),
+              title: page[1],
+              heading: heading,
+              score: scores[section],
+            };
+          });
+      });
+    });
+  };
+})();
@@ -0,0 +1,335 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from urllib.parse import quote
+
+import writer
+from frontmatter import split_front_matter
+from gencontent import page_title
+from inline_markdown import text_to_textnodes
+from markdown_blocks import BlockType, iter_block_spans
+
+
+# Terms are runs of letters, digits and underscores, lowercased. search.js
+# tokenizes queries the same way.
+TOKEN_PATTERN = re.compile(r"\w+")
+LIST_MARKER_PATTERN = re.compile(r"^(?:[-*] |\d+\. )", re.MULTILINE)
+
+INDEX_VERSION = 1
+
+
+def tokenize(text):
+    """Returns the terms of text, in order, with single characters dropped."""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if len(term) > 1]
+
+
+def shard_key(term):
+    """Terms are sharded by first character, so a query loads few shards."""
+    first = term[0]
+    return first if first.isascii() and first.isalnum() else "_"
+
+
+def block_text(block, block_type):
+    """Returns the plain text of a block, without markdown syntax."""
+    if block_type == BlockType.CODE:
+        return block[3:-3].split("\n", 1)[-1] if block.endswith("```") else block
+    if block_type == BlockType.HEADING:
+        text = block.lstrip("#").strip()
+    elif block_type == BlockType.QUOTE:
+        text = " ".join(line.lstrip(">").strip() for line in block.split("\n"))
+    elif block_type in (BlockType.OLIST, BlockType.ULIST):
+        text = LIST_MARKER_PATTERN.sub("", block)
+    else:
+        text = block
+    try:
+        nodes = text_to_textnodes(text)
+    except ValueError:
+        return text
+    # Link text and image alt text are kept; their URLs are not.
+    return "".join(node.text for node in nodes)
+
+
+def page_sections(markdown):
+    """
+    Splits a page into sections at every heading.
+
+    Returns:
+        list: [heading text, {term: count}] per section. The first section
+        holds whatever precedes the first heading and has heading "".
+    """
+    sections = [["", Counter()]]
+    for block_type, start, end in iter_block_spans(markdown):
+        text = block_text(markdown[start:end], block_type)
+        if block_type == BlockType.HEADING:
+            sections.append([text, Counter()])
+        sections[-1][1].update(tokenize(text))
+    if not sections[0][1] and len(sections) > 1:
+        sections.pop(0)
+    return [[heading, dict(terms)] for heading, terms in sections]
+
+
+class SearchIndex:
+    """
+    A full-text index of the site, kept per page between builds so that only
+    pages whose markdown changed are re-tokenized.
+
+    write() emits the index into the output directory as:
+
+    - search/meta.json: the pages ([url, title]), the heading of every
+      section, the page id of every section (delta encoded) and the list of
+      term shards.
+    - search/terms-<key>.json: term -> [section id deltas, term counts] for
+      every term starting with key (see shard_key).
+
+    Section ids are assigned in page order, so a term's postings are sorted
+    by page and each page's sections are contiguous. A browser loads
+    meta.json once and then only the shards holding the query's terms
+    (see search.js).
+    """
+    def __init__(self, state_path, pages=None):
+        """
+        Args:
+            state_path (str): JSON file holding the per-page index state.
+            pages (dict, optional): Output path -> {"digest", "url", "title",
+                "sections"} for every indexed page.
+        """
+        self.state_path = state_path
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, state_path):
+        """Loads the per-page state, or returns an empty index if there is none."""
+        try:
+            with open(state_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            data = {}
+        return cls(state_path, data.get("pages"))
+
+    def save(self):
+        writer.write_json(self.state_path, {"version": INDEX_VERSION, "pages": self.pages}, separators=(",", ":"))
+
+    def update(self, jobs, output_dir, manifest=None):
+        """
+        Brings the index up to date with the given page jobs: pages whose
+        markdown changed are re-indexed and pages no longer built are dropped.
+        Pages without a title are left out, as they fail to build.
+
+        Args:
+            jobs (list): (source path, dest path) pairs, see collect_page_jobs.
+            output_dir (str): The output root, for deriving page URLs.
+            manifest (BuildManifest, optional): Reused for its memoized source
+                digests.
+
+        Returns:
+            int: The number of pages (re)indexed.
+        """
+        indexed = 0
+        wanted = set()
+        for from_path, dest_path in jobs:
+            dest_path = str(dest_path)
+            wanted.add(dest_path)
+            digest = _source_digest(from_path, manifest)
+            entry = self.pages.get(dest_path)
+            if entry is not None and entry["digest"] == digest:
+                continue
+            with open(from_path, "r") as f:
+                markdown = f.read()
+            try:
+                meta, markdown = split_front_matter(markdown)
+                title = page_title(meta, markdown)
+            except ValueError:
+                self.pages.pop(dest_path, None)
+                continue
+            self.pages[dest_path] = {
+                "digest": digest,
+                "url": page_url(os.path.relpath(dest_path, output_dir)),
+                "title": title,
+                "sections": page_sections(markdown),
+            }
+            indexed += 1
+        for dest_path in set(self.pages) - wanted:
+            del self.pages[dest_path]
+        return indexed
+
+    def build(self, basepath="/"):
+        """
+        Assembles the index.
+
+        Returns:
+            tuple: (meta dict, {shard key: {term: [deltas, counts]}})
+        """
+        urls = []
+        headings = []
+        section_pages = []
+        postings = {}
+        for page_id, dest_path in enumerate(sorted(self.pages, key=lambda d: self.pages[d]["url"])):
+            entry = self.pages[dest_path]
+            urls.append([basepath + entry["url"], entry["title"]])
+            for heading, terms in entry["sections"]:
+                section_id = len(headings)
+                headings.append(heading)
+                section_pages.append(page_id)
+                for term, count in terms.items():
+                    postings.setdefault(term, []).append((section_id, count))
+
+        shards = {}
+        for term in sorted(postings):
+            section_ids = [section_id for section_id, _ in postings[term]]
+            counts = [count for _, count in postings[term]]
+            shards.setdefault(shard_key(term), {})[term] = [delta_encode(section_ids), counts]
+
+        meta = {
+            "version": INDEX_VERSION,
+            "pages": urls,
+            "headings": headings,
+            "section_pages": delta_encode(section_pages),
+            "shards": sorted(shards),
+        }
+        return meta, shards
+
+    def write(self, output_dir, basepath="/"):
+        """
+        Writes the index and search.js under output_dir/search, leaving files
+        whose content is unchanged untouched and removing shards that are no
+        longer needed.
+
+        Returns:
+            dict: Counts of files written and total index bytes.
+        """
+        search_dir = os.path.join(output_dir, "search")
+        meta, shards = self.build(basepath)
+        files = {"meta.json": meta}
+        for key, terms in shards.items():
+            files[f"terms-{key}.json"] = terms
+        written = 0
+        size = 0
+        for name, data in files.items():
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+            size += len(text.encode("utf-8"))
+            path = os.path.join(search_dir, name)
+            if _read_text(path) != text:
+                writer.default_writer.write(path, text)
+                written += 1
+        with open(os.path.join(os.path.dirname(__file__), "search.js"), "r") as f:
+            script = f.read()
+        script_path = os.path.join(search_dir, "search.js")
+        if _read_text(script_path) != script:
+            writer.default_writer.write(script_path, script)
+            written += 1
+        errors = writer.default_writer.flush()
+        if errors:
+            raise errors[0][1]
+        for name in os.listdir(search_dir):
+            if name.startswith("terms-") and name not in files:
+                os.remove(os.path.join(search_dir, name))
+        return {"written": written, "bytes": size}
+
+
+class SearchIndexReader:
+    """
+    Queries a written index, loading term shards only when a query needs
+    them. Mirrors what search.js does in the browser.
+    """
+    def __init__(self, search_dir):
+        self.search_dir = search_dir
+        with open(os.path.join(search_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+        self.pages = meta["pages"]
+        self.headings = meta["headings"]
+        self.section_pages = delta_decode(meta["section_pages"])
+        self.shard_keys = set(meta["shards"])
+        self.shards = {}
+
+    def postings(self, term):
+        """Returns {section id: count} for term."""
+        key = shard_key(term)
+        if key not in self.shard_keys:
+            return {}
+        if key not in self.shards:
+            with open(os.path.join(self.search_dir, f"terms-{key}.json"), "r") as f:
+                self.shards[key] = json.load(f)
+        entry = self.shards[key].get(term)
+        if entry is None:
+            return {}
+        return dict(zip(delta_decode(entry[0]), entry[1]))
+
+    def search(self, query, limit=10):
+        """
+        Returns the best sections containing every term of query, as
+        (url with heading anchor, page title, heading, score) tuples.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores = None
+        for term in terms:
+            postings = self.postings(term)
+            if scores is None:
+                scores = dict(postings)
+            else:
+                scores = {s: score + postings[s] for s, score in scores.items() if s in postings}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        results = []
+        for section_id, score in ranked:
+            url, title = self.pages[self.section_pages[section_id]]
+            heading = self.headings[section_id]
+            results.append((url + heading_anchor(heading), title, heading, score))
+        return results
+
+
+def page_url(rel_path):
+    """Maps an output path relative to the site root to its URL path (no leading /)."""
+    rel_path = rel_path.replace(os.sep, "/")
+    if rel_path == "index.html":
+        return ""
+    if rel_path.endswith("/index.html"):
+        return rel_path[:-len("index.html")]
+    return rel_path[:-len(".html")] if rel_path.endswith(".html") else rel_path
+
+
+def heading_anchor(heading):
+    """A text fragment that scrolls to heading, since headings carry no ids."""
+    if not heading:
+        return ""
+    # "-" is syntax inside a text fragment, so it must be escaped too.
+    return "#:~:text=" + quote(heading, safe="").replace("-", "%2D")
+
+
+def delta_encode(numbers):
+    previous = 0
+    deltas = []
+    for number in numbers:
+        deltas.append(number - previous)
+        previous = number
+    return deltas
+
+
+def delta_decode(deltas):
+    total = 0
+    numbers = []
+    for delta in deltas:
+        total += delta
+        numbers.append(total)
+    return numbers
+
+
+def _source_digest(path, manifest):
+    if manifest is not None:
+        return manifest.file_digest(path)
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _read_text(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
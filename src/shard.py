@@ -0,0 +1,210 @@
+import hashlib
+import heapq
+import json
+import os
+
+from writer import write_json
+
+
+SHARD_MANIFEST_VERSION = 1
+
+
+class ShardMergeError(Exception):
+    """Raised when shard outputs do not add up to exactly one copy of the site."""
+    def __init__(self, problems):
+        """
+        Args:
+            problems (list): Human-readable descriptions, one per problem.
+        """
+        self.problems = problems
+        lines = [f"{len(problems)} problem(s) merging shards:"]
+        lines.extend(f"  {problem}" for problem in problems)
+        super().__init__("\n".join(lines))
+
+
+def parse_shard(spec):
+    """
+    Parses an "INDEX/COUNT" shard spec, with 0 <= INDEX < COUNT.
+
+    Raises:
+        ValueError: If the spec is malformed or out of range.
+    """
+    index, sep, count = spec.partition("/")
+    if not sep or not index.isdigit() or not count.isdigit():
+        raise ValueError(f"shard must look like INDEX/COUNT, got {spec!r}")
+    index, count = int(index), int(count)
+    if count < 1 or index >= count:
+        raise ValueError(f"shard index must be in 0..{count - 1}, got {index}")
+    return index, count
+
+
+def shard_name(index, count):
+    return f"{index}-of-{count}"
+
+
+def stable_hash(rel_path):
+    """A hash of a "/"-separated path that is the same on every machine and run."""
+    return int.from_bytes(hashlib.sha1(rel_path.encode("utf-8")).digest()[:8], "big")
+
+
+def partition(jobs, count, content_dir, weighted=False):
+    """
+    Deterministically splits page jobs into count shards.
+
+    By default a page goes to shard stable_hash(path) % count, where path is
+    its source path relative to content_dir, so a page stays on its shard as
+    other pages come and go. With weighted, pages are instead dealt out
+    largest first to the shard with the fewest bytes so far (ties broken by
+    the hash), which balances shards whose pages vary a lot in size; every
+    machine computes the same split as long as it sees the same files.
+
+    Args:
+        jobs (list): (source path, destination path) pairs.
+        count (int): Number of shards.
+        content_dir (str): Markdown source directory.
+        weighted (bool, optional): Balance shards by file size. Defaults to False.
+
+    Returns:
+        list: count lists of jobs, each in the order of jobs.
+    """
+    keyed = []
+    for position, job in enumerate(jobs):
+        rel_path = os.path.relpath(job[0], content_dir).replace(os.sep, "/")
+        keyed.append((position, stable_hash(rel_path), job))
+
+    assignment = {}
+    if not weighted:
+        for position, key, _ in keyed:
+            assignment[position] = key % count
+    else:
+        sizes = [os.path.getsize(job[0]) for job in jobs]
+        loads = [(0, shard) for shard in range(count)]
+        for position, _, _ in sorted(keyed, key=lambda item: (-sizes[item[0]], item[1])):
+            load, shard = heapq.heappop(loads)
+            assignment[position] = shard
+            heapq.heappush(loads, (load + sizes[position], shard))
+
+    shards = [[] for _ in range(count)]
+    for position, _, job in keyed:
+        shards[assignment[position]].append(job)
+    return shards
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def output_digests(output_dir):
+    """Returns site-relative path -> sha256 for every file under output_dir."""
+    digests = {}
+    for dir_path, _, filenames in os.walk(output_dir):
+        for filename in filenames:
+            path = os.path.join(dir_path, filename)
+            rel_path = os.path.relpath(path, output_dir).replace(os.sep, "/")
+            digests[rel_path] = file_sha256(path)
+    return digests
+
+
+def write_shard_manifest(path, index, count, basepath, sources, output_dir):
+    """
+    Records what a shard built: its place in the split, the page sources it
+    rendered and a digest of every file it wrote to output_dir.
+    """
+    data = {
+        "version": SHARD_MANIFEST_VERSION,
+        "index": index,
+        "count": count,
+        "basepath": basepath,
+        "sources": sorted(str(source) for source in sources),
+        "outputs": output_digests(output_dir),
+    }
+    write_json(path, data, indent=0, sort_keys=True)
+
+
+def load_shard_manifests(shard_dir):
+    """
+    Loads the manifests of every shard built into shard_dir.
+
+    Returns:
+        list: Manifest dicts, sorted by shard index.
+
+    Raises:
+        ShardMergeError: If a manifest cannot be read.
+    """
+    manifests = []
+    problems = []
+    for filename in sorted(os.listdir(shard_dir)):
+        if not filename.endswith(".json"):
+            continue
+        path = os.path.join(shard_dir, filename)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            problems.append(f"{path}: unreadable manifest: {e}")
+            continue
+        if not isinstance(data, dict) or data.get("version") != SHARD_MANIFEST_VERSION:
+            problems.append(f"{path}: not a shard manifest")
+            continue
+        manifests.append(data)
+    if problems:
+        raise ShardMergeError(problems)
+    return sorted(manifests, key=lambda data: data["index"])
+
+
+def verify_shards(shard_dir, manifests, expected):
+    """
+    Checks that the shards form exactly one complete build: one manifest
+    per shard index, the same shard count and basepath throughout, every
+    expected output produced by exactly one shard, nothing unexpected, and
+    every file on disk matching its recorded digest.
+
+    Args:
+        shard_dir (str): Directory the shards were built into.
+        manifests (list): Manifests from load_shard_manifests.
+        expected (set): Site-relative paths the merged site must contain.
+
+    Returns:
+        dict: Site-relative path -> path of the shard file that provides it.
+
+    Raises:
+        ShardMergeError: Listing every problem found.
+    """
+    problems = []
+    if not manifests:
+        raise ShardMergeError([f"{shard_dir}: no shard manifests found"])
+    counts = {data["count"] for data in manifests}
+    basepaths = {data["basepath"] for data in manifests}
+    if len(counts) > 1:
+        problems.append(f"shards disagree on the shard count: {sorted(counts)}")
+    if len(basepaths) > 1:
+        problems.append(f"shards were built with different basepaths: {sorted(basepaths)}")
+    indexes = [data["index"] for data in manifests]
+    for index in range(max(counts)):
+        if indexes.count(index) == 0:
+            problems.append(f"shard {index} is missing")
+        elif indexes.count(index) > 1:
+            problems.append(f"shard {index} appears {indexes.count(index)} times")
+
+    providers = {}
+    for data in manifests:
+        output_dir = os.path.join(shard_dir, shard_name(data["index"], data["count"]))
+        for rel_path, digest in sorted(data["outputs"].items()):
+            path = os.path.join(output_dir, rel_path)
+            if rel_path in providers:
+                problems.append(f"{rel_path} is duplicated in {providers[rel_path]} and {path}")
+                continue
+            providers[rel_path] = path
+            if rel_path not in expected:
+                problems.append(f"{path} is not part of the site")
+            elif not os.path.isfile(path) or file_sha256(path) != digest:
+                problems.append(f"{path} is missing or does not match its manifest")
+    for rel_path in sorted(expected - providers.keys()):
+        problems.append(f"{rel_path} was not built by any shard")
+    if problems:
+        raise ShardMergeError(problems)
+    return providers
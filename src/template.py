@@ -0,0 +1,114 @@
+import os
+import re
+from collections import OrderedDict
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+ROOT_ATTRIBUTES = ('href="', 'src="')
+
+# Compiled templates kept by load_template, one per (path, basepath) pair,
+# least recently used first. Bounded, as a long-lived renderer may be asked
+# for any number of basepaths.
+TEMPLATE_CACHE_SIZE = 32
+_template_cache = OrderedDict()
+
+
+class Template:
+    """
+    A page template compiled into static segments and named slots.
+
+    "{{ Name }}" placeholders become slots that are filled from a context
+    dict at render time. Root-relative href/src attributes are prefixed with
+    basepath: once at compile time for the static segments, and per chunk
+    for slot values.
+    """
+    def __init__(self, text, basepath="/"):
+        """
+        Args:
+            text (str): The template source.
+            basepath (str, optional): Prefix for root-relative links. Defaults to "/".
+        """
+        self.basepath = basepath
+        self.segments = []
+        self.slots = []
+        pos = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            segment = rewrite_links(text[pos:match.start()], basepath)
+            self.segments.append(segment)
+            self.slots.append((match.group(1), match.group(0), segment.endswith(ROOT_ATTRIBUTES)))
+            pos = match.end()
+        self.segments.append(rewrite_links(text[pos:], basepath))
+
+    @property
+    def names(self):
+        """The set of placeholder names used by the template."""
+        return {name for name, _, _ in self.slots}
+
+    def iter_render(self, context):
+        """
+        Generates the rendered page as chunks.
+
+        Args:
+            context (dict): Placeholder name -> value. A value may be a string,
+                an iterable of string chunks, or a callable returning such an
+                iterable (needed when a placeholder appears more than once).
+                Placeholders missing from context are left as written.
+
+        Yields:
+            str: Rendered chunks in document order.
+        """
+        basepath = self.basepath
+        for segment, (name, placeholder, in_root_attribute) in zip(self.segments, self.slots):
+            yield segment
+            value = context.get(name)
+            if value is None:
+                yield placeholder
+                continue
+            if callable(value):
+                value = value()
+            if isinstance(value, str):
+                value = (value,)
+            first = True
+            for chunk in value:
+                if first and in_root_attribute and chunk.startswith("/"):
+                    chunk = basepath + chunk[1:]
+                first = False
+                yield rewrite_links(chunk, basepath)
+        yield self.segments[-1]
+
+    def render(self, context):
+        """Renders the template to a single string."""
+        return "".join(self.iter_render(context))
+
+    def write(self, fp, context):
+        """Streams the rendered template into a text file object."""
+        fp.writelines(self.iter_render(context))
+
+
+def load_template(template_path, basepath="/"):
+    """
+    Returns the compiled template for a file, parsing it only when the file's
+    mtime or size has changed since it was last loaded.
+    """
+    stat = os.stat(template_path)
+    key = (os.path.abspath(template_path), basepath)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        _template_cache.move_to_end(key)
+        return cached[1]
+    with open(template_path, "r") as f:
+        template = Template(f.read(), basepath)
+    _template_cache[key] = ((stat.st_mtime_ns, stat.st_size), template)
+    _template_cache.move_to_end(key)
+    if len(_template_cache) > TEMPLATE_CACHE_SIZE:
+        _template_cache.popitem(last=False)
+    return template
+
+
+def rewrite_links(html, basepath):
+    """Prefixes root-relative href and src attributes with basepath."""
+    if basepath == "/":
+        return html
+    html = html.replace('href="/', 'href="' + basepath)
+    html = html.replace('src="/', 'src="' + basepath)
+    return html
@@ -26,8 +26,12 @@ class TextNode:
     This is the fundamental building block of our markdown parser - every piece
     of content gets converted into TextNode objects that can later be rendered
     into HTML or other formats.
+
+    Nodes use __slots__ rather than a per-instance __dict__, since parsed
+    documents can hold a very large number of them.
     """
-    
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         """
         Initialize a new TextNode.
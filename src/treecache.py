@@ -0,0 +1,235 @@
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate, islice
+
+from blockcache import RENDERER_VERSION
+from htmlnode import EMPTY_CHILDREN, EMPTY_PROPS, LeafNode, ParentNode
+from markdown_blocks import markdown_to_html_node
+from profiling import stage
+
+
+# Bump when the format changes, so stale trees are never served. Keys also
+# cover the renderer version, for changes to the parser's output.
+FORMAT_VERSION = 1
+MAGIC = b"HTC%d" % FORMAT_VERSION
+HEADER = struct.Struct("<4sIIII")
+
+# Offsets into a node record: tag, value, prop count, child count.
+RECORD_SIZE = 4
+
+
+def serialize_tree(node):
+    """
+    Encodes an HTMLNode tree as bytes.
+
+    Layout, all integers little-endian uint32:
+
+    - header: magic, string count, node count, prop pair count, text size
+    - string lengths (in characters), one per interned string
+    - node records in preorder: tag, value, prop count, child count, where
+      tag and value are 1-based string indexes and 0 means None
+    - prop pairs (key, value string indexes), in node order
+    - every interned string, concatenated, as UTF-8
+
+    Tags, attribute names and values and text are interned, so a tree of
+    a thousand <li> elements stores "li" once.
+
+    Raises:
+        TypeError: If a tag, value or attribute is not a string.
+    """
+    strings = {}
+    records = array("I")
+    props = array("I")
+
+    def intern(text):
+        if text is None:
+            return 0
+        if not isinstance(text, str):
+            raise TypeError(f"cannot serialize {type(text).__name__} in an HTMLNode tree")
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings) + 1
+        return index
+
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        records.append(intern(current.tag))
+        records.append(intern(current.value))
+        records.append(len(current.props))
+        records.append(len(current.children))
+        for key, value in current.props.items():
+            props.append(intern(key))
+            props.append(intern(value))
+        pending.extend(reversed(current.children))
+
+    lengths = array("I", (len(text) for text in strings))
+    text = "".join(strings).encode("utf-8")
+    if sys.byteorder == "big":
+        for numbers in (lengths, records, props):
+            numbers.byteswap()
+    header = HEADER.pack(MAGIC, len(strings), len(records) // RECORD_SIZE, len(props) // 2, len(text))
+    return b"".join((header, lengths.tobytes(), records.tobytes(), props.tobytes(), text))
+
+
+def deserialize_tree(data):
+    """
+    Decodes bytes written by serialize_tree back into an HTMLNode tree.
+
+    Raises:
+        ValueError: If data is not a serialized tree of this format version.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("truncated tree data")
+    magic, n_strings, n_nodes, n_props, text_size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a serialized tree, or another format version")
+    offset = HEADER.size
+    lengths = _read_array(data, offset, n_strings)
+    offset += 4 * n_strings
+    records = _read_array(data, offset, RECORD_SIZE * n_nodes)
+    offset += 4 * RECORD_SIZE * n_nodes
+    props = _read_array(data, offset, 2 * n_props)
+    offset += 8 * n_props
+    if len(data) != offset + text_size:
+        raise ValueError("truncated tree data")
+
+    text = data[offset:].decode("utf-8")
+    bounds = list(accumulate(lengths, initial=0))
+    strings = [None]
+    strings.extend(text[start:end] for start, end in zip(bounds, bounds[1:]))
+
+    # Nodes are rebuilt in preorder without going through the constructors,
+    # whose checks the tree already passed when it was first built.
+    new_leaf = LeafNode.__new__
+    new_parent = ParentNode.__new__
+    fields = iter(records)
+    prop_fields = iter(props)
+    root = None
+    # [children list, children still to come] for every unfinished parent.
+    open_nodes = []
+    for tag, value, prop_count, child_count in zip(fields, fields, fields, fields):
+        if value:
+            node = new_leaf(LeafNode)
+            node.value = strings[value]
+            node.children = EMPTY_CHILDREN
+        else:
+            node = new_parent(ParentNode)
+            node.value = None
+            node.children = []
+        node.tag = strings[tag]
+        if prop_count:
+            node.props = {
+                strings[name]: strings[prop_value]
+                for name, prop_value in islice(zip(prop_fields, prop_fields), prop_count)
+            }
+        else:
+            node.props = EMPTY_PROPS
+        if open_nodes:
+            parent = open_nodes[-1]
+            parent[0].append(node)
+            parent[1] -= 1
+            if not parent[1]:
+                open_nodes.pop()
+                while open_nodes and not open_nodes[-1][1]:
+                    open_nodes.pop()
+        else:
+            root = node
+        if child_count:
+            open_nodes.append([node.children, child_count])
+    if root is None:
+        raise ValueError("empty tree data")
+    return root
+
+
+def _read_array(data, offset, count):
+    numbers = array("I")
+    numbers.frombytes(data[offset:offset + 4 * count])
+    if sys.byteorder == "big":
+        numbers.byteswap()
+    return numbers
+
+
+class TreeCache:
+    """
+    On-disk cache of parsed pages. The HTMLNode tree markdown_to_html_node
+    builds for a page is stored in serialize_tree's format under a hash of
+    the markdown, so a page whose markdown is unchanged (for instance when
+    only the template changed) is loaded instead of parsed.
+    """
+    def __init__(self, disk_dir=None):
+        """
+        Args:
+            disk_dir (str, optional): Where trees are stored. Defaults to None (disabled).
+        """
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.disk_dir is not None
+
+    def key(self, markdown):
+        import hashlib
+
+        h = hashlib.sha1(b"%d\0" % RENDERER_VERSION)
+        h.update(markdown.encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key):
+        """Returns the cached tree for key, or None on a miss."""
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                data = f.read()
+            node = deserialize_tree(data)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return node
+
+    def put(self, key, node):
+        try:
+            data = serialize_tree(node)
+        except TypeError:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key[2:] + ".tree")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+tree_cache = TreeCache()
+
+
+def configure_tree_cache(disk_dir=None):
+    """Points the shared tree cache at disk_dir (None disables it) and resets its statistics."""
+    tree_cache.disk_dir = disk_dir
+    tree_cache.hits = tree_cache.misses = 0
+
+
+def cached_markdown_to_html_node(markdown):
+    """
+    Like markdown_to_html_node, but loads the tree from the shared tree cache
+    when this exact markdown has been parsed before.
+    """
+    if not tree_cache.enabled:
+        return markdown_to_html_node(markdown)
+    key = tree_cache.key(markdown)
+    with stage("tree load"):
+        node = tree_cache.get(key)
+    if node is None:
+        node = markdown_to_html_node(markdown)
+        tree_cache.put(key, node)
+    return node
@@ -0,0 +1,178 @@
+import io
+import os
+import threading
+from contextlib import contextmanager
+
+
+class OutputWriter:
+    """
+    Writes build outputs atomically through large buffers.
+
+    Every file is written to a temporary name in its destination directory
+    and renamed into place once complete, so a crashed build never leaves a
+    half-written page behind. Directories already created are remembered, so
+    each one is created at most once per build.
+
+    In background mode pages are rendered into memory and handed to a writer
+    thread through a bounded queue, so rendering never waits on the disk.
+    Errors from background writes are collected and returned by flush().
+    """
+    def __init__(self, buffer_size=1 << 18, background=False, queue_size=64):
+        """
+        Args:
+            buffer_size (int, optional): Write buffer size in bytes. Defaults to 256 KiB.
+            background (bool, optional): Write from a background thread. Defaults to False.
+            queue_size (int, optional): Pending writes allowed before open() blocks. Defaults to 64.
+        """
+        self.buffer_size = buffer_size
+        self.background = background
+        self.queue_size = queue_size
+        self._dirs = set()
+        self._dirs_lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._errors = []
+
+    def ensure_dir(self, dir_path):
+        """Creates dir_path (and parents) unless this writer already has."""
+        if dir_path == "" or dir_path in self._dirs:
+            return
+        os.makedirs(dir_path, exist_ok=True)
+        with self._dirs_lock:
+            self._dirs.add(dir_path)
+
+    @contextmanager
+    def open(self, dest_path, stream=False):
+        """
+        Opens dest_path for writing text. The file appears at dest_path only
+        when the block exits without an exception.
+
+        With stream, the text goes straight to disk even in background mode,
+        for outputs too large to buffer in memory.
+        """
+        dest_path = str(dest_path)
+        if self.background and not stream:
+            buffer = io.StringIO()
+            yield buffer
+            self._submit(dest_path, buffer.getvalue())
+            return
+        tmp_path = _tmp_path(dest_path)
+        try:
+            with self._open_tmp(tmp_path) as f:
+                yield f
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            _remove_quietly(tmp_path)
+            raise
+
+    def _open_tmp(self, tmp_path):
+        dir_path = os.path.dirname(tmp_path)
+        self.ensure_dir(dir_path)
+        try:
+            return open(tmp_path, "w", encoding="utf-8", buffering=self.buffer_size)
+        except FileNotFoundError:
+            # The directory was removed since it was cached (e.g. by pruning).
+            os.makedirs(dir_path, exist_ok=True)
+            return open(tmp_path, "w", encoding="utf-8", buffering=self.buffer_size)
+
+    def write(self, dest_path, text):
+        """Writes a whole string to dest_path atomically."""
+        with self.open(dest_path) as f:
+            f.write(text)
+
+    def _submit(self, dest_path, text):
+        if self._thread is None:
+            import queue
+
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._drain, daemon=True)
+            self._thread.start()
+        self._queue.put((dest_path, text))
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                dest_path, text = item
+                try:
+                    tmp_path = _tmp_path(dest_path)
+                    try:
+                        with self._open_tmp(tmp_path) as f:
+                            f.write(text)
+                        os.replace(tmp_path, dest_path)
+                    except BaseException:
+                        _remove_quietly(tmp_path)
+                        raise
+                except OSError as e:
+                    self._errors.append((dest_path, e))
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Waits for every pending background write to finish.
+
+        Returns:
+            list: (dest path, OSError) pairs for writes that failed since the
+            last flush.
+        """
+        if self._queue is not None:
+            self._queue.join()
+        errors, self._errors = self._errors, []
+        return errors
+
+    def close(self):
+        """Flushes pending writes and stops the background thread."""
+        errors = self.flush()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._queue = None
+        return errors
+
+
+default_writer = OutputWriter()
+
+
+def configure_writer(buffer_size=1 << 18, background=False, queue_size=64):
+    """Replaces the shared writer used by generate_page, closing the old one."""
+    global default_writer
+    default_writer.close()
+    default_writer = OutputWriter(buffer_size, background, queue_size)
+    return default_writer
+
+
+def write_json(path, data, **dump_options):
+    """
+    Saves data to path as JSON, atomically: it is dumped to a temporary name
+    unique to this process and thread, then renamed into place, so builds
+    running side by side (such as shards) never rename each other's file.
+    dump_options are passed to json.dump.
+    """
+    import json
+
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = _tmp_path(path)
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, **dump_options)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+
+
+def _tmp_path(dest_path):
+    return f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from asyncbuild import generate_pages_async
+from gencontent import PageBuildError, generate_pages_recursive
+from manifest import BuildManifest
+
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestGeneratePagesAsync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        with open(self.template, "w") as f:
+            f.write(TEMPLATE)
+        self.write_page("index.md", "# Home\n\n[post](/blog/post)")
+        self.write_page("blog/post.md", "# Post\n\nSome **bold** text.")
+        self.write_page("blog/deep/more.md", "# More\n\n- a\n- b")
+        self.write_page("zebra.md", "# Zebra\n\n`code`")
+
+    def write_page(self, rel_path, markdown):
+        path = os.path.join(self.content, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(markdown)
+
+    def read_tree(self, root):
+        files = {}
+        for dir_path, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dir_path, filename)
+                with open(path) as f:
+                    files[os.path.relpath(path, root)] = f.read()
+        return files
+
+    def test_matches_serial_build(self):
+        serial_dir = os.path.join(self.tmp.name, "serial")
+        async_dir = os.path.join(self.tmp.name, "async")
+        serial = generate_pages_recursive(self.content, self.template, serial_dir, "/")
+        pipelined = generate_pages_async(
+            self.content, self.template, async_dir, "/", io_workers=2, queue_size=1
+        )
+        self.assertEqual(self.read_tree(serial_dir), self.read_tree(async_dir))
+        self.assertEqual(
+            [page["source"] for page in serial], [page["source"] for page in pipelined]
+        )
+
+    def test_failures_reported_in_walk_order(self):
+        self.write_page("blog/untitled.md", "no title")
+        self.write_page("a.md", "no title either")
+        dest = os.path.join(self.tmp.name, "docs")
+        with self.assertRaises(PageBuildError) as cm:
+            generate_pages_async(self.content, self.template, dest, "/")
+        self.assertEqual(
+            [os.path.relpath(path, self.content) for path, _ in cm.exception.failures],
+            ["a.md", os.path.join("blog", "untitled.md")],
+        )
+        self.assertTrue(os.path.exists(os.path.join(dest, "zebra.html")))
+
+    def test_skips_fresh_pages(self):
+        dest = os.path.join(self.tmp.name, "docs")
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        pages = generate_pages_async(self.content, self.template, dest, "/", manifest)
+        self.assertEqual(len(pages), 4)
+
+        self.write_page("zebra.md", "# Zebra\n\nchanged")
+        manifest = BuildManifest(manifest.path, manifest.entries)
+        pages = generate_pages_async(self.content, self.template, dest, "/", manifest)
+        self.assertEqual([page["title"] for page in pages], ["Zebra"])
+
+
+if __name__ == "__main__":
+    unittest.main()
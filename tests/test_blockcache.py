@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from unittest import mock
+import blockcache
+from blockcache import BlockCache, block_cache, configure_block_cache
+from htmlnode import LeafNode, ParentNode
+from markdown_blocks import markdown_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = BlockCache(maxsize=2)
+        node = ParentNode("h1", [LeafNode(None, "title")])
+        self.assertIsNone(cache.get("# title"))
+        cache.put("# title", node)
+        self.assertIs(cache.get("# title"), node)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        cache = BlockCache(maxsize=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+        self.assertEqual(cache.get("a"), "A")
+        self.assertIsNone(cache.get("b"))
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            node = ParentNode("p", [LeafNode("b", "x"), LeafNode(None, " y")])
+            BlockCache(disk_dir=tmp).put("abcd", node)
+            cache = BlockCache(disk_dir=tmp)
+            self.assertEqual(cache.get("abcd").to_html(), "<p><b>x</b> y</p>")
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_off_by_default(self):
+        self.assertFalse(BlockCache().enabled)
+        self.assertTrue(BlockCache(disk_dir="cache").enabled)
+
+    def test_key_covers_the_renderer_version(self):
+        key = BlockCache().key("# title")
+        with mock.patch.object(blockcache, "RENDERER_VERSION", blockcache.RENDERER_VERSION + 1):
+            self.assertNotEqual(BlockCache().key("# title"), key)
+
+
+class TestCachedRendering(unittest.TestCase):
+    def tearDown(self):
+        configure_block_cache()
+
+    def test_cached_render_matches_uncached(self):
+        md = "# Title\n\nSome **bold** text\n\n- a\n- b\n\nSome **bold** text"
+        configure_block_cache()
+        expected = markdown_to_html_node(md).to_html()
+        configure_block_cache(maxsize=4096)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual(block_cache.stats()["misses"], 3)
+        self.assertEqual(block_cache.stats()["hits"], 5)
+
+    def test_cached_render_is_a_tree(self):
+        md = "# Hi\n\nsome **b** text"
+        configure_block_cache(maxsize=4096)
+        for _ in range(2):
+            node = markdown_to_html_node(md)
+            self.assertEqual([child.tag for child in node.children], ["h1", "p"])
+            self.assertEqual(node.children[1].children[1].tag, "b")
+
+    def test_disk_tier_serves_trees(self):
+        md = "# Hi\n\nsome **b** text"
+        expected = markdown_to_html_node(md).to_html()
+        with tempfile.TemporaryDirectory() as tmp:
+            configure_block_cache(disk_dir=tmp)
+            markdown_to_html_node(md)
+            configure_block_cache(disk_dir=tmp)
+            node = markdown_to_html_node(md)
+            self.assertEqual(block_cache.stats()["disk_hits"], 2)
+            self.assertEqual(node.children[0].tag, "h1")
+            self.assertEqual(node.to_html(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
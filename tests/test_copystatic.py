@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from copystatic import copy_files_recursive
+from manifest import BuildManifest
+
+
+class TestCopyFilesRecursive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        self.write(self.src, "index.css", "body {}")
+        self.write(self.src, "images/a.png", "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, root, rel_path, text):
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def read(self, rel_path):
+        with open(os.path.join(self.dest, rel_path)) as f:
+            return f.read()
+
+    def test_copies_tree(self):
+        result = copy_files_recursive(self.src, self.dest)
+        self.assertEqual(result["copied"], 2)
+        self.assertEqual(self.read("images/a.png"), "png")
+
+    def test_skips_unchanged_files(self):
+        copy_files_recursive(self.src, self.dest)
+        self.write(self.src, "index.css", "body { color: red }")
+        result = copy_files_recursive(self.src, self.dest)
+        self.assertEqual((result["copied"], result["skipped"]), (1, 1))
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+
+    def test_manifest_decides_what_is_unchanged(self):
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        copy_files_recursive(self.src, self.dest, manifest)
+        # Post-processing rewrites outputs in place.
+        self.write(self.dest, "index.css", "body{}")
+        result = copy_files_recursive(self.src, self.dest, manifest)
+        self.assertEqual((result["copied"], result["skipped"]), (0, 2))
+        self.assertEqual(self.read("index.css"), "body{}")
+        self.write(self.src, "index.css", "p {}")
+        self.write(self.dest, "index.css.gz", "stale")
+        result = copy_files_recursive(self.src, self.dest, manifest)
+        self.assertEqual((result["copied"], result["skipped"]), (1, 1))
+        self.assertEqual(self.read("index.css"), "p {}")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css.gz")))
+
+    def test_prune_removes_stale_files(self):
+        self.write(self.dest, "old.css", "stale")
+        result = copy_files_recursive(self.src, self.dest, prune=True)
+        self.assertEqual(result["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "old.css")))
+
+    def test_hardlink_mode(self):
+        copy_files_recursive(self.src, self.dest, mode="hardlink")
+        self.assertTrue(os.path.samefile(
+            os.path.join(self.src, "index.css"), os.path.join(self.dest, "index.css")
+        ))
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            copy_files_recursive(self.src, self.dest, mode="teleport")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from depgraph import DependencyGraph
+
+
+def page(source, dest, links=(), images=()):
+    return {"source": source, "dest": dest, "title": "T", "links": list(links), "images": list(images)}
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph("graph.json", "content", "static")
+        self.graph.record_page(
+            page("content/blog/tom/index.md", "docs/blog/tom/index.html",
+                 links=["/", "https://example.com"], images=["/images/tom.png"]),
+            "template.html",
+        )
+        self.graph.record_page(page("content/index.md", "docs/index.html", links=["/blog/tom"]), "template.html")
+
+    def test_template_change_affects_every_page(self):
+        self.assertEqual(
+            self.graph.affected(["template.html"]),
+            {"docs/blog/tom/index.html", "docs/index.html"},
+        )
+
+    def test_image_change_affects_referring_page(self):
+        self.assertEqual(self.graph.affected(["static/images/tom.png"]), {"docs/blog/tom/index.html"})
+
+    def test_linked_page_change_affects_linking_page(self):
+        self.assertEqual(
+            self.graph.affected(["content/blog/tom/index.md"]),
+            {"docs/blog/tom/index.html", "docs/index.html"},
+        )
+
+    def test_new_link_target_affects_linking_page(self):
+        self.assertEqual(self.graph.affected(["content/blog/tom.md"]), {"docs/index.html"})
+
+    def test_relative_links(self):
+        self.assertEqual(
+            self.graph.resolve("content/blog/tom/index.md", "pic.png", pages=False),
+            [os.path.join("static", "blog", "tom", "pic.png")],
+        )
+
+    def test_persistence_and_removal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.json")
+            self.graph.path = path
+            self.graph.save()
+            loaded = DependencyGraph.load(path, "content", "static")
+        self.assertEqual(loaded.source_of("docs/index.html"), "content/index.md")
+        loaded.remove("docs/index.html")
+        self.assertEqual(loaded.affected(["template.html"]), {"docs/blog/tom/index.html"})
+
+
+if __name__ == "__main__":
+    unittest.main()
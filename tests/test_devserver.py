@@ -0,0 +1,155 @@
+import gzip
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import devserver
+from copystatic import copy_files_recursive
+from depgraph import DependencyGraph
+from devserver import SiteWatcher, snapshot
+from gencontent import generate_pages_recursive
+from manifest import BuildManifest
+from postprocess import OutputProcessor
+
+
+class _Listing(list):
+    """A finished os.scandir listing."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.content_dir = os.path.join(self.dir, "content")
+        self.static_dir = os.path.join(self.dir, "static")
+        self.output_dir = os.path.join(self.dir, "docs")
+        self.template_path = os.path.join(self.dir, "template.html")
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(self.content("index.md"), "# Home\n\n[about](/about)")
+        self.write(self.content("about.md"), "# About\n\nhello")
+        self.write(self.content("blog", "post.md"), "# Post")
+        self.write(os.path.join(self.static_dir, "index.css"), "body {\n  color: red;\n}")
+
+        manifest = BuildManifest(os.path.join(self.dir, "manifest.json"))
+        depgraph = DependencyGraph(os.path.join(self.dir, "depgraph.json"), self.content_dir, self.static_dir)
+        copy_files_recursive(self.static_dir, self.output_dir, manifest)
+        generate_pages_recursive(
+            self.content_dir, self.template_path, self.output_dir, "/", manifest, depgraph=depgraph
+        )
+        processor = OutputProcessor(os.path.join(self.dir, "postprocess.json"), minify=True, compress=True)
+        processor.run(self.output_dir)
+        self.watcher = SiteWatcher(
+            self.content_dir,
+            self.static_dir,
+            self.template_path,
+            self.output_dir,
+            "/",
+            manifest,
+            depgraph,
+            debounce=0,
+            processor=processor,
+        )
+
+    def content(self, *parts):
+        return os.path.join(self.content_dir, *parts)
+
+    def output(self, *parts):
+        return os.path.join(self.output_dir, *parts)
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.watcher.poll(), set())
+
+    def test_edit_rebuilds_the_page_and_pages_linking_to_it(self):
+        self.write(self.content("about.md"), "# About us\n\nhello")
+        changed = self.watcher.poll()
+        self.assertEqual(changed, {self.content("about.md")})
+        self.assertEqual(
+            [source for source, _ in self.watcher.affected_pages(changed)],
+            [self.content("about.md"), self.content("index.md")],
+        )
+        self.assertEqual(self.watcher.rebuild(changed), 2)
+        self.assertEqual(
+            self.read(self.output("about.html")),
+            "<title>About us</title><div><h1>About us</h1><p>hello</p></div>",
+        )
+        with gzip.open(self.output("about.html") + ".gz", "rt") as f:
+            self.assertIn("About us", f.read())
+
+    def test_add_and_delete_pages(self):
+        self.write(self.content("blog", "new.md"), "# New")
+        changed = self.watcher.poll()
+        self.assertEqual(self.watcher.rebuild(changed), 1)
+        self.assertIn("<h1>New</h1>", self.read(self.output("blog", "new.html")))
+        self.assertTrue(os.path.exists(self.output("blog", "new.html.gz")))
+
+        os.remove(self.content("blog", "new.md"))
+        os.remove(self.content("blog", "post.md"))
+        changed = self.watcher.poll()
+        self.assertEqual(self.watcher.rebuild(changed), 2)
+        self.assertFalse(os.path.exists(self.output("blog")))
+
+    def test_static_files_are_processed_like_the_initial_build(self):
+        self.assertEqual(self.read(self.output("index.css")), "body{color:red}")
+        self.write(os.path.join(self.static_dir, "index.css"), "body {\n  color: blue;\n}")
+        self.assertEqual(self.watcher.rebuild(self.watcher.poll()), 1)
+        self.assertEqual(self.read(self.output("index.css")), "body{color:blue}")
+        with gzip.open(self.output("index.css") + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "body{color:blue}")
+
+    def test_files_removed_during_a_snapshot_are_skipped(self):
+        swap = self.content(".about.md.swp")
+        self.write(swap, "x")
+        real_scandir = os.scandir
+
+        def scandir(path):
+            entries = list(real_scandir(path))
+            if path == self.content_dir:
+                # Listed, then deleted before it is stat'ed.
+                os.remove(swap)
+            return _Listing(entries)
+
+        with mock.patch.object(devserver.os, "scandir", scandir):
+            state = snapshot([self.content_dir, os.path.join(self.dir, "missing")])
+        self.assertNotIn(swap, state)
+        self.assertIn(self.content("about.md"), state)
+
+    def test_failed_rebuilds_are_logged_and_watching_goes_on(self):
+        stop = threading.Event()
+        calls = []
+
+        def rebuild(changed):
+            calls.append(changed)
+            if len(calls) == 2:
+                stop.set()
+            # Everything looks changed again at the next poll.
+            self.watcher.state = {}
+            raise RuntimeError("disk full")
+
+        self.watcher.interval = 0
+        self.watcher.state = {}
+        self.watcher.rebuild = rebuild
+        with self.assertLogs("devserver", "ERROR") as logs:
+            self.watcher.run(stop)
+        self.assertEqual(len(calls), 2)
+        self.assertIn("Rebuild failed: RuntimeError: disk full", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
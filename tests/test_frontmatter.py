@@ -0,0 +1,99 @@
+import io
+import unittest
+
+from frontmatter import parse_date, read_front_matter, split_front_matter
+from gencontent import page_record, page_title
+from renderer import render
+from template import Template
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_no_front_matter(self):
+        md = "# Title\n\n---\n\ntext"
+        self.assertEqual(split_front_matter(md), ({}, md))
+
+    def test_leading_rule_is_not_front_matter(self):
+        for md in (
+            "---\n\n# Rule first\n\nSome text: here\n",
+            "---\njust text\n---\n",
+            "---\ntitle: x\n",
+            "---\n---\n# Title",
+        ):
+            self.assertEqual(split_front_matter(md), ({}, md), msg=md)
+            fp = io.StringIO(md)
+            self.assertEqual(read_front_matter(fp), {}, msg=md)
+            self.assertEqual(fp.read(), md, msg=md)
+
+    def test_rule_first_page_renders(self):
+        self.assertEqual(
+            render("---\n\n# Rule first\n\nSome text: here\n", Template("{{ Title }}")),
+            "Rule first",
+        )
+
+    def test_read_front_matter_stops_at_the_body(self):
+        fp = io.StringIO("---\ntitle: T\n---\n# Body\n")
+        self.assertEqual(read_front_matter(fp), {"title": "T"})
+        self.assertEqual(fp.read(), "# Body\n")
+
+    def test_values(self):
+        md = "\n".join([
+            "---",
+            'title: "Hello: world"',
+            "date: 2024-03-01",
+            "tags: [python, 'static sites']",
+            "draft: false",
+            "# a comment",
+            "aliases:",
+            "  - /old",
+            "  - /older",
+            "summary:",
+            "---",
+            "# Body",
+        ])
+        meta, body = split_front_matter(md)
+        self.assertEqual(meta, {
+            "title": "Hello: world",
+            "date": "2024-03-01",
+            "tags": ["python", "static sites"],
+            "draft": False,
+            "aliases": ["/old", "/older"],
+        })
+        self.assertEqual(body, "# Body")
+
+    def test_single_tag_and_empty_body(self):
+        meta, body = split_front_matter("---\ntags: python\n---")
+        self.assertEqual((meta, body), ({"tags": ["python"]}, ""))
+
+    def test_invalid(self):
+        for md in (
+            "---\ntitle: x\njust text\n---\n",
+            "---\ndate: 2024-13-01\n---\n",
+            "---\ndraft: maybe\n---\n",
+            "---\ntitle: [a, b]\n---\n",
+        ):
+            with self.assertRaises(ValueError, msg=md):
+                split_front_matter(md)
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date("2024-03-01").isoformat(), "2024-03-01T00:00:00")
+        self.assertEqual(parse_date("2024-03-01T10:30:00+02:00").utcoffset().total_seconds(), 7200)
+
+
+class TestPageTitle(unittest.TestCase):
+    def test_front_matter_title_wins(self):
+        self.assertEqual(page_title({"title": "Meta"}, "# Heading"), "Meta")
+        self.assertEqual(page_title({}, "text\n\n# Heading\n\n# Other"), "Heading")
+
+    def test_title_skips_comments_in_code_fences(self):
+        md = "Install:\n\n```\n# install the tools\nmake\n```\n\n## Setup\n\n# Real title\n\ntext"
+        self.assertEqual(page_title({}, md), "Real title")
+        with self.assertRaises(ValueError):
+            page_title({}, "```\n# only a comment\n```")
+
+    def test_page_record(self):
+        record = page_record("a.md", "a.html", "A", "---\ntags: [x]\n---\n# A\n[l](/b)")
+        self.assertEqual((record["meta"], record["links"]), ({"tags": ["x"]}, ["/b"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
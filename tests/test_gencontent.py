@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+
+import gencontent
+import writer
+from gencontent import (
+    PageBuildError,
+    collect_page_jobs,
+    generate_page,
+    generate_page_streaming,
+    generate_pages,
+    generate_pages_recursive,
+)
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.content_dir = os.path.join(self.dir, "content")
+        self.output_dir = os.path.join(self.dir, "docs")
+        self.template_path = os.path.join(self.dir, "template.html")
+        with open(self.template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        for i in range(6):
+            self.write(f"post{i}/index.md", f"# Post {i}\n\n[next](/post{i + 1})")
+        self.write("post3/index.md", "no title here")
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.content_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, rel_path):
+        with open(os.path.join(self.output_dir, rel_path)) as f:
+            return f.read()
+
+    def test_failures_are_reported_by_source_across_a_pool(self):
+        jobs = collect_page_jobs(self.content_dir, self.output_dir)
+        serial = generate_pages(jobs, self.template_path, "/", workers=1)
+        pooled = generate_pages(jobs, self.template_path, "/", workers=2, chunksize=1)
+        self.assertEqual(pooled, serial)
+        pages, failures = pooled
+        bad = os.path.join(self.content_dir, "post3", "index.md")
+        self.assertEqual(failures, [(bad, "ValueError: no title found")])
+        self.assertEqual([page["title"] for page in pages], ["Post 0", "Post 1", "Post 2", "Post 4", "Post 5"])
+        self.assertEqual(pages[0]["links"], ["/post1"])
+        self.assertEqual(
+            self.read(os.path.join("post5", "index.html")),
+            '<title>Post 5</title><div><h1>Post 5</h1><p><a href="/post6">next</a></p></div>',
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "post3", "index.html")))
+
+    def test_recursive_build_raises_after_writing_the_rest(self):
+        with self.assertRaises(PageBuildError) as cm:
+            generate_pages_recursive(self.content_dir, self.template_path, self.output_dir, "/", workers=2)
+        bad = os.path.join(self.content_dir, "post3", "index.md")
+        self.assertEqual([path for path, _ in cm.exception.failures], [bad])
+        self.assertIn("post3", str(cm.exception))
+        for i in (0, 1, 2, 4, 5):
+            self.assertTrue(os.path.exists(os.path.join(self.output_dir, f"post{i}", "index.html")))
+
+
+class TestGeneratePageStreaming(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.template_path = os.path.join(self.dir, "template.html")
+        with open(self.template_path, "w") as f:
+            f.write('<title>{{ Title }}</title><a href="/">home</a>{{ Content }}')
+        self.source = os.path.join(self.dir, "page.md")
+        blocks = ["Intro with [a link](/one) and ![pic](/img.png)", "# The Title", "```\ncode\n\nmore\n```"]
+        blocks += [f"- item {i}\n- **bold** {i}" for i in range(200)]
+        with open(self.source, "w") as f:
+            f.write("---\ntags: [x]\n---\n" + "\n\n".join(blocks) + "\n")
+
+    def render(self, dest_name, render_page):
+        dest = os.path.join(self.dir, dest_name)
+        page = render_page(self.source, self.template_path, dest, "/site/")
+        writer.default_writer.flush()
+        with open(dest) as f:
+            return page, f.read()
+
+    def test_same_page_as_generate_page(self):
+        page, html = self.render("whole.html", generate_page)
+        streamed_page, streamed_html = self.render(
+            "stream.html",
+            lambda *args: generate_page_streaming(*args, chunk_size=16),
+        )
+        self.assertEqual(streamed_html, html)
+        self.assertEqual(streamed_page, dict(page, dest=streamed_page["dest"]))
+        self.assertTrue(html.startswith('<title>The Title</title><a href="/site/">home</a><div><p>Intro'))
+
+    def test_generate_page_streams_large_files(self):
+        self.addCleanup(gencontent.configure_streaming, gencontent.stream_threshold)
+        gencontent.configure_streaming(os.path.getsize(self.source) - 1)
+        self.assertTrue(gencontent.should_stream(self.source))
+        gencontent.configure_streaming(0)
+        self.assertFalse(gencontent.should_stream(self.source))
+
+    def test_title_skips_comments_in_code_fences(self):
+        with open(self.source, "w") as f:
+            f.write("```sh\n# install\nmake\n```\n\n# Real title\n\ntext")
+        page, html = self.render("out.html", generate_page_streaming)
+        self.assertEqual(page["title"], "Real title")
+        self.assertTrue(html.startswith("<title>Real title</title>"))
+
+    def test_missing_title_writes_nothing(self):
+        with open(self.source, "w") as f:
+            f.write("no title\n\nat all")
+        dest = os.path.join(self.dir, "out.html")
+        with self.assertRaises(ValueError):
+            generate_page_streaming(self.source, self.template_path, dest, "/")
+        self.assertFalse(os.path.exists(dest))
+
+
+if __name__ == "__main__":
+    unittest.main()
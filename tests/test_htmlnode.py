@@ -1,5 +1,6 @@
+import io
 import unittest
-from src.htmlnode import HTMLNode
+from src.htmlnode import HTMLNode, LeafNode, ParentNode
 
 class TestHTMLNode(unittest.TestCase):
     def test_props_to_html(self):
@@ -18,5 +19,50 @@ class TestHTMLNode(unittest.TestCase):
         expected_repr = 'HTMLNode(tag=\'a\', value=\'Google\', children=[], props={\'href\': \'https://www.google.com\'})'
         self.assertEqual(repr(node4), expected_repr)
 
+class TestStreamingHTML(unittest.TestCase):
+    def test_iter_html_matches_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")]),
+            LeafNode("a", "link", {"href": "/x"}),
+        ], {"class": "post"})
+        expected = '<div class="post"><p><b>Bold</b> text</p><a href="/x">link</a></div>'
+        self.assertEqual(node.to_html(), expected)
+        self.assertEqual("".join(node.iter_html()), expected)
+
+    def test_write_html(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode(None, "one")])])
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), "<ul><li>one</li></ul>")
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 5000 + "x"))
+
+class TestCompactNodes(unittest.TestCase):
+    def test_no_instance_dict(self):
+        leaf = LeafNode("b", "x")
+        parent = ParentNode("p", [leaf])
+        self.assertFalse(hasattr(leaf, "__dict__"))
+        self.assertFalse(hasattr(parent, "__dict__"))
+
+    def test_empty_props_and_children_are_shared(self):
+        a = LeafNode("b", "x")
+        b = LeafNode("i", "y")
+        self.assertIs(a.props, b.props)
+        self.assertIs(a.children, b.children)
+        self.assertEqual(a.props, {})
+        self.assertEqual(a.children, [])
+
+    def test_shared_empty_props_are_read_only(self):
+        node = LeafNode("b", "x")
+        with self.assertRaises(TypeError):
+            node.props["class"] = "big"
+        node.props = {"class": "big"}
+        self.assertEqual(node.to_html(), '<b class="big">x</b>')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,158 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+import gencontent
+import imagemeta
+from gencontent import generate_pages_recursive
+from imagemeta import ImageMetadata, annotate_images, image_size
+from manifest import BuildManifest
+
+
+def png(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        imagemeta.PNG_SIGNATURE
+        + struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr
+        + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    )
+
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00\x00\x00;"
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof0 + b"\xff\xd9"
+
+
+def webp_lossless(width, height):
+    bits = (width - 1) | ((height - 1) << 14)
+    payload = b"\x2f" + bits.to_bytes(4, "little")
+    return b"RIFF" + struct.pack("<I", 12 + len(payload)) + b"WEBPVP8L" + struct.pack("<I", len(payload)) + payload
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def size(self, data):
+        path = os.path.join(self.dir, "image")
+        with open(path, "wb") as f:
+            f.write(data)
+        return image_size(path)
+
+    def test_formats(self):
+        self.assertEqual(self.size(png(640, 480)), (640, 480))
+        self.assertEqual(self.size(gif(16, 9)), (16, 9))
+        self.assertEqual(self.size(jpeg(1024, 768)), (1024, 768))
+        self.assertEqual(self.size(webp_lossless(300, 200)), (300, 200))
+
+    def test_unknown(self):
+        self.assertIsNone(self.size(b"not an image"))
+        self.assertIsNone(self.size(b"\xff\xd8\xff\xe0\x00"))
+
+
+class TestImageMetadata(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.static_dir = os.path.join(tmp.name, "static")
+        self.state_path = os.path.join(tmp.name, "images.json")
+        os.makedirs(os.path.join(self.static_dir, "images"))
+        self.write("images/a.png", png(10, 20))
+        self.write("images/b c.gif", gif(3, 4))
+
+    def write(self, rel_path, data):
+        with open(os.path.join(self.static_dir, rel_path), "wb") as f:
+            f.write(data)
+
+    def test_annotate(self):
+        metadata = ImageMetadata(self.static_dir, self.state_path)
+        metadata.scan()
+        html = '<p><img src="/images/a.png" alt="a"><img src="/images/b%20c.gif" alt=""><img src="https://x/y.png" alt=""></p>'
+        self.assertEqual(
+            metadata.annotate(html),
+            '<p><img src="/images/a.png" width="10" height="20" loading="lazy" decoding="async" alt="a">'
+            '<img src="/images/b%20c.gif" width="3" height="4" loading="lazy" decoding="async" alt="">'
+            '<img src="https://x/y.png" loading="lazy" decoding="async" alt=""></p>',
+        )
+
+    def test_scan_reads_only_changed_images(self):
+        metadata = ImageMetadata(self.static_dir, self.state_path)
+        self.assertEqual(metadata.scan(), 2)
+        metadata.save()
+
+        metadata = ImageMetadata.load(self.static_dir, self.state_path)
+        self.assertEqual(metadata.scan(), 0)
+        self.write("images/a.png", png(11, 21))
+        os.remove(os.path.join(self.static_dir, "images", "b c.gif"))
+        self.assertEqual(metadata.scan(), 1)
+        self.assertEqual(metadata.size_of("/images/a.png"), [11, 21])
+        self.assertIsNone(metadata.size_of("/images/b%20c.gif"))
+        self.assertEqual(len(metadata.sizes), 1)
+
+    def test_annotate_images_uses_configured_metadata(self):
+        self.addCleanup(imagemeta.configure_image_metadata)
+        imagemeta.configure_image_metadata(self.static_dir, self.state_path).scan()
+        chunks = ["<p>", '<img src="/images/a.png" alt="">', "</p>"]
+        self.assertEqual(
+            "".join(annotate_images(chunks)),
+            '<p><img src="/images/a.png" width="10" height="20" loading="lazy" decoding="async" alt=""></p>',
+        )
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.static_dir = os.path.join(self.dir, "static")
+        self.content_dir = os.path.join(self.dir, "content")
+        self.output_dir = os.path.join(self.dir, "docs")
+        self.template_path = os.path.join(self.dir, "template.html")
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+        os.makedirs(self.static_dir)
+        os.makedirs(self.content_dir)
+        self.write(self.template_path, "{{ Content }}")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\n![a](/a.png)")
+        self.write(os.path.join(self.content_dir, "plain.md"), "# Plain")
+        self.write(os.path.join(self.static_dir, "a.png"), png(10, 20))
+        self.addCleanup(imagemeta.configure_image_metadata)
+
+    def write(self, path, data):
+        mode = "wb" if isinstance(data, bytes) else "w"
+        with open(path, mode) as f:
+            f.write(data)
+
+    def build(self):
+        imagemeta.configure_image_metadata(self.static_dir, os.path.join(self.dir, "images.json")).scan()
+        manifest = BuildManifest.load(self.manifest_path) or BuildManifest(self.manifest_path)
+        pages = generate_pages_recursive(
+            self.content_dir, self.template_path, self.output_dir, "/", manifest
+        )
+        manifest.save()
+        return sorted(os.path.basename(page["dest"]) for page in pages)
+
+    def test_pages_are_checked_without_reading_their_markdown(self):
+        self.assertEqual(self.build(), ["index.html", "plain.html"])
+        with mock.patch.object(gencontent, "iter_markdown_blocks", side_effect=AssertionError):
+            self.assertEqual(self.build(), [])
+            self.write(os.path.join(self.static_dir, "a.png"), png(30, 40))
+            self.assertEqual(self.build(), ["index.html"])
+            self.write(os.path.join(self.content_dir, "plain.md"), "# Plain\n\n![a](/a.png)")
+            self.assertEqual(self.build(), ["plain.html"])
+            self.assertEqual(self.build(), [])
+        with open(os.path.join(self.output_dir, "plain.html")) as f:
+            self.assertIn('width="30" height="40"', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from inline_markdown import split_nodes_delimiter, TextNode, TextType
+from inline_markdown import split_nodes_delimiter, text_to_textnodes, TextNode, TextType
 
 class TestSplitNodesDelimiter(unittest.TestCase):
 
@@ -69,5 +69,61 @@ class TestSplitNodesDelimiter(unittest.TestCase):
           TextNode(".", TextType.TEXT)
       ])
 
+class TestTextToTextNodes(unittest.TestCase):
+
+    def test_all_inline_types(self):
+        text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        self.assertEqual(text_to_textnodes(text), [
+            TextNode("This is ", TextType.TEXT),
+            TextNode("text", TextType.BOLD),
+            TextNode(" with an ", TextType.TEXT),
+            TextNode("italic", TextType.ITALIC),
+            TextNode(" word and a ", TextType.TEXT),
+            TextNode("code block", TextType.CODE),
+            TextNode(" and an ", TextType.TEXT),
+            TextNode("obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"),
+            TextNode(" and a ", TextType.TEXT),
+            TextNode("link", TextType.LINK, "https://boot.dev"),
+        ])
+
+    def test_many_links(self):
+        text = "".join(f"[l{i}](/p/{i}) " for i in range(300))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 600)
+        self.assertEqual(nodes[-2], TextNode("l299", TextType.LINK, "/p/299"))
+
+    def test_empty_text(self):
+        self.assertEqual(text_to_textnodes(""), [])
+
+    def test_unclosed_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("This is **not closed")
+
+    def test_delimiters_in_link_and_image_urls(self):
+        self.assertEqual(text_to_textnodes("[a](http://x/a_b_c)"), [TextNode("a", TextType.LINK, "http://x/a_b_c")])
+        self.assertEqual(text_to_textnodes("![i](p_q_r.png)"), [TextNode("i", TextType.IMAGE, "p_q_r.png")])
+        self.assertEqual(text_to_textnodes("see [a](x_y)"), [
+            TextNode("see ", TextType.TEXT),
+            TextNode("a", TextType.LINK, "x_y"),
+        ])
+
+    def test_link_text_is_literal(self):
+        self.assertEqual(text_to_textnodes("[**b**](u)"), [TextNode("**b**", TextType.LINK, "u")])
+        self.assertEqual(text_to_textnodes("a [`c`](u)"), [
+            TextNode("a ", TextType.TEXT),
+            TextNode("`c`", TextType.LINK, "u"),
+        ])
+
+    def test_code_is_literal(self):
+        self.assertEqual(text_to_textnodes("`a_b` and _c_"), [
+            TextNode("a_b", TextType.CODE),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("c", TextType.ITALIC),
+        ])
+
+    def test_delimiters_straddling_a_link(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("[**](u)**")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from linkcheck import BrokenLinksError, SiteIndex, check_links, link_records
+
+
+PATHS = ["index.html", "blog/tom/index.html", "contact/index.html", "about.html", "images/tom.png"]
+
+
+def record(dest, links=(), images=()):
+    return {"source": "content/" + dest, "dest": os.path.join("docs", dest), "links": list(links), "images": list(images)}
+
+
+class TestSiteIndex(unittest.TestCase):
+    def test_root_relative(self):
+        index = SiteIndex("/", PATHS)
+        for url in ("/", "/blog/tom", "/blog/tom/", "/about.html", "/images/tom.png", "/contact#form"):
+            self.assertTrue(index.resolves("index.html", url), url)
+        for url in ("/blog/tim", "/about", "/images/tim.png", "/../index.html"):
+            self.assertFalse(index.resolves("index.html", url), url)
+
+    def test_relative(self):
+        index = SiteIndex("/", PATHS)
+        self.assertTrue(index.resolves("blog/tom/index.html", "../../contact"))
+        self.assertTrue(index.resolves("blog/tom/index.html", "index.html"))
+        self.assertFalse(index.resolves("blog/tom/index.html", "contact"))
+        self.assertFalse(index.resolves("index.html", "../outside.html"))
+
+    def test_external_and_fragments_are_skipped(self):
+        index = SiteIndex("/", PATHS)
+        for url in ("https://example.com/x", "//cdn.example.com/x.js", "mailto:a@b.c", "#top"):
+            self.assertTrue(index.resolves("index.html", url), url)
+
+    def test_basepath(self):
+        index = SiteIndex("/site/", PATHS)
+        self.assertTrue(index.resolves("index.html", "/blog/tom"))
+        # rewrite_links would prefix the basepath a second time.
+        self.assertFalse(index.resolves("index.html", "/site/blog/tom"))
+        # Without a trailing slash, "/blog" would become "/siteblog".
+        self.assertFalse(SiteIndex("/site", PATHS).resolves("index.html", "/blog/tom"))
+
+    def test_images_need_a_file(self):
+        index = SiteIndex("/", PATHS)
+        self.assertFalse(index.resolves("index.html", "/blog/tom", directory_index=False))
+
+
+class TestCheckLinks(unittest.TestCase):
+    def test_reports_broken_targets_in_page_order(self):
+        index = SiteIndex("/", PATHS)
+        pages = [
+            record("index.html", links=["/blog/tom", "/blog/tim"], images=["/images/tim.png"]),
+            record("about.html", links=["https://example.com", "tom"]),
+        ]
+        broken = check_links(pages, index, "docs")
+        self.assertEqual(broken, [
+            ("content/index.html", "link", "/blog/tim"),
+            ("content/index.html", "image", "/images/tim.png"),
+            ("content/about.html", "link", "tom"),
+        ])
+        self.assertIn("3 broken link(s)", str(BrokenLinksError(broken)))
+
+    def test_from_build_and_unrendered_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content_dir = os.path.join(tmp, "content")
+            static_dir = os.path.join(tmp, "static")
+            dest_dir = os.path.join(tmp, "docs")
+            os.makedirs(os.path.join(static_dir, "images"))
+            os.makedirs(content_dir)
+            open(os.path.join(static_dir, "images", "a.png"), "w").close()
+            source = os.path.join(content_dir, "index.md")
+            with open(source, "w") as f:
+                f.write("# Home\n\n[a](/missing) ![a](/images/a.png)")
+            jobs = [(source, os.path.join(dest_dir, "index.html"))]
+
+            index = SiteIndex.from_build(jobs, dest_dir, static_dir)
+            self.assertEqual(index.paths, {"index.html", "images/a.png"})
+            broken = check_links(link_records(jobs, []), index, dest_dir)
+            self.assertEqual(broken, [(source, "link", "/missing")])
+
+
+if __name__ == "__main__":
+    unittest.main()
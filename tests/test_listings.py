@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+
+import writer
+from listings import MetadataIndex, write_feed, write_listings, write_sitemap
+from manifest import BuildManifest
+
+
+def record(source, dest, title, **meta):
+    return {"source": source, "dest": dest, "title": title, "meta": meta, "links": [], "images": []}
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.content_dir = os.path.join(self.dir, "content")
+        self.output_dir = os.path.join(self.dir, "docs")
+        os.makedirs(os.path.join(self.content_dir, "blog"))
+        with open(os.path.join(self.dir, "template.html"), "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.jobs = []
+        self.pages = []
+        self.add("index.md", "index.html", "Home")
+        for i in range(1, 6):
+            self.add(f"blog/p{i}.md", f"blog/p{i}.html", f"Post {i}", date=f"2024-01-0{i}", tags=["a"] if i % 2 else ["a", "b"])
+        self.add("blog/draft.md", "blog/draft.html", "Draft", date="2024-02-01", draft=True)
+
+    def add(self, rel_source, rel_dest, title, **meta):
+        source = os.path.join(self.content_dir, rel_source)
+        lines = ["---"] + [f"{key}: {value}" for key, value in meta.items() if key != "tags"]
+        if "tags" in meta:
+            lines.append(f"tags: [{', '.join(meta['tags'])}]")
+        lines += ["---", f"# {title}"]
+        with open(source, "w") as f:
+            f.write("\n".join(lines) if meta else f"# {title}")
+        if "draft" in meta:
+            meta["draft"] = meta["draft"] is True
+        dest = os.path.join(self.output_dir, rel_dest)
+        self.jobs.append((source, dest))
+        self.pages.append(record(source, dest, title, **meta))
+
+    def index(self):
+        index = MetadataIndex(os.path.join(self.dir, "metadata.json"))
+        index.update(self.jobs, self.pages, self.output_dir)
+        return index
+
+    def read(self, rel_path):
+        with open(os.path.join(self.output_dir, rel_path)) as f:
+            return f.read()
+
+    def test_posts_collections_and_tags(self):
+        index = self.index()
+        self.assertEqual([entry["title"] for entry in index.posts()], [f"Post {i}" for i in range(5, 0, -1)])
+        self.assertEqual(list(index.collections()), ["blog"])
+        self.assertEqual({tag: len(posts) for tag, posts in index.tags().items()}, {"a": 5, "b": 2})
+        self.assertEqual(len(index.entries()), 6)
+
+    def test_update_reuses_entries_of_unrendered_pages(self):
+        index = self.index()
+        index.save()
+        index = MetadataIndex.load(index.state_path)
+        self.assertEqual(index.update(self.jobs, [], self.output_dir), 0)
+        with open(self.jobs[1][0], "w") as f:
+            f.write("---\ntitle: Renamed\ndate: 2023-12-31\n---\n# Post 1")
+        self.assertEqual(index.update(self.jobs[1:], [], self.output_dir), 1)
+        self.assertEqual(index.posts()[-1]["title"], "Renamed")
+        self.assertNotIn(self.jobs[0][0], index.pages)
+
+    def test_paginated_listings(self):
+        template_path = os.path.join(self.dir, "template.html")
+        urls = write_listings(self.index(), template_path, self.output_dir, "/site/", page_size=2)
+        writer.default_writer.flush()
+        self.assertEqual(urls, [
+            "blog/", "blog/page/2/", "blog/page/3/",
+            "tags/", "tags/a/", "tags/a/page/2/", "tags/a/page/3/", "tags/b/",
+        ])
+        first = self.read("blog/index.html")
+        self.assertIn('<a href="/site/blog/p5">Post 5</a>', first)
+        self.assertIn('<a href="/site/blog/page/2/">Older</a>', first)
+        self.assertNotIn("Draft", first)
+        last = self.read(os.path.join("blog", "page", "3", "index.html"))
+        self.assertIn("<title>Blog (page 3 of 3)</title>", last)
+        self.assertIn('<a href="/site/blog/page/2/">Newer</a>', last)
+
+    def test_feed_and_sitemap(self):
+        index = self.index()
+        self.assertEqual(write_feed(index, self.output_dir, "https://example.com/", "/site/", size=2), 2)
+        self.assertEqual(write_sitemap(index, self.output_dir, "https://example.com", "/site/", ["blog/"]), 7)
+        writer.default_writer.flush()
+        feed = self.read("feed.xml")
+        self.assertIn("<title>Home</title>", feed)
+        self.assertIn("<link>https://example.com/site/blog/p5</link>", feed)
+        self.assertIn("<pubDate>Fri, 05 Jan 2024 00:00:00 +0000</pubDate>", feed)
+        self.assertNotIn("p3", feed)
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<url><loc>https://example.com/site/blog/p1</loc><lastmod>2024-01-01</lastmod></url>", sitemap)
+        self.assertIn("<loc>https://example.com/site/blog/</loc>", sitemap)
+        self.assertNotIn("draft", sitemap)
+
+    def test_unchanged_outputs_are_not_rewritten(self):
+        template_path = os.path.join(self.dir, "template.html")
+        manifest = BuildManifest(os.path.join(self.dir, "manifest.json"))
+        write_listings(self.index(), template_path, self.output_dir, page_size=2, manifest=manifest)
+        writer.default_writer.flush()
+        path = os.path.join(self.output_dir, "blog", "index.html")
+        os.utime(path, ns=(0, 0))
+        manifest.seen.clear()
+        write_listings(self.index(), template_path, self.output_dir, page_size=2, manifest=manifest)
+        writer.default_writer.flush()
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        manifest.seen.clear()
+        write_listings(self.index(), template_path, self.output_dir, page_size=10, manifest=manifest)
+        writer.default_writer.flush()
+        self.assertIn(os.path.normpath(os.path.join(self.output_dir, "blog", "page", "2", "index.html")), manifest.prune())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import main
+
+
+SRC_DIR = os.path.dirname(os.path.abspath(main.__file__))
+
+
+class TestParseArgs(unittest.TestCase):
+    def test_build_is_the_default_command(self):
+        args = main.parse_args(["/base/", "--incremental"])
+        self.assertEqual((args.command, args.basepath, args.incremental), ("build", "/base/", True))
+
+    def test_render_one(self):
+        args = main.parse_args(["render-one", "content/a.md", "-o", "-"])
+        self.assertEqual((args.command, args.source, args.output, args.basepath), ("render-one", "content/a.md", "-", "/"))
+
+    def test_watch_rejects_site_wide_outputs(self):
+        self.assertTrue(main.parse_args(["serve", "--minify", "--compress"]).minify)
+        with self.assertRaises(SystemExit):
+            main.parse_args(["watch", "--search"])
+
+    def test_import_is_lazy(self):
+        code = "import sys, main; print(sorted(m for m in ('gencontent', 'markdown_blocks', 'textnode') if m in sys.modules))"
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(out.strip(), "[]")
+
+    def test_render_skips_build_modules(self):
+        code = (
+            "import sys, renderer; renderer.render('# Hi\\n\\n![a](/a.png) on *2024-01-01*');"
+            "print(sorted(m for m in ('datetime', 'imagemeta', 'json', 'manifest', 'writer') if m in sys.modules))"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(out.strip(), "[]")
+
+
+class TestCommands(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        os.makedirs("content")
+        with open("template.html", "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        with open(os.path.join("content", "index.md"), "w") as f:
+            f.write("# Home\n\nhello")
+
+    def test_check(self):
+        self.assertEqual(main.main(["check", "-q"]), 0)
+        with open(os.path.join("content", "bad.md"), "w") as f:
+            f.write("no title")
+        self.assertEqual(main.main(["check", "-q"]), 1)
+        self.assertFalse(os.path.exists("docs"))
+
+    def test_check_links(self):
+        with open(os.path.join("content", "index.md"), "w") as f:
+            f.write("# Home\n\n[gone](/gone)")
+        self.assertEqual(main.main(["check", "-q"]), 1)
+        with open(os.path.join("content", "gone.md"), "w") as f:
+            f.write("# Gone")
+        os.makedirs("static")
+        self.assertEqual(main.main(["check", "-q"]), 1)
+        self.assertEqual(main.main(["-q", "--check-links"]), 1)
+        with open(os.path.join("content", "index.md"), "w") as f:
+            f.write("# Home\n\n[gone](/gone.html)")
+        self.assertEqual(main.main(["check", "-q"]), 0)
+        self.assertEqual(main.main(["-q", "--check-links", "--incremental"]), 0)
+
+    def test_full_build_resets_the_manifest(self):
+        os.makedirs("static")
+        self.assertEqual(main.main(["-q", "--incremental"]), 0)
+        os.makedirs(os.path.join("content", "new"))
+        with open(os.path.join("content", "new", "index.md"), "w") as f:
+            f.write("# New")
+        self.assertEqual(main.main(["-q"]), 0)
+        self.assertTrue(os.path.exists(os.path.join("docs", "new", "index.html")))
+        os.remove(os.path.join("content", "new", "index.md"))
+        self.assertEqual(main.main(["-q", "--incremental"]), 0)
+        self.assertEqual(os.listdir("docs"), ["index.html"])
+
+    def test_render_one_and_clean(self):
+        self.assertEqual(main.main(["render-one", os.path.join("content", "index.md"), "-q"]), 0)
+        with open(os.path.join("docs", "index.html")) as f:
+            self.assertEqual(f.read(), "<title>Home</title><div><h1>Home</h1><p>hello</p></div>")
+        os.makedirs(".cache")
+        self.assertEqual(main.main(["clean", "--keep-cache", "-q"]), 0)
+        self.assertFalse(os.path.exists("docs"))
+        self.assertTrue(os.path.exists(".cache"))
+
+    def test_shards_merge_into_the_full_build(self):
+        os.makedirs(os.path.join("static", "images"))
+        with open(os.path.join("static", "images", "a.png"), "w") as f:
+            f.write("png")
+        for i in range(6):
+            os.makedirs(os.path.join("content", f"post{i}"))
+            with open(os.path.join("content", f"post{i}", "index.md"), "w") as f:
+                f.write(f"# Post {i}\n\n![a](/images/a.png)")
+        self.assertEqual(main.main(["-q"]), 0)
+        expected = {}
+        for dir_path, _, filenames in os.walk("docs"):
+            for filename in filenames:
+                with open(os.path.join(dir_path, filename)) as f:
+                    expected[os.path.join(dir_path, filename)] = f.read()
+
+        for i in range(3):
+            self.assertEqual(main.main(["/", "--shard", f"{i}/3", "-q"]), 0)
+        self.assertEqual(main.main(["merge", "-q"]), 0)
+        merged = {}
+        for dir_path, _, filenames in os.walk("docs"):
+            for filename in filenames:
+                with open(os.path.join(dir_path, filename)) as f:
+                    merged[os.path.join(dir_path, filename)] = f.read()
+        self.assertEqual(merged, expected)
+
+        os.remove(os.path.join("shards", "1-of-3.json"))
+        self.assertEqual(main.main(["merge", "-q"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
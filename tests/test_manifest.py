@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from manifest import BuildManifest
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, *parts, text="x"):
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_fresh_after_record(self):
+        out = self.write("out", "a.html")
+        manifest = BuildManifest(self.manifest_path)
+        self.assertFalse(manifest.is_fresh(out, "abc"))
+        manifest.record(out, "abc")
+        manifest.save()
+
+        reloaded = BuildManifest.load(self.manifest_path)
+        self.assertTrue(reloaded.is_fresh(out, "abc"))
+        self.assertFalse(reloaded.is_fresh(out, "def"))
+
+    def test_page_images_are_kept_until_the_page_is_removed(self):
+        out = self.write("out", "a.html")
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record(out, "abc", ["/a.png"])
+        manifest.save()
+
+        reloaded = BuildManifest.load(self.manifest_path)
+        self.assertEqual(reloaded.images_of(out), ["/a.png"])
+        reloaded.record(out, "def")
+        self.assertIsNone(reloaded.images_of(out))
+        reloaded.record(out, "abc", [])
+        reloaded.remove(out)
+        self.assertEqual(reloaded.images, {})
+
+    def test_missing_output_is_stale(self):
+        out = os.path.join(self.root, "gone.html")
+        manifest = BuildManifest(self.manifest_path, {os.path.normpath(out): "abc"})
+        self.assertFalse(manifest.is_fresh(out, "abc"))
+
+    def test_prune_removes_orphans_and_empty_dirs(self):
+        kept = self.write("out", "kept.html")
+        orphan = self.write("out", "old", "gone.html")
+        manifest = BuildManifest(self.manifest_path, {
+            os.path.normpath(kept): "1",
+            os.path.normpath(orphan): "2",
+        })
+        manifest.is_fresh(kept, "1")
+        self.assertEqual(manifest.prune(), [os.path.normpath(orphan)])
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(os.path.dirname(orphan)))
+
+    def test_rewritten_and_removed_outputs_lose_compressed_siblings(self):
+        out = self.write("out", "a.html")
+        gz = self.write("out", "a.html.gz")
+        manifest = BuildManifest(self.manifest_path, {os.path.normpath(out): "1"})
+        manifest.record(out, "1")
+        self.assertTrue(os.path.exists(gz))
+        manifest.record(out, "2")
+        self.assertFalse(os.path.exists(gz))
+        gz = self.write("out", "a.html.gz")
+        manifest.remove(out)
+        self.assertFalse(os.path.exists(gz))
+
+    def test_load_missing_returns_none(self):
+        self.assertIsNone(BuildManifest.load(self.manifest_path))
+
+    def test_load_with_other_options_returns_none(self):
+        BuildManifest(self.manifest_path, options={"minify": True}).save()
+        self.assertIsNotNone(BuildManifest.load(self.manifest_path, {"minify": True}))
+        self.assertIsNone(BuildManifest.load(self.manifest_path, {"minify": False}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,15 @@
+import io
 import unittest
-from markdown_blocks import markdown_to_blocks, block_to_block_type, BlockType
+from markdown_blocks import (
+    markdown_to_blocks,
+    block_to_block_type,
+    iter_block_spans,
+    iter_blocks_html,
+    iter_line_spans,
+    iter_markdown_blocks,
+    markdown_to_html_node,
+    BlockType,
+)
 
 
 class TestMarkdownToHTML(unittest.TestCase):
@@ -61,5 +71,61 @@ This is the same paragraph on a new line
         self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
 
+    def test_fenced_code_with_blank_lines(self):
+        md = "Intro\n\n```\nfirst\n\nsecond\n```\n\nOutro"
+        self.assertEqual(
+            markdown_to_blocks(md),
+            ["Intro", "```\nfirst\n\nsecond\n```", "Outro"],
+        )
+
+    def test_unclosed_fence_ends_at_blank_line(self):
+        md = "```\ncode\n\nparagraph"
+        self.assertEqual(markdown_to_blocks(md), ["```\ncode", "paragraph"])
+
+    def test_iter_block_spans(self):
+        md = "  # Title  \n\n- a\n- b\n"
+        spans = list(iter_block_spans(md))
+        self.assertEqual(
+            [(block_type, md[start:end]) for block_type, start, end in spans],
+            [(BlockType.HEADING, "# Title"), (BlockType.ULIST, "- a\n- b")],
+        )
+
+    def test_iter_line_spans_matches_split(self):
+        for text in ("", "a", "a\nb", "a\n", "\n\nb", "> x\n>\n> y"):
+            lines = [text[start:end] for start, end in iter_line_spans(text)]
+            self.assertEqual(lines, text.split("\n"))
+        self.assertEqual(list(iter_line_spans("x\n- a\n- b\ny", 2, 9)), [(2, 5), (6, 9)])
+
+    def test_list_and_quote_blocks(self):
+        html = markdown_to_html_node("- a\n- **b**\n\n1. one\n2. two\n\n> first\n>\n>> second").to_html()
+        self.assertEqual(
+            html,
+            "<div><ul><li>a</li><li><b>b</b></li></ul><ol><li>one</li><li>two</li></ol>"
+            "<blockquote>first  second</blockquote></div>",
+        )
+
+    def test_iter_markdown_blocks_matches_whole_document(self):
+        docs = [
+            "  # Title  \n\n- a\n- b\n",
+            "Intro\n\n```\nfirst\n\nsecond\n```\n\nOutro",
+            "```\ncode\n\nparagraph",
+            "```py\nx\n```\n\n\n\n> q\n> r\n\n",
+            "``` inline ```\n\ntext",
+            "",
+            "\n\n   \n",
+        ]
+        for md in docs:
+            expected = [(block_type, md[start:end]) for block_type, start, end in iter_block_spans(md)]
+            for chunk_size in (1, 2, 5, 1 << 16):
+                self.assertEqual(list(iter_markdown_blocks(io.StringIO(md), chunk_size)), expected, (md, chunk_size))
+
+    def test_iter_blocks_html(self):
+        md = "# Title\n\nSome **bold** text\n\n```\ncode\n```"
+        blocks = iter_markdown_blocks(io.StringIO(md), 3)
+        self.assertEqual("".join(iter_blocks_html(blocks)), markdown_to_html_node(md).to_html())
+        with self.assertRaises(ValueError):
+            list(iter_blocks_html(iter_markdown_blocks(io.StringIO("\n\n"))))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
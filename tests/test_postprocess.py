@@ -0,0 +1,87 @@
+import gzip
+import os
+import tempfile
+import unittest
+from postprocess import OutputProcessor, minify_css, minify_html
+
+
+class TestMinify(unittest.TestCase):
+    def test_minify_html_collapses_whitespace(self):
+        html = "<p>\n    Hello   <b>world</b>\n</p>  <!-- note -->"
+        self.assertEqual(minify_html(html), "<p>\nHello <b>world</b>\n</p> ")
+
+    def test_minify_html_preserves_pre(self):
+        html = "<div>  a  </div><pre><code>x  =  1\n\n  y</code></pre>"
+        self.assertEqual(minify_html(html), "<div> a </div><pre><code>x  =  1\n\n  y</code></pre>")
+
+    def test_minify_html_preserves_attribute_values(self):
+        html = '<p title="a   b"\n   class=x>  <a href=\'q  >r\'>x</a> <!-- c -->  y</p>'
+        self.assertEqual(minify_html(html), '<p title="a   b"\nclass=x> <a href=\'q  >r\'>x</a> y</p>')
+
+    def test_minify_css(self):
+        css = "/* c */\nbody {\n  color: red;\n  margin: 0 auto;\n}\n"
+        self.assertEqual(minify_css(css), "body{color:red;margin:0 auto}")
+
+    def test_minify_css_keeps_strings_and_pseudo_classes(self):
+        css = 'div :first-child , a > b {\n  content: "a : b  /* x */" ;\n}\np::before { content: \'{ ; }\' }'
+        self.assertEqual(minify_css(css), 'div :first-child,a>b{content:"a : b  /* x */"}p::before{content:\'{ ; }\'}')
+
+
+class TestOutputProcessor(unittest.TestCase):
+    def test_compress_and_skip_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = os.path.join(tmp, "docs")
+            os.makedirs(out_dir)
+            page = os.path.join(out_dir, "index.html")
+            with open(page, "w") as f:
+                f.write("<p>  hi  </p>")
+            state_path = os.path.join(tmp, "state.json")
+
+            result = OutputProcessor(state_path, minify=True).run(out_dir)
+            self.assertEqual(result["processed"], 1)
+            with open(page) as f:
+                self.assertEqual(f.read(), "<p> hi </p>")
+            with gzip.open(page + ".gz", "rt") as f:
+                self.assertEqual(f.read(), "<p> hi </p>")
+
+            result = OutputProcessor(state_path, minify=True).run(out_dir)
+            self.assertEqual((result["processed"], result["skipped"]), (0, 1))
+
+    def test_removes_orphaned_siblings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = os.path.join(tmp, "docs")
+            os.makedirs(out_dir)
+            page = os.path.join(out_dir, "gone.html")
+            with open(page, "w") as f:
+                f.write("<p>hi</p>")
+            processor = OutputProcessor(os.path.join(tmp, "state.json"))
+            processor.run(out_dir)
+            os.remove(page)
+            result = processor.run(out_dir)
+            self.assertEqual(result["removed"], 1)
+            self.assertFalse(os.path.exists(page + ".gz"))
+
+    def test_keeps_shipped_compressed_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = os.path.join(tmp, "docs")
+            os.makedirs(out_dir)
+            archive = os.path.join(out_dir, "archive.tar.gz")
+            with open(archive, "wb") as f:
+                f.write(gzip.compress(b"data"))
+            page = os.path.join(out_dir, "index.html")
+            with open(page, "w") as f:
+                f.write("<p>hi</p>")
+            state_path = os.path.join(tmp, "state.json")
+            OutputProcessor(state_path).run(out_dir)
+            self.assertTrue(os.path.exists(page + ".gz"))
+
+            result = OutputProcessor(state_path, minify=True, compress=False).run(out_dir)
+            self.assertEqual(result["removed"], 1)
+            self.assertFalse(os.path.exists(page + ".gz"))
+            with open(archive, "rb") as f:
+                self.assertEqual(gzip.decompress(f.read()), b"data")
+            OutputProcessor(state_path, minify=True, compress=False).run(out_dir)
+            self.assertTrue(os.path.exists(archive))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+import unittest
+import profiling
+
+
+class TestProfiling(unittest.TestCase):
+    def tearDown(self):
+        profiling.stop_profile()
+
+    def test_stage_is_noop_without_profile(self):
+        with profiling.stage("read"):
+            pass
+        self.assertIsNone(profiling.active_profile)
+
+    def test_stage_totals_and_slowest_pages(self):
+        profile = profiling.start_profile()
+        with profiling.stage("read"):
+            pass
+        with profiling.stage("read"):
+            pass
+        profile.record_page("a.md", 0.5)
+        profile.record_page("b.md", 1.5)
+        self.assertEqual(profile.stage_counts["read"], 2)
+        self.assertEqual(profile.slowest_pages(1), [(1.5, "b.md")])
+        self.assertIn("read", profile.report())
+
+    def test_chrome_trace(self):
+        profile = profiling.start_profile()
+        with profiling.stage("write"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            profile.write_chrome_trace(path)
+            with open(path) as f:
+                trace = json.load(f)
+        self.assertEqual(trace["traceEvents"][0]["name"], "write")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from renderer import render, serve_stream
+from template import Template
+
+
+class TestRender(unittest.TestCase):
+    def test_fragment(self):
+        self.assertEqual(render("[x](/y)", basepath="/site/"), '<div><p><a href="/site/y">x</a></p></div>')
+
+    def test_page_with_template(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(render("# Hi\n\nthere", template), "<title>Hi</title><div><h1>Hi</h1><p>there</p></div>")
+
+    def test_page_with_template_path(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write('<a href="/">{{ Title }}</a>')
+            self.assertEqual(render("# Hi", path, "/b/"), '<a href="/b/">Hi</a>')
+
+    def test_page_requires_title(self):
+        with self.assertRaises(ValueError):
+            render("no title", Template("{{ Content }}"))
+
+
+class TestServeStream(unittest.TestCase):
+    def test_requests_and_errors(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        requests = "\n".join([
+            json.dumps({"id": 1, "markdown": "# A"}),
+            json.dumps({"id": 2, "markdown": "untitled"}),
+            "",
+            json.dumps({"id": 3, "markdown": "_b_", "fragment": True}),
+            json.dumps({"id": 4}),
+            "[1, 2]",
+        ])
+        out = io.StringIO()
+        self.assertEqual(serve_stream(io.StringIO(requests), out, template), 5)
+        responses = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(responses[0], {"id": 1, "html": "<title>A</title><div><h1>A</h1></div>"})
+        self.assertEqual(responses[1], {"id": 2, "error": "ValueError: no title found"})
+        self.assertEqual(responses[2], {"id": 3, "html": "<div><p><i>b</i></p></div>"})
+        self.assertEqual(responses[3], {"id": 4, "error": "missing key 'markdown'"})
+        self.assertEqual(responses[4]["id"], None)
+
+    def test_requests_pick_templates_by_name_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "secret.txt")
+            with open(path, "w") as f:
+                f.write("secret {{ Content }}")
+            requests = "\n".join([
+                json.dumps({"id": 1, "markdown": "# A", "template": "bare"}),
+                json.dumps({"id": 2, "markdown": "# A", "template": path}),
+                json.dumps({"id": 3, "markdown": "# A", "template": ["bare"]}),
+            ])
+            out = io.StringIO()
+            serve_stream(io.StringIO(requests), out, templates={"bare": Template("{{ Title }}")})
+        responses = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(responses[0], {"id": 1, "html": "A"})
+        self.assertEqual(responses[1], {"id": 2, "error": f"ValueError: unknown template {path!r}"})
+        self.assertEqual(responses[2], {"id": 3, "error": "ValueError: unknown template ['bare']"})
+
+
+if __name__ == "__main__":
+    unittest.main()
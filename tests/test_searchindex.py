@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+from searchindex import (
+    SearchIndex,
+    SearchIndexReader,
+    delta_decode,
+    delta_encode,
+    heading_anchor,
+    page_sections,
+    page_url,
+    tokenize,
+)
+
+
+class TestTokenizing(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("The Elf-lord, a hero of 1000 years!"), ["the", "elf", "lord", "hero", "of", "1000", "years"])
+
+    def test_page_sections_strip_markdown(self):
+        md = "# Title\n\nSome **bold** [link](/x) text\n\n## Next part\n\n- item one\n- item two\n\n```\nx = call()\n```"
+        self.assertEqual(
+            page_sections(md),
+            [
+                ["Title", {"title": 1, "some": 1, "bold": 1, "link": 1, "text": 1}],
+                ["Next part", {"next": 1, "part": 1, "item": 2, "one": 1, "two": 1, "call": 1}],
+            ],
+        )
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html"), "")
+        self.assertEqual(page_url(os.path.join("blog", "tom", "index.html")), "blog/tom/")
+        self.assertEqual(page_url("about.html"), "about")
+
+    def test_heading_anchor(self):
+        self.assertEqual(heading_anchor("World-Building & more"), "#:~:text=World%2DBuilding%20%26%20more")
+        self.assertEqual(heading_anchor(""), "")
+
+    def test_delta_round_trip(self):
+        numbers = [0, 3, 3, 10, 42]
+        self.assertEqual(delta_encode(numbers), [0, 3, 0, 7, 32])
+        self.assertEqual(delta_decode(delta_encode(numbers)), numbers)
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.state = os.path.join(self.tmp.name, "search.json")
+        self.write_page("index.md", "# Home\n\nWelcome to the elves.\n\n## Rivendell\n\nElves live in Rivendell.")
+        self.write_page("blog/post.md", "# Dwarves\n\nDwarves live in mountains.")
+
+    def write_page(self, rel_path, markdown):
+        path = os.path.join(self.content, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(markdown)
+
+    def jobs(self):
+        return [
+            (os.path.join(self.content, "index.md"), os.path.join(self.docs, "index.html")),
+            (os.path.join(self.content, "blog", "post.md"), os.path.join(self.docs, "blog", "post.html")),
+        ]
+
+    def test_write_and_search(self):
+        index = SearchIndex(self.state)
+        self.assertEqual(index.update(self.jobs(), self.docs), 2)
+        index.write(self.docs, "/site/")
+        reader = SearchIndexReader(os.path.join(self.docs, "search"))
+        self.assertEqual(
+            reader.search("elves rivendell"),
+            [("/site/#:~:text=Rivendell", "Home", "Rivendell", 3)],
+        )
+        self.assertEqual(reader.search("live")[1][0], "/site/blog/post#:~:text=Dwarves")
+        self.assertEqual(reader.search("hobbits"), [])
+
+        reader = SearchIndexReader(os.path.join(self.docs, "search"))
+        reader.search("home")
+        self.assertEqual(set(reader.shards), {"h"})
+
+    def test_incremental_update(self):
+        index = SearchIndex(self.state)
+        index.update(self.jobs(), self.docs)
+        index.save()
+
+        index = SearchIndex.load(self.state)
+        self.assertEqual(index.update(self.jobs(), self.docs), 0)
+        self.write_page("blog/post.md", "# Dwarves\n\nDwarves live under Erebor.")
+        self.assertEqual(index.update(self.jobs(), self.docs), 1)
+        self.assertEqual(index.update(self.jobs()[:1], self.docs), 0)
+        self.assertEqual(list(index.pages), [os.path.join(self.docs, "index.html")])
+
+    def test_write_removes_stale_shards(self):
+        index = SearchIndex(self.state)
+        index.update(self.jobs(), self.docs)
+        index.write(self.docs)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "search", "terms-d.json")))
+        index.update(self.jobs()[:1], self.docs)
+        result = index.write(self.docs)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "search", "terms-d.json")))
+        self.assertEqual(result["written"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+from shard import (
+    ShardMergeError,
+    load_shard_manifests,
+    parse_shard,
+    partition,
+    shard_name,
+    stable_hash,
+    verify_shards,
+    write_shard_manifest,
+)
+
+
+class TestPartition(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.content_dir = os.path.join(tmp.name, "content")
+        os.makedirs(self.content_dir)
+        self.jobs = []
+        for i in range(40):
+            path = os.path.join(self.content_dir, f"page{i}.md")
+            with open(path, "w") as f:
+                f.write("x" * (1000 if i < 4 else 10))
+            self.jobs.append((path, f"docs/page{i}.html"))
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for spec in ("4/4", "1", "a/2", "0/0", "-1/2"):
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_stable_hash_is_fixed(self):
+        # Shards on different machines and Python versions must agree.
+        self.assertEqual(stable_hash("index.md"), 13318026785338389251)
+        self.assertEqual(stable_hash("blog/tom/index.md"), 17222654187412670073)
+
+    def test_every_page_in_exactly_one_shard(self):
+        for weighted in (False, True):
+            shards = partition(self.jobs, 3, self.content_dir, weighted=weighted)
+            self.assertEqual(sorted(job for shard in shards for job in shard), sorted(self.jobs))
+            self.assertEqual(shards, partition(self.jobs, 3, self.content_dir, weighted=weighted))
+            for shard in shards:
+                self.assertEqual(shard, [job for job in self.jobs if job in shard])
+
+    def test_hash_partition_is_stable_as_pages_come_and_go(self):
+        before = partition(self.jobs, 4, self.content_dir)
+        after = partition(self.jobs[1:], 4, self.content_dir)
+        for shard_before, shard_after in zip(before, after):
+            self.assertEqual([job for job in shard_before if job != self.jobs[0]], shard_after)
+
+    def test_weighted_partition_balances_bytes(self):
+        shards = partition(self.jobs, 4, self.content_dir, weighted=True)
+        loads = [sum(os.path.getsize(job[0]) for job in shard) for shard in shards]
+        self.assertEqual(max(loads) - min(loads), 0)
+
+
+class TestVerifyShards(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.shard_dir = tmp.name
+
+    def build_shard(self, index, count, files, basepath="/"):
+        output_dir = os.path.join(self.shard_dir, shard_name(index, count))
+        for rel_path, text in files.items():
+            path = os.path.join(output_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text)
+        manifest_path = os.path.join(self.shard_dir, shard_name(index, count) + ".json")
+        write_shard_manifest(manifest_path, index, count, basepath, [], output_dir)
+
+    def verify(self, expected):
+        return verify_shards(self.shard_dir, load_shard_manifests(self.shard_dir), expected)
+
+    def test_complete(self):
+        self.build_shard(0, 2, {"index.html": "a", "index.css": "b"})
+        self.build_shard(1, 2, {"blog/tom/index.html": "c"})
+        providers = self.verify({"index.html", "index.css", "blog/tom/index.html"})
+        self.assertEqual(providers["blog/tom/index.html"], os.path.join(self.shard_dir, "1-of-2", "blog/tom/index.html"))
+
+    def test_missing_and_duplicated(self):
+        self.build_shard(0, 3, {"index.html": "a"})
+        self.build_shard(1, 3, {"index.html": "a"})
+        with self.assertRaises(ShardMergeError) as cm:
+            self.verify({"index.html", "contact/index.html"})
+        problems = "\n".join(cm.exception.problems)
+        self.assertIn("shard 2 is missing", problems)
+        self.assertIn("index.html is duplicated", problems)
+        self.assertIn("contact/index.html was not built by any shard", problems)
+
+    def test_tampered_and_unexpected(self):
+        self.build_shard(0, 1, {"index.html": "a", "old.html": "b"})
+        with open(os.path.join(self.shard_dir, "0-of-1", "index.html"), "w") as f:
+            f.write("changed")
+        with self.assertRaises(ShardMergeError) as cm:
+            self.verify({"index.html"})
+        self.assertEqual(len(cm.exception.problems), 2)
+
+    def test_mismatched_basepath(self):
+        self.build_shard(0, 2, {"index.html": "a"}, basepath="/")
+        self.build_shard(1, 2, {}, basepath="/site/")
+        with self.assertRaises(ShardMergeError):
+            self.verify({"index.html"})
+
+
+if __name__ == "__main__":
+    unittest.main()
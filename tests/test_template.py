@@ -0,0 +1,61 @@
+import io
+import os
+import tempfile
+import unittest
+import template
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_named_placeholders(self):
+        template = Template("<title>{{ Title }}</title><p>{{ date }}</p>{{Content}}")
+        html = template.render({"Title": "Hi", "date": "2024-01-01", "Content": "<b>x</b>"})
+        self.assertEqual(html, "<title>Hi</title><p>2024-01-01</p><b>x</b>")
+        self.assertEqual(template.names, {"Title", "date", "Content"})
+
+    def test_missing_placeholder_left_as_written(self):
+        template = Template("<p>{{ nav }}</p>")
+        self.assertEqual(template.render({}), "<p>{{ nav }}</p>")
+
+    def test_basepath_rewrite(self):
+        template = Template('<link href="/index.css">{{ Content }}', "/site/")
+        html = template.render({"Content": iter(['<img src="/a.png">', '<a href="/b">b</a>'])})
+        self.assertEqual(html, '<link href="/site/index.css"><img src="/site/a.png"><a href="/site/b">b</a>')
+
+    def test_basepath_rewrite_across_slot_boundary(self):
+        template = Template('<a href="{{ url }}">x</a>', "/site/")
+        self.assertEqual(template.render({"url": "/about"}), '<a href="/site/about">x</a>')
+
+    def test_callable_value_used_for_repeated_placeholder(self):
+        template = Template("{{ Content }}|{{ Content }}")
+        out = io.StringIO()
+        template.write(out, {"Content": lambda: iter(["a", "b"])})
+        self.assertEqual(out.getvalue(), "ab|ab")
+
+    def test_load_template_cached_until_modified(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            with open(path, "w") as f:
+                f.write("<h1>{{ Title }}</h1>")
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            self.assertEqual(load_template(path).render({"Title": "T"}), "<h1>T</h1>")
+
+    def test_load_template_cache_is_bounded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            first = load_template(path, "/0/")
+            for i in range(1, template.TEMPLATE_CACHE_SIZE + 1):
+                load_template(path, f"/{i}/")
+            self.assertLessEqual(len(template._template_cache), template.TEMPLATE_CACHE_SIZE)
+            self.assertIsNot(load_template(path, "/0/"), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from htmlnode import EMPTY_CHILDREN, EMPTY_PROPS, LeafNode, ParentNode
+from markdown_blocks import markdown_to_html_node
+from treecache import (
+    TreeCache,
+    cached_markdown_to_html_node,
+    configure_tree_cache,
+    deserialize_tree,
+    serialize_tree,
+    tree_cache,
+)
+
+
+class TestSerializeTree(unittest.TestCase):
+    def test_round_trip(self):
+        tree = ParentNode("div", [
+            ParentNode("p", [
+                LeafNode(None, "Café "),
+                LeafNode("a", "link", {"href": "/x"}),
+                LeafNode("img", "", {"src": "/i.png", "alt": "☃"}),
+            ]),
+            ParentNode("ul", [LeafNode("li", "one"), LeafNode("li", "two")]),
+            LeafNode("b", "end"),
+        ])
+        copy = deserialize_tree(serialize_tree(tree))
+        self.assertEqual(repr(copy), repr(tree))
+        self.assertEqual(copy.to_html(), tree.to_html())
+        self.assertIs(copy.children[2].children, EMPTY_CHILDREN)
+        self.assertIs(copy.props, EMPTY_PROPS)
+
+    def test_round_trip_parsed_markdown(self):
+        md = "# Title\n\n> quote **bold**\n\n1. a\n2. b\n\n```\ncode\n```\n\n![img](/a.png) [x](/y)"
+        tree = markdown_to_html_node(md)
+        self.assertEqual(deserialize_tree(serialize_tree(tree)).to_html(), tree.to_html())
+
+    def test_strings_are_interned(self):
+        items = ParentNode("ul", [LeafNode("li", "same") for _ in range(100)])
+        data = serialize_tree(items)
+        self.assertEqual(data.count(b"same"), 1)
+
+    def test_rejects_bad_data(self):
+        data = serialize_tree(LeafNode("p", "x"))
+        with self.assertRaises(ValueError):
+            deserialize_tree(data[:-1])
+        with self.assertRaises(ValueError):
+            deserialize_tree(b"XXXX" + data[4:])
+
+
+class TestTreeCache(unittest.TestCase):
+    def test_put_and_get(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tree = markdown_to_html_node("# Hi\n\nthere")
+            TreeCache(tmp).put("abcd", tree)
+            cache = TreeCache(tmp)
+            self.assertEqual(cache.get("abcd").to_html(), tree.to_html())
+            self.assertIsNone(cache.get("ef01"))
+            self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_cached_markdown_to_html_node(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            configure_tree_cache(tmp)
+            try:
+                md = "# Page\n\nsome *text*"
+                first = cached_markdown_to_html_node(md)
+                second = cached_markdown_to_html_node(md)
+                self.assertEqual(first.to_html(), second.to_html())
+                self.assertEqual(tree_cache.stats(), {"hits": 1, "misses": 1})
+            finally:
+                configure_tree_cache()
+
+
+if __name__ == "__main__":
+    unittest.main()
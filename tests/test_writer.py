@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from writer import OutputWriter, write_json
+
+
+class TestOutputWriter(unittest.TestCase):
+    def test_write_creates_dirs_and_leaves_no_temp_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = os.path.join(tmp, "a", "b", "index.html")
+            OutputWriter().write(dest, "<p>hi</p>")
+            with open(dest) as f:
+                self.assertEqual(f.read(), "<p>hi</p>")
+            self.assertEqual(os.listdir(os.path.dirname(dest)), ["index.html"])
+
+    def test_failed_block_keeps_old_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = os.path.join(tmp, "index.html")
+            writer = OutputWriter()
+            writer.write(dest, "old")
+            with self.assertRaises(RuntimeError):
+                with writer.open(dest) as f:
+                    f.write("half")
+                    raise RuntimeError("render failed")
+            with open(dest) as f:
+                self.assertEqual(f.read(), "old")
+            self.assertEqual(os.listdir(tmp), ["index.html"])
+
+    def test_recreates_removed_dir(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = os.path.join(tmp, "sub", "index.html")
+            writer = OutputWriter()
+            writer.write(dest, "one")
+            os.remove(dest)
+            os.rmdir(os.path.dirname(dest))
+            writer.write(dest, "two")
+            with open(dest) as f:
+                self.assertEqual(f.read(), "two")
+
+    def test_background_writes_land_on_flush(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = OutputWriter(background=True, queue_size=2)
+            paths = [os.path.join(tmp, "d", f"{i}.html") for i in range(10)]
+            for i, path in enumerate(paths):
+                with writer.open(path) as f:
+                    f.write(str(i))
+            self.assertEqual(writer.flush(), [])
+            for i, path in enumerate(paths):
+                with open(path) as f:
+                    self.assertEqual(f.read(), str(i))
+            writer.close()
+
+    def test_background_errors_are_reported(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            blocker = os.path.join(tmp, "file")
+            with open(blocker, "w") as f:
+                f.write("")
+            writer = OutputWriter(background=True)
+            dest = os.path.join(blocker, "index.html")
+            writer.write(dest, "x")
+            errors = writer.close()
+            self.assertEqual([path for path, _ in errors], [dest])
+            self.assertIsInstance(errors[0][1], OSError)
+
+
+
+class TestWriteJson(unittest.TestCase):
+    def test_concurrent_saves_of_one_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "state.json")
+            errors = []
+
+            def save(n):
+                try:
+                    for i in range(50):
+                        write_json(path, {"n": n, "i": i})
+                except OSError as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=save, args=(n,)) for n in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            with open(path) as f:
+                self.assertEqual(json.load(f)["i"], 49)
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["state.json"])
+
+    def test_failed_dump_keeps_old_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.json")
+            write_json(path, {"a": 1})
+            with self.assertRaises(TypeError):
+                write_json(path, {"a": object()})
+            with open(path) as f:
+                self.assertEqual(json.load(f), {"a": 1})
+            self.assertEqual(os.listdir(tmp), ["state.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()